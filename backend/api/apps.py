@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import signals  # noqa: F401
+        from .timing import install_query_timer
+
+        connection_created.connect(install_query_timer, dispatch_uid='api.timing.install_query_timer')
@@ -0,0 +1,395 @@
+import asyncio
+import json
+import logging
+
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+
+from .auth import AuthenticationError, AuthUnavailableError, averify_access_token, get_bearer_token
+from .cache import directory_cache
+from .changes import SyncTokenError, SyncTokenExpired, build_requests, changes_entry, decode_token
+from .conditional import conditional_response, make_entry
+from .directory import DirectoryQueryError, EmployeeQuery
+from .presence import iter_messages, presence_broker, presence_settings
+from .profiles import ProfileBatchError, batch_payload, cache_key, parse_ids
+from .renderers import ORJSONResponse
+from .repositories import directory_repository
+from .resilience import unavailable_payload, upstream_failure
+from .supabase_client import get_async_auth_client, get_async_supabase_client
+
+# Async versions of the hot read/auth endpoints for ASGI deployments.
+#
+# They return the same payloads as their counterparts in views.py but await
+# the async Supabase client, so a worker is not blocked on PostgREST/GoTrue
+# and independent upstream calls run concurrently. Directory reads use the
+# async methods of the repository (api/repositories.py). api/urls.py routes
+# to these views when API_ASYNC_VIEWS is enabled.
+
+logger = logging.getLogger(__name__)
+
+
+def _method_not_allowed(request, method):
+    if request.method != method:
+        return HttpResponseNotAllowed([method])
+    return None
+
+
+def _upstream_error(e):
+    """503 response when a Supabase call failed or its circuit is open, else None"""
+    failure = upstream_failure(e)
+    if failure is None:
+        return None
+    logger.warning("Supabase unavailable: %s", failure)
+    payload, headers = unavailable_payload(failure)
+    return JsonResponse(payload, status=503, headers=headers)
+
+
+def _csrf_exempt(view):
+    # django.views.decorators.csrf.csrf_exempt wraps views in a sync function
+    # on Django 4.2, which would hide the coroutine from the handler.
+    view.csrf_exempt = True
+    return view
+
+
+# ===== AUTHENTICATION ENDPOINTS =====
+
+@_csrf_exempt
+async def login(request):
+    """Login user with Supabase Auth"""
+    if (response := _method_not_allowed(request, 'POST')):
+        return response
+    try:
+        data = json.loads(request.body)
+        email = data.get('email')
+        password = data.get('password')
+
+        if not email or not password:
+            return JsonResponse({
+                'error': 'Email and password are required',
+                'status': 'failed'
+            }, status=400)
+
+        try:
+            supabase = await get_async_supabase_client()
+            auth = get_async_auth_client()
+        except Exception as e:
+            return JsonResponse({
+                'error': 'Authentication service unavailable',
+                'status': 'failed',
+                'details': str(e)
+            }, status=503)
+
+        # Sign in and look up the profile by email at the same time
+        auth_result, profile_result = await asyncio.gather(
+            auth.sign_in_with_password({"email": email, "password": password}),
+            supabase.table('users').select('*').eq('Email', email).execute(),
+            return_exceptions=True,
+        )
+
+        if isinstance(auth_result, Exception):
+            if upstream_failure(auth_result):
+                return JsonResponse({
+                    'error': 'Authentication service unavailable',
+                    'status': 'failed',
+                    'details': str(auth_result)
+                }, status=503)
+            if "Email not confirmed" in str(auth_result):
+                return JsonResponse({
+                    'error': 'Email not confirmed',
+                    'status': 'failed',
+                    'details': 'Please check your email and click the confirmation link before logging in.'
+                }, status=400)
+            return JsonResponse({
+                'error': 'Login failed',
+                'status': 'failed',
+                'details': str(auth_result)
+            }, status=400)
+
+        if not auth_result.user or not auth_result.session:
+            return JsonResponse({
+                'error': 'Invalid credentials',
+                'status': 'failed'
+            }, status=401)
+
+        if isinstance(profile_result, Exception):
+            logger.warning("Error fetching user details: %s", profile_result)
+            user_data = {}
+        else:
+            user_data = next(
+                (row for row in profile_result.data if row.get('id') == auth_result.user.id), {}
+            )
+
+        return JsonResponse({
+            'message': 'Login successful',
+            'status': 'success',
+            'user': {
+                'id': auth_result.user.id,
+                'email': auth_result.user.email,
+                'forename': user_data.get('forename', ''),
+                'lastname': user_data.get('lastname', ''),
+                'created_at': user_data.get('created_at', '')
+            },
+            'session': {
+                'access_token': auth_result.session.access_token,
+                'refresh_token': auth_result.session.refresh_token,
+                'expires_at': auth_result.session.expires_at
+            }
+        })
+
+    except Exception as e:
+        logger.exception("Error in async login")
+        return JsonResponse({
+            'error': 'Login failed',
+            'status': 'failed',
+            'details': str(e)
+        }, status=500)
+
+
+async def get_current_user(request):
+    """Get current user details"""
+    if (response := _method_not_allowed(request, 'GET')):
+        return response
+    try:
+        token = get_bearer_token(request)
+        if not token:
+            return JsonResponse({
+                'error': 'Authorization token required',
+                'status': 'failed'
+            }, status=401)
+
+        try:
+            claims = await averify_access_token(token)
+        except AuthUnavailableError as e:
+            return JsonResponse({
+                'error': 'Authentication service unavailable',
+                'status': 'failed',
+                'details': str(e)
+            }, status=503)
+        except AuthenticationError as e:
+            return JsonResponse({
+                'error': 'Invalid or expired token',
+                'status': 'failed',
+                'details': str(e)
+            }, status=401)
+
+        supabase = await get_async_supabase_client()
+        user_id = claims['sub']
+        try:
+            user_details = await supabase.table('users').select('*').eq('id', user_id).execute()
+            user_data = user_details.data[0] if user_details.data else {}
+        except Exception as e:
+            logger.warning("Error fetching user %s: %s", user_id, e)
+            user_data = {}
+
+        return JsonResponse({
+            'message': 'User retrieved successfully',
+            'status': 'success',
+            'user': {
+                'id': user_id,
+                'email': claims.get('email') or user_data.get('Email', ''),
+                'forename': user_data.get('forename', ''),
+                'lastname': user_data.get('lastname', ''),
+                'created_at': user_data.get('created_at', '')
+            }
+        })
+
+    except Exception as e:
+        return JsonResponse({
+            'error': 'Failed to get user',
+            'status': 'failed',
+            'details': str(e)
+        }, status=500)
+
+
+# ===== EMPLOYEE ENDPOINTS =====
+
+async def get_employees(request):
+    """Get employees with their details through the async repository methods"""
+    if (response := _method_not_allowed(request, 'GET')):
+        return response
+    try:
+        query = EmployeeQuery.from_params(request.GET)
+    except DirectoryQueryError as e:
+        return JsonResponse({
+            'error': 'Invalid query',
+            'details': str(e),
+            'status': 'failed'
+        }, status=400)
+
+    try:
+        entry = await directory_cache.aget_or_set(query.cache_key, lambda: directory_repository.aemployees_page(query))
+        return conditional_response(request, entry, response_class=ORJSONResponse)
+
+    except Exception as e:
+        if (response := _upstream_error(e)):
+            return response
+        logger.exception("Error in async get_employees")
+        return JsonResponse({
+            'error': 'Failed to fetch employees',
+            'details': str(e),
+            'status': 'failed'
+        }, status=500)
+
+
+async def _fetch_changes(watermark):
+    """Fetch changed employees, new users and tombstones concurrently"""
+    supabase = await get_async_supabase_client()
+    requests = build_requests(supabase, watermark)
+    responses = await asyncio.gather(*(request.execute() for request in requests.values()))
+    rows = {name: response.data for name, response in zip(requests, responses)}
+    return changes_entry(watermark, rows)
+
+
+async def get_employee_changes(request):
+    """Get employees created, updated or deleted since a sync token"""
+    if (response := _method_not_allowed(request, 'GET')):
+        return response
+    try:
+        watermark = decode_token(request.GET.get('since'))
+    except SyncTokenExpired as e:
+        return JsonResponse({
+            'error': 'Sync token expired',
+            'details': str(e),
+            'status': 'failed'
+        }, status=410)
+    except SyncTokenError as e:
+        return JsonResponse({
+            'error': 'Invalid sync token',
+            'details': str(e),
+            'status': 'failed'
+        }, status=400)
+
+    try:
+        key = f'changes:{watermark.isoformat() if watermark else ""}'
+        entry = await directory_cache.aget_or_set(key, lambda: _fetch_changes(watermark))
+        return conditional_response(request, entry, response_class=ORJSONResponse)
+
+    except Exception as e:
+        if (response := _upstream_error(e)):
+            return response
+        logger.exception("Error in async get_employee_changes")
+        return JsonResponse({
+            'error': 'Failed to fetch employee changes',
+            'details': str(e),
+            'status': 'failed'
+        }, status=500)
+
+
+def _batch_ids(request):
+    """Requested ids from ?ids= or a JSON body {"ids": [...]}"""
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            raise ProfileBatchError('Invalid JSON body')
+        ids = data.get('ids') if isinstance(data, dict) else None
+        if isinstance(ids, str):
+            ids = [ids]
+        if not isinstance(ids, list):
+            raise ProfileBatchError('ids must be a list')
+        return parse_ids(ids)
+    return parse_ids(request.GET.getlist('ids'))
+
+
+@_csrf_exempt
+async def get_user_details_batch(request):
+    """Get several user profiles at once, each shaped like get_user_details"""
+    if request.method not in ('GET', 'POST'):
+        return HttpResponseNotAllowed(['GET', 'POST'])
+    try:
+        ids = _batch_ids(request)
+    except ProfileBatchError as e:
+        return JsonResponse({
+            'error': 'Invalid ids',
+            'details': str(e),
+            'status': 'failed'
+        }, status=400)
+
+    try:
+        cached = await directory_cache.aget_many([cache_key(user_id) for user_id in ids])
+        entries = {user_id: cached[cache_key(user_id)] for user_id in ids if cache_key(user_id) in cached}
+        uncached = [user_id for user_id in ids if user_id not in entries]
+        if uncached:
+            fetched = await directory_repository.aprofiles(uncached)
+            await directory_cache.aset_many({cache_key(user_id): entry for user_id, entry in fetched.items()})
+            entries.update(fetched)
+
+        return conditional_response(request, make_entry(batch_payload(ids, entries)), response_class=ORJSONResponse)
+
+    except Exception as e:
+        if (response := _upstream_error(e)):
+            return response
+        logger.exception("Error in async get_user_details_batch")
+        return JsonResponse({
+            'error': 'Failed to fetch user details',
+            'details': str(e),
+            'status': 'failed'
+        }, status=500)
+
+
+async def get_user_details(request, user_id):
+    """Get user details by user ID"""
+    if (response := _method_not_allowed(request, 'GET')):
+        return response
+    try:
+        entry = await directory_cache.aget_or_set(f'user:{user_id}', lambda: directory_repository.auser_profile(user_id))
+
+        if entry is None:
+            return JsonResponse({
+                'error': 'User not found',
+                'status': 'failed'
+            }, status=404)
+
+        employee_data = entry['data']
+        if not employee_data['first_name'] or not employee_data['last_name']:
+            return JsonResponse({
+                'error': 'Incomplete user data',
+                'status': 'failed'
+            }, status=404)
+
+        return conditional_response(request, entry, response_class=ORJSONResponse)
+
+    except Exception as e:
+        if (response := _upstream_error(e)):
+            return response
+        logger.exception("Error in async get_user_details")
+        return JsonResponse({
+            'error': 'Failed to fetch user details',
+            'details': str(e),
+            'status': 'failed'
+        }, status=500)
+
+
+# ===== PRESENCE ENDPOINTS =====
+
+async def _event_stream():
+    # Django 4.2 does not notice clients that went away mid-stream, so every
+    # stream ends after SSE_MAX_AGE and EventSource reconnects by itself.
+    deadline = asyncio.get_running_loop().time() + presence_settings()['SSE_MAX_AGE']
+    subscription = presence_broker.subscribe()
+    try:
+        # Reconnect quickly; clients refetch the directory on "resync"
+        yield 'retry: 3000\n\n'
+        async for message in iter_messages(subscription):
+            if message['type'] == 'ping':
+                yield ': ping\n\n'
+            else:
+                yield f"event: {message['type']}\ndata: {json.dumps(message)}\n\n"
+            if asyncio.get_running_loop().time() >= deadline:
+                break
+    finally:
+        presence_broker.unsubscribe(subscription)
+
+
+async def presence_stream(request):
+    """Server-sent events fallback for the presence WebSocket (ASGI only)"""
+    if (response := _method_not_allowed(request, 'GET')):
+        return response
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI Django buffers an async stream until it ends, holding a
+        # worker thread for SSE_MAX_AGE. 204 tells EventSource not to reconnect.
+        return HttpResponse(status=204)
+    response = StreamingHttpResponse(_event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,199 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .supabase_client import get_auth_client, get_supabase_credentials
+
+# Local verification of Supabase access tokens.
+#
+# Tokens are checked against the project's JWT secret (HS256) or its JWKS
+# (asymmetric keys) without calling the auth server. Verified claims are kept
+# in a bounded LRU cache keyed by the token's SHA-256 and expire together with
+# the token. Asking GoTrue is only done when SUPABASE_AUTH_REMOTE_FALLBACK is
+# enabled and no local key material is configured.
+#
+# The algorithms accepted for each kind of key are pinned in settings
+# (SUPABASE_JWT_ALGORITHMS, SUPABASE_JWKS_ALGORITHMS); the token's own alg
+# header only selects between them and anything else is rejected before
+# any key is looked up. A JWKS endpoint that cannot be reached raises
+# AuthUnavailableError, which the views answer with 503 rather than
+# treating every token as invalid during an auth server outage.
+
+LEEWAY_SECONDS = 10
+
+
+class AuthenticationError(Exception):
+    """Raised when an access token cannot be verified"""
+
+
+class AuthUnavailableError(Exception):
+    """Raised when the keys to verify a token cannot be fetched"""
+
+
+class ClaimsCache:
+    """Thread-safe LRU cache of verified claims that expire at the token's exp"""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token):
+        key = self.key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            claims, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return claims
+
+    def set(self, token, claims, expires_at):
+        key = self.key(token)
+        with self._lock:
+            self._entries[key] = (claims, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, token):
+        with self._lock:
+            self._entries.pop(self.key(token), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+claims_cache = ClaimsCache(getattr(settings, 'SUPABASE_JWT_CACHE_SIZE', 1024))
+
+_jwks_client = None
+_jwks_lock = threading.Lock()
+
+
+def get_bearer_token(request):
+    """Extract the bearer token from the Authorization header, if any"""
+    auth_header = request.headers.get('Authorization')
+    if not auth_header or not auth_header.startswith('Bearer '):
+        return None
+    return auth_header.split(' ')[1]
+
+
+def _get_jwks_client():
+    """Get the shared JWKS client (keys are cached by PyJWT)"""
+    global _jwks_client
+    if _jwks_client is None:
+        with _jwks_lock:
+            if _jwks_client is None:
+                jwks_url = getattr(settings, 'SUPABASE_JWKS_URL', '')
+                if not jwks_url:
+                    supabase_url, _ = get_supabase_credentials()
+                    jwks_url = f"{supabase_url}/auth/v1/.well-known/jwks.json"
+                _jwks_client = jwt.PyJWKClient(jwks_url, cache_keys=True)
+    return _jwks_client
+
+
+def _key_type(token):
+    """'secret' or 'jwks' for the token's alg header, if that algorithm is allowed"""
+    algorithm = jwt.get_unverified_header(token).get('alg')
+    if algorithm in getattr(settings, 'SUPABASE_JWT_ALGORITHMS', ['HS256']):
+        return 'secret'
+    if algorithm in getattr(settings, 'SUPABASE_JWKS_ALGORITHMS', ['RS256', 'ES256']):
+        return 'jwks'
+    raise jwt.InvalidAlgorithmError(f'The token algorithm {algorithm!r} is not allowed')
+
+
+def _decode_locally(token):
+    """Verify the token signature and claims without a network call"""
+    if _key_type(token) == 'secret':
+        key = getattr(settings, 'SUPABASE_JWT_SECRET', '')
+        if not key:
+            return None
+        algorithms = getattr(settings, 'SUPABASE_JWT_ALGORITHMS', ['HS256'])
+    else:
+        key = _get_jwks_client().get_signing_key_from_jwt(token).key
+        algorithms = getattr(settings, 'SUPABASE_JWKS_ALGORITHMS', ['RS256', 'ES256'])
+
+    return jwt.decode(
+        token,
+        key,
+        algorithms=algorithms,
+        audience=getattr(settings, 'SUPABASE_JWT_AUDIENCE', 'authenticated'),
+        leeway=LEEWAY_SECONDS,
+        options={'require': ['exp', 'sub']},
+    )
+
+
+def _fetch_remote_claims(token):
+    """Ask the auth server who owns the token (opt-in fallback)"""
+    # Imported with the auth client rather than at startup (see api/supabase_client.py)
+    from gotrue.errors import AuthApiError
+
+    try:
+        user_response = get_auth_client().get_user(token)
+    except AuthApiError as e:
+        raise AuthenticationError(e.message)
+    if not user_response or not user_response.user:
+        raise AuthenticationError('User not found')
+    unverified = jwt.decode(token, options={'verify_signature': False})
+    return {
+        'sub': user_response.user.id,
+        'email': user_response.user.email,
+        'exp': unverified.get('exp', time.time()),
+    }
+
+
+def verify_access_token(token):
+    """Return the verified claims of a Supabase access token"""
+    claims = claims_cache.get(token)
+    if claims is not None:
+        return claims
+
+    try:
+        claims = _decode_locally(token)
+    except jwt.PyJWKClientConnectionError as e:
+        # The JWKS endpoint is down, which says nothing about the token
+        raise AuthUnavailableError(str(e)) from e
+    except jwt.PyJWTError as e:
+        raise AuthenticationError(str(e))
+
+    if claims is None:
+        if not getattr(settings, 'SUPABASE_AUTH_REMOTE_FALLBACK', False):
+            raise AuthenticationError('SUPABASE_JWT_SECRET is not configured')
+        claims = _fetch_remote_claims(token)
+
+    claims_cache.set(token, claims, claims['exp'])
+    return claims
+
+
+def _verifies_offline(token):
+    """Whether verifying the token is pure CPU: cached, or signed with the configured secret"""
+    if claims_cache.get(token) is not None:
+        return True
+    try:
+        return _key_type(token) == 'secret' and bool(getattr(settings, 'SUPABASE_JWT_SECRET', ''))
+    except jwt.PyJWTError:
+        # Rejected without any I/O either
+        return True
+
+
+async def averify_access_token(token):
+    """verify_access_token for async views; JWKS fetches and GoTrue calls run in a thread"""
+    if _verifies_offline(token):
+        return verify_access_token(token)
+    return await sync_to_async(verify_access_token)(token)
@@ -0,0 +1,273 @@
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+from .resilience import upstream_failure
+
+# Cache for the employee directory.
+#
+# Directory reads are served from a pluggable backend configured through
+# settings.DIRECTORY_CACHE. LocMemBackend keeps entries in this process and
+# suits a single worker; DjangoCacheBackend goes through Django's cache
+# framework so several workers share entries and invalidations. Writes to
+# users/user_details invalidate the cache explicitly (see api/signals.py).
+#
+# The last payload loaded for each key is also kept in this process, past
+# its TTL and invalidations, and served when a reload fails because Supabase
+# is unreachable or its circuit is open (see api/resilience.py): a slightly
+# stale directory beats an error page while the upstream recovers.
+#
+# Async views use the backends' a* methods: LocMemBackend answers them
+# inline, DjangoCacheBackend runs its (network) cache calls in a thread so
+# a Redis or Memcached round trip never blocks the event loop.
+
+DEFAULT_DIRECTORY_CACHE = {
+    'BACKEND': 'api.cache.LocMemBackend',
+    'TTL': 300,
+    'MAX_ENTRIES': 256,
+    'CACHE_ALIAS': 'default',
+    'KEY_PREFIX': 'directory',
+}
+
+
+class LocMemBackend:
+    """In-process TTL cache with LRU eviction"""
+
+    def __init__(self, max_entries=256, **options):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_many(self, keys):
+        values = {key: self.get(key) for key in keys}
+        return {key: value for key, value in values.items() if value is not None}
+
+    def set_many(self, values, ttl):
+        for key, value in values.items():
+            self.set(key, value, ttl)
+
+    # In-memory and only briefly locked, so safe to call from the event loop
+    async def aget(self, key):
+        return self.get(key)
+
+    async def aset(self, key, value, ttl):
+        self.set(key, value, ttl)
+
+    async def aget_many(self, keys):
+        return self.get_many(keys)
+
+    async def aset_many(self, values, ttl):
+        self.set_many(values, ttl)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DjangoCacheBackend:
+    """Backend on Django's cache framework, shared by all workers"""
+
+    def __init__(self, cache_alias='default', key_prefix='directory', **options):
+        self.cache = caches[cache_alias]
+        self.key_prefix = key_prefix
+        self.generation_key = f'{key_prefix}:generation'
+
+    def _generation(self):
+        generation = self.cache.get(self.generation_key)
+        if generation is None:
+            self.cache.add(self.generation_key, 1, timeout=None)
+            generation = self.cache.get(self.generation_key, 1)
+        return generation
+
+    def _key(self, key):
+        return f'{self.key_prefix}:{self._generation()}:{key}'
+
+    def get(self, key):
+        return self.cache.get(self._key(key))
+
+    def set(self, key, value, ttl):
+        self.cache.set(self._key(key), value, timeout=ttl)
+
+    def get_many(self, keys):
+        prefix = self._key('')
+        values = self.cache.get_many([prefix + key for key in keys])
+        return {key[len(prefix):]: value for key, value in values.items()}
+
+    def set_many(self, values, ttl):
+        prefix = self._key('')
+        self.cache.set_many({prefix + key: value for key, value in values.items()}, timeout=ttl)
+
+    # One thread hop per call covers the generation lookup and the access
+    async def aget(self, key):
+        return await sync_to_async(self.get, thread_sensitive=False)(key)
+
+    async def aset(self, key, value, ttl):
+        await sync_to_async(self.set, thread_sensitive=False)(key, value, ttl)
+
+    async def aget_many(self, keys):
+        return await sync_to_async(self.get_many, thread_sensitive=False)(keys)
+
+    async def aset_many(self, values, ttl):
+        await sync_to_async(self.set_many, thread_sensitive=False)(values, ttl)
+
+    def clear(self):
+        # Bumping the generation orphans every entry; the cache's own
+        # eviction (LRU for locmem/redis/memcached) reclaims them.
+        try:
+            self.cache.incr(self.generation_key)
+        except ValueError:
+            self.cache.set(self.generation_key, 2, timeout=None)
+
+
+class DirectoryCache:
+    """Read-through cache for directory payloads with hit/miss counters"""
+
+    def __init__(self, backend, ttl, max_stale=256):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.stale_served = 0
+        self._last_good = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _keep_last_good(self, key, value):
+        with self._lock:
+            self._last_good[key] = value
+            self._last_good.move_to_end(key)
+            while len(self._last_good) > self.max_stale:
+                self._last_good.popitem(last=False)
+
+    def _loaded(self, key, value):
+        if value is not None:
+            self.backend.set(key, value, self.ttl)
+            self._keep_last_good(key, value)
+        return value
+
+    async def _aloaded(self, key, value):
+        if value is not None:
+            await self.backend.aset(key, value, self.ttl)
+            self._keep_last_good(key, value)
+        return value
+
+    def _count(self, value):
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+    def _stale(self, key, error):
+        """Last good value for a key whose reload failed upstream, else re-raise"""
+        with self._lock:
+            value = self._last_good.get(key) if upstream_failure(error) else None
+            if value is None:
+                raise error
+            self.stale_served += 1
+        return value
+
+    def get_or_set(self, key, loader):
+        value = self.backend.get(key)
+        self._count(value)
+        if value is None:
+            try:
+                value = self._loaded(key, loader())
+            except Exception as e:
+                value = self._stale(key, e)
+        return value
+
+    async def aget_or_set(self, key, loader):
+        """Async variant of get_or_set for coroutine loaders"""
+        value = await self.backend.aget(key)
+        self._count(value)
+        if value is None:
+            try:
+                value = await self._aloaded(key, await loader())
+            except Exception as e:
+                value = self._stale(key, e)
+        return value
+
+    def _count_many(self, keys, values):
+        with self._lock:
+            self.hits += len(values)
+            self.misses += len(keys) - len(values)
+
+    def get_many(self, keys):
+        """Cached values of the keys that have one, counting hits and misses"""
+        values = self.backend.get_many(keys)
+        self._count_many(keys, values)
+        return values
+
+    async def aget_many(self, keys):
+        values = await self.backend.aget_many(keys)
+        self._count_many(keys, values)
+        return values
+
+    def set_many(self, values):
+        if values:
+            self.backend.set_many(values, self.ttl)
+
+    async def aset_many(self, values):
+        if values:
+            await self.backend.aset_many(values, self.ttl)
+
+    def invalidate(self):
+        self.backend.clear()
+        with self._lock:
+            self.invalidations += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': f'{type(self.backend).__module__}.{type(self.backend).__name__}',
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'stale_served': self.stale_served,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+def build_directory_cache():
+    """Build the directory cache from settings.DIRECTORY_CACHE"""
+    config = {**DEFAULT_DIRECTORY_CACHE, **getattr(settings, 'DIRECTORY_CACHE', {})}
+    backend_class = import_string(config['BACKEND'])
+    backend = backend_class(
+        max_entries=config['MAX_ENTRIES'],
+        cache_alias=config['CACHE_ALIAS'],
+        key_prefix=config['KEY_PREFIX'],
+    )
+    return DirectoryCache(backend, ttl=config['TTL'], max_stale=config['MAX_ENTRIES'])
+
+
+directory_cache = build_directory_cache()
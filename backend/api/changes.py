@@ -0,0 +1,132 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime, timedelta, timezone
+
+from django.conf import settings
+
+from .conditional import latest_timestamp, make_entry
+from .payloads import embedded_row, employee_payload
+
+# Delta sync for the employee directory.
+#
+# A sync token wraps a watermark: the latest created_at/updated_at/
+# deleted_at timestamp seen in the previous response, as stored by the
+# database. A changes request returns the employees whose user_details
+# were updated or whose users row was created at or after the watermark,
+# and the ids from employee_tombstones deleted since then. Queries go back
+# EMPLOYEE_SYNC_OVERLAP seconds further, so rows committed by slow
+# transactions just before the watermark are not missed; clients upsert by
+# id, so repeated rows are harmless.
+#
+# Tokens also carry the day they were issued. Every deletion after that
+# day still has its tombstone as long as the token is younger than the
+# tombstone retention period; older tokens are rejected and the client has
+# to resync in full. Retention counts from the issue day rather than the
+# watermark, which stays old while nothing in the directory changes. The
+# day (not the time) keeps the token, and so the ETag, of an unchanged
+# response stable.
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class SyncTokenError(ValueError):
+    """Malformed sync token"""
+
+
+class SyncTokenExpired(SyncTokenError):
+    """Sync token older than the tombstone retention period"""
+
+
+def _issue_day():
+    return datetime.now(timezone.utc).date()
+
+
+def encode_token(watermark):
+    payload = {'v': 2, 'w': watermark.isoformat() if watermark else None, 'i': _issue_day().isoformat()}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def decode_token(token):
+    """Watermark of a sync token, or None for a full sync"""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        watermark = payload['w']
+        watermark = datetime.fromisoformat(watermark) if watermark else None
+        # Version 1 tokens have no issue day; their watermark is the best bound
+        issued = date.fromisoformat(payload['i']) if 'i' in payload else None
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise SyncTokenError('Invalid sync token')
+    if watermark is None:
+        return None
+    if watermark.tzinfo is None:
+        raise SyncTokenError('Invalid sync token')
+
+    retention = timedelta(days=getattr(settings, 'EMPLOYEE_TOMBSTONE_RETENTION_DAYS', 30))
+    if issued is None:
+        expired = watermark < datetime.now(timezone.utc) - retention
+    else:
+        # The whole issue day counts as issued at its start, so no tombstone
+        # newer than the token has been purged yet
+        expired = issued <= _issue_day() - retention
+    if expired:
+        raise SyncTokenExpired('Sync token expired, fetch the full directory again')
+    return watermark
+
+
+def _since(watermark):
+    overlap = timedelta(seconds=getattr(settings, 'EMPLOYEE_SYNC_OVERLAP', 5))
+    return (watermark - overlap).isoformat()
+
+
+def build_requests(supabase, watermark):
+    """Unexecuted PostgREST requests for a changes response, by name
+
+    A full sync (no watermark) only needs the users with their details.
+    """
+    users = supabase.table('users').select('id, forename, lastname, Email, created_at, user_details(*)')
+    if watermark is None:
+        return {'users': users}
+    since = _since(watermark)
+    return {
+        'users': users.gte('created_at', since),
+        'details': supabase.table('user_details')
+            .select('*, users(id, forename, lastname, Email, created_at)')
+            .gte('updated_at', since),
+        'tombstones': supabase.table('employee_tombstones')
+            .select('user_id, deleted_at')
+            .gte('deleted_at', since),
+    }
+
+
+def changes_entry(watermark, rows):
+    """Conditional entry for a changes response from the rows of each request"""
+    employees = {}
+    timestamps = [watermark]
+    for row in rows['users']:
+        details = embedded_row(row.pop('user_details', None))
+        employees[row['id']] = employee_payload(row, details)
+        timestamps += [row.get('created_at'), details.get('updated_at')]
+    for details in rows.get('details', []):
+        user = embedded_row(details.pop('users', None))
+        if user:
+            employees[user['id']] = employee_payload(user, details)
+            timestamps += [user.get('created_at'), details.get('updated_at')]
+
+    # A deleted employee cannot also be current, unless it was re-created
+    tombstones = rows.get('tombstones', [])
+    deleted = [row['user_id'] for row in tombstones if row['user_id'] not in employees]
+    timestamps += [row.get('deleted_at') for row in tombstones]
+
+    latest = latest_timestamp(timestamps)
+    return make_entry({
+        'employees': list(employees.values()),
+        'deleted': deleted,
+        'count': len(employees),
+        'full': watermark is None,
+        'sync_token': encode_token(latest),
+        'status': 'success'
+    }, last_modified=latest)
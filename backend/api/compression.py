@@ -0,0 +1,244 @@
+import gzip
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from .timing import metrics, record, request_endpoint
+
+try:
+    import brotli
+except ImportError:  # optional, see requirements.txt
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional, see requirements.txt
+    zstandard = None
+
+# Content-negotiated response compression.
+#
+# CompressionMiddleware compresses text and JSON bodies of at least MIN_SIZE
+# bytes with the first of ENCODINGS the client accepts (by q-value, then in
+# ENCODINGS order). Brotli and zstd are used when the brotli/zstandard
+# packages are installed, gzip always. Directory payloads repeat the same
+# keys, roles and locations for every employee and shrink 5-10x.
+#
+# Responses with a strong ETag (the conditional directory and profile
+# responses, see api/conditional.py) have content-addressed bodies, so their
+# compressed form is kept in an in-process LRU keyed by ETag and encoding:
+# repeated hits on an unchanged directory are never compressed twice. The
+# ETag of a compressed response is made weak, as Django's GZipMiddleware
+# does, and If-None-Match is compared weakly.
+#
+# Auth responses are left alone by default: they carry tokens next to
+# request-supplied values, which is what compression side channels (BREACH)
+# need. Every other response that could come compressed, including 304s and
+# bodies below MIN_SIZE, carries Vary: Accept-Encoding so shared caches keep
+# the encodings apart. Compression ratio and time are recorded per endpoint
+# and encoding in the /api/metrics/ histograms and in the Server-Timing
+# `compress` step.
+
+DEFAULT_COMPRESSION = {
+    'ENCODINGS': ['br', 'zstd', 'gzip'],
+    'MIN_SIZE': 1024,
+    'CACHE_MAX_BYTES': 32 * 1024 * 1024,
+    'EXCLUDE_PATHS': ['/api/auth/'],
+}
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/javascript', 'image/svg+xml')
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 3
+
+metrics.describe('http_response_compression_ratio', 'Compressed / uncompressed body size by endpoint and encoding',
+                 buckets=(0.05, 0.1, 0.15, 0.2, 0.3, 0.4, 0.5, 0.75, 1.0))
+metrics.describe('http_response_compression_seconds', 'Time spent compressing bodies by endpoint and encoding',
+                 buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25))
+
+
+def _gzip(body):
+    # mtime=0 keeps the output, like the cached bodies, deterministic
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _brotli(body):
+    return brotli.compress(body, quality=BROTLI_QUALITY)
+
+
+def _zstd(body):
+    # ZstdCompressor instances must not be shared between threads
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+
+
+CODECS = {'gzip': _gzip}
+if brotli is not None:
+    CODECS['br'] = _brotli
+if zstandard is not None:
+    CODECS['zstd'] = _zstd
+
+
+def compression_settings():
+    return {**DEFAULT_COMPRESSION, **getattr(settings, 'RESPONSE_COMPRESSION', {})}
+
+
+def parse_accept_encoding(header):
+    """q-value per content coding of an Accept-Encoding header"""
+    weights = {}
+    for part in (header or '').split(','):
+        coding, _, params = part.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding] = weight
+    return weights
+
+
+def negotiate(header, encodings):
+    """Accepted encoding with the highest q-value, ties going to the earlier one"""
+    weights = parse_accept_encoding(header)
+    chosen, chosen_weight = None, 0.0
+    for encoding in encodings:
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        if weight > chosen_weight:
+            chosen, chosen_weight = encoding, weight
+    return chosen
+
+
+class CompressedBodyCache:
+    """LRU of compressed bodies, bounded by their total size"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._bodies = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._bodies.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._bodies.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def set(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._bodies.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._bodies[key] = body
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self._bodies.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._bodies.clear()
+            self.size = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._bodies),
+            'bytes': self.size,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+compressed_bodies = CompressedBodyCache(compression_settings()['CACHE_MAX_BYTES'])
+
+
+def _negotiable(request, response, config):
+    """Whether the response at this URL can come compressed, depending on Accept-Encoding"""
+    if response.streaming or response.has_header('Content-Encoding'):
+        return False
+    if request.path.startswith(tuple(config['EXCLUDE_PATHS'])):
+        return False
+    # A 304 has no Content-Type but stands in for a body that may be compressed
+    return response.status_code == 304 or response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES)
+
+
+def compress_response(request, response, config, encodings):
+    """Replace the body with its compressed form when the client accepts one"""
+    if not _negotiable(request, response, config):
+        return response
+    # Even an uncompressed small body or 304 must vary: a cache that keyed it
+    # on the URL alone would serve it where the compressed form is expected
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if response.status_code != 200 or len(response.content) < config['MIN_SIZE']:
+        return response
+    encoding = negotiate(request.headers.get('Accept-Encoding'), encodings)
+    if encoding is None:
+        return response
+
+    body = response.content
+    etag = response.get('ETag')
+    # The length tells apart renderings of the same payload (e.g. ?indent)
+    key = (etag, encoding, len(body)) if etag and not etag.startswith('W/') else None
+    compressed = compressed_bodies.get(key) if key else None
+    endpoint = request_endpoint(request)
+    if compressed is None:
+        started = time.perf_counter()
+        compressed = CODECS[encoding](body)
+        duration = time.perf_counter() - started
+        record('compress', duration)
+        metrics.observe('http_response_compression_seconds', duration, endpoint=endpoint, encoding=encoding)
+        if key:
+            compressed_bodies.set(key, compressed)
+
+    if len(compressed) >= len(body):
+        return response
+    metrics.observe('http_response_compression_ratio', len(compressed) / len(body),
+                    endpoint=endpoint, encoding=encoding)
+    response.content = compressed
+    response['Content-Length'] = str(len(compressed))
+    response['Content-Encoding'] = encoding
+    if etag and not etag.startswith('W/'):
+        response['ETag'] = f'W/{etag}'
+    return response
+
+
+class CompressionMiddleware:
+    """Compress responses with gzip, brotli or zstd per Accept-Encoding"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = compression_settings()
+        self.encodings = [encoding for encoding in self.config['ENCODINGS'] if encoding in CODECS]
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return compress_response(request, self.get_response(request), self.config, self.encodings)
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        return compress_response(request, response, self.config, self.encodings)
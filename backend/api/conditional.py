@@ -0,0 +1,69 @@
+import hashlib
+
+from django.http import HttpResponseNotModified
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework.response import Response
+
+from .renderers import dumps
+
+# Conditional GET support for the directory and profile endpoints.
+#
+# A payload is stored together with its strong ETag (a SHA-256 of its JSON
+# form) and Last-Modified time, so when the entry comes from the directory
+# cache a matching If-None-Match is answered with 304 without re-serializing
+# or touching the database.
+
+
+def compute_etag(data):
+    """Strong ETag derived from the JSON content of a payload"""
+    return quote_etag(hashlib.sha256(dumps(data, sort_keys=True)).hexdigest()[:32])
+
+
+def latest_timestamp(values):
+    """Latest of a mix of datetimes and ISO 8601 strings, or None"""
+    latest = None
+    for value in values:
+        if isinstance(value, str):
+            value = parse_datetime(value)
+        if value is not None and (latest is None or value > latest):
+            latest = value
+    return latest
+
+
+def make_entry(data, last_modified=None):
+    """Bundle a payload with its validators"""
+    return {
+        'data': data,
+        'etag': compute_etag(data),
+        'last_modified': last_modified.timestamp() if last_modified else None,
+    }
+
+
+def _not_modified(request, entry):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        # Weak comparison: compressed responses carry the weak form (api/compression.py)
+        etags = {etag.removeprefix('W/') for etag in parse_etags(if_none_match)}
+        return '*' in etags or entry['etag'] in etags
+
+    if_modified_since = request.headers.get('If-Modified-Since')
+    if if_modified_since and entry['last_modified'] is not None:
+        since = parse_http_date_safe(if_modified_since)
+        return since is not None and int(entry['last_modified']) <= since
+
+    return False
+
+
+def conditional_response(request, entry, response_class=Response):
+    """Return 304 when the client's validators match, else the full payload"""
+    if _not_modified(request, entry):
+        response = HttpResponseNotModified()
+    else:
+        response = response_class(entry['data'])
+
+    response['ETag'] = entry['etag']
+    if entry['last_modified'] is not None:
+        response['Last-Modified'] = http_date(entry['last_modified'])
+    response['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,126 @@
+import threading
+import time
+
+from .timing import metrics, record
+
+# Database connection reuse and its metrics.
+#
+# Django 4.2 has no client-side connection pool: each worker thread holds
+# one connection per database alias. With CONN_MAX_AGE set (see
+# DATABASE_CONN_MAX_AGE in settings.py) that connection is kept between
+# requests instead of paying the TCP, TLS and auth handshake to Supabase's
+# Postgres on every request, and CONN_HEALTH_CHECKS pings it before its
+# first use in a request so a connection dropped by the server is replaced
+# rather than failing the request. Behind a transaction-mode PgBouncer or
+# Supavisor (DATABASE_POOLER=transaction) the pooler multiplexes those
+# connections onto a few server connections.
+#
+# The backends in api/db_backends wrap Django's with ConnectionMetricsMixin,
+# which records every checkout (the connect of a new connection, the health
+# check of a reused one) in the db_connection_checkout_seconds histogram and
+# the `db-checkout` Server-Timing step, and keeps the open connections per
+# alias in the db_connections_open gauge. Counters are served by
+# /api/upstreams/ under `database`.
+
+metrics.describe('db_connection_checkout_seconds',
+                 'Time to obtain a usable database connection by alias and outcome (new, reused, unusable)',
+                 buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+metrics.describe('db_connections_open', 'Open database connections of this process by alias')
+
+
+class ConnectionStats:
+    """Connection counters of one database alias across all threads"""
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.open = 0
+        self.opened = 0
+        self.closed = 0
+        self.checkouts = {}
+        self._lock = threading.Lock()
+
+    def checkout(self, outcome, duration):
+        with self._lock:
+            count, total = self.checkouts.get(outcome, (0, 0.0))
+            self.checkouts[outcome] = (count + 1, total + duration)
+        metrics.observe('db_connection_checkout_seconds', duration, database=self.alias, outcome=outcome)
+        record('db-checkout', duration)
+
+    def connected(self):
+        with self._lock:
+            self.open += 1
+            self.opened += 1
+            metrics.set_gauge('db_connections_open', self.open, database=self.alias)
+
+    def disconnected(self):
+        with self._lock:
+            self.open -= 1
+            self.closed += 1
+            metrics.set_gauge('db_connections_open', self.open, database=self.alias)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'open': self.open,
+                'opened': self.opened,
+                'closed': self.closed,
+                'checkouts': {
+                    outcome: {'count': count, 'mean_ms': round(total / count * 1000, 3)}
+                    for outcome, (count, total) in sorted(self.checkouts.items())
+                },
+            }
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def connection_stats(alias):
+    stats = _stats.get(alias)
+    if stats is None:
+        with _stats_lock:
+            stats = _stats.setdefault(alias, ConnectionStats(alias))
+    return stats
+
+
+def database_status():
+    """Connection settings and counters of every database alias used so far"""
+    from django.db import connections
+
+    return {
+        alias: {
+            'conn_max_age': connections.settings[alias]['CONN_MAX_AGE'],
+            'health_checks': connections.settings[alias]['CONN_HEALTH_CHECKS'],
+            'server_side_cursors': not connections.settings[alias].get('DISABLE_SERVER_SIDE_CURSORS', False),
+            **stats.stats(),
+        }
+        for alias, stats in sorted(_stats.items())
+    }
+
+
+class ConnectionMetricsMixin:
+    """DatabaseWrapper mixin that records connection checkouts and open connections"""
+
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        stats = connection_stats(self.alias)
+        stats.connected()
+        stats.checkout('new', time.perf_counter() - started)
+
+    def close_if_health_check_failed(self):
+        if self.connection is None or not self.health_check_enabled or self.health_check_done:
+            return super().close_if_health_check_failed()
+        # First use of a kept connection in this request: time its health check
+        started = time.perf_counter()
+        super().close_if_health_check_failed()
+        outcome = 'reused' if self.connection is not None else 'unusable'
+        connection_stats(self.alias).checkout(outcome, time.perf_counter() - started)
+
+    def _close(self):
+        if self.connection is None:
+            return super()._close()
+        try:
+            return super()._close()
+        finally:
+            connection_stats(self.alias).disconnected()
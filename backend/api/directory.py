@@ -0,0 +1,202 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+
+from .conditional import latest_timestamp, make_entry
+from .importers import WEEKDAYS
+from .payloads import embedded_row, employee_payload
+
+# Query options of the employee directory endpoint.
+#
+# get_employees accepts keyset pagination (limit/cursor), filters on the
+# user_details columns and a sparse fieldset. EmployeeQuery validates them
+# and turns them into a single PostgREST request on users that embeds
+# user_details, so filtering, projection and paging happen in the database
+# and the response only carries the requested page and columns. Without
+# any options the request returns the full directory, as before.
+# OrmRepository (api/repositories.py) runs the same query as one SQL join.
+
+# Payload field -> (table, column) pairs it is read from. The pictures fall
+# back to whatever picture the user_details row stores, so like the full
+# listing they embed the whole row ('*') rather than name a column.
+FIELD_COLUMNS = {
+    'id': [('users', 'id')],
+    'email': [('users', 'Email')],
+    'first_name': [('users', 'forename')],
+    'last_name': [('users', 'lastname')],
+    'profile_picture': [('users', 'forename'), ('user_details', '*')],
+    'profile_picture_variants': [('users', 'forename'), ('user_details', '*')],
+    'role': [('user_details', 'role')],
+    'location': [('user_details', 'location')],
+    'profile_bio': [('user_details', 'profile_bio')],
+    'office_days': [('user_details', 'office_days')],
+    'workload_status': [('user_details', 'workload_status')],
+    'today_location': [('user_details', 'today_location')],
+    'skills': [('user_details', 'skills')],
+    'interests': [('user_details', 'interests')],
+    'favorite_recipes': [('user_details', 'favorite_recipes')],
+    'recommendations': [('user_details', 'recommendations')],
+    'days_with_company': [('user_details', 'days_with_company')],
+}
+
+# Filters matching one of several comma-separated values
+VALUE_FILTERS = ('today_location', 'workload_status', 'location', 'role')
+
+
+class DirectoryQueryError(ValueError):
+    """Invalid directory query parameter"""
+
+
+def encode_cursor(user_id):
+    return base64.urlsafe_b64encode(json.dumps({'id': user_id}).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))['id']
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise DirectoryQueryError('Invalid cursor')
+
+
+def _values(params, name):
+    """Values of a query parameter given repeated and/or comma-separated"""
+    values = []
+    for raw in params.getlist(name):
+        values.extend(value.strip() for value in raw.split(',') if value.strip())
+    return values
+
+
+class EmployeeQuery:
+    """Validated pagination, filter and fieldset options of a directory request"""
+
+    def __init__(self, limit=None, after=None, filters=None, office_days=None, fields=None):
+        self.limit = limit
+        self.after = after
+        self.filters = filters or {}
+        self.office_days = office_days or []
+        self.fields = fields
+
+    @classmethod
+    def from_params(cls, params):
+        limit = params.get('limit')
+        if limit is not None:
+            max_page_size = getattr(settings, 'EMPLOYEES_MAX_PAGE_SIZE', 500)
+            try:
+                limit = int(limit)
+            except ValueError:
+                raise DirectoryQueryError('limit must be an integer')
+            if not 1 <= limit <= max_page_size:
+                raise DirectoryQueryError(f'limit must be between 1 and {max_page_size}')
+
+        cursor = params.get('cursor')
+        after = decode_cursor(cursor) if cursor else None
+        if after is not None and limit is None:
+            limit = getattr(settings, 'EMPLOYEES_PAGE_SIZE', 100)
+
+        filters = {name: values for name in VALUE_FILTERS if (values := _values(params, name))}
+
+        office_days = _values(params, 'office_days')
+        unknown_days = [day for day in office_days if day not in WEEKDAYS]
+        if unknown_days:
+            raise DirectoryQueryError(f'Unknown office_days: {", ".join(unknown_days)}')
+
+        fields = _values(params, 'fields') or None
+        if fields is not None:
+            unknown_fields = [field for field in fields if field not in FIELD_COLUMNS]
+            if unknown_fields:
+                raise DirectoryQueryError(f'Unknown fields: {", ".join(unknown_fields)}')
+            fields = list(dict.fromkeys(fields))
+
+        return cls(limit=limit, after=after, filters=filters, office_days=office_days, fields=fields)
+
+    @property
+    def cache_key(self):
+        """Directory cache key; the unparameterized listing keeps its old key"""
+        options = {
+            'limit': self.limit, 'after': self.after, 'filters': self.filters,
+            'office_days': self.office_days, 'fields': self.fields,
+        }
+        if not any(options.values()):
+            return 'employees'
+        return 'employees:' + json.dumps(options, sort_keys=True, separators=(',', ':'))
+
+    @property
+    def is_filtered(self):
+        return bool(self.filters or self.office_days)
+
+    def columns(self, table):
+        """Columns of a table the fieldset needs, or None for all of them"""
+        if self.fields is None:
+            return None
+        columns = list(dict.fromkeys(
+            column for field in self.fields
+            for field_table, column in FIELD_COLUMNS[field] if field_table == table
+        ))
+        return None if '*' in columns else columns
+
+    @property
+    def embeds_details(self):
+        """Whether the page reads user_details (for fields, filters or Last-Modified)"""
+        detail_columns = self.columns('user_details')
+        return detail_columns is None or bool(detail_columns) or self.is_filtered
+
+    def select_clause(self):
+        """PostgREST select for users with the needed user_details columns embedded"""
+        user_columns = self.columns('users')
+        detail_columns = self.columns('user_details')
+        if user_columns is None:
+            user_columns = ['id', 'forename', 'lastname', 'Email']
+        # id drives the cursor; updated_at drives Last-Modified
+        user_columns = list(dict.fromkeys(['id', *user_columns]))
+
+        select = ', '.join(user_columns)
+        if self.embeds_details:
+            embedded = ', '.join(['user_id', 'updated_at', *(detail_columns or [])]) \
+                if detail_columns is not None else '*'
+            # An inner join drops users whose details do not match the filters
+            join = '!inner' if self.is_filtered else ''
+            select += f', user_details{join}({embedded})'
+        return select
+
+    def build(self, supabase):
+        """Unexecuted PostgREST request for this page (sync or async client)"""
+        request = supabase.table('users').select(self.select_clause())
+        for name, values in self.filters.items():
+            if len(values) == 1:
+                request = request.eq(f'user_details.{name}', values[0])
+            else:
+                request = request.in_(f'user_details.{name}', values)
+        if self.office_days:
+            # office_days is jsonb, so containment takes a JSON array literal
+            request = request.filter('user_details.office_days', 'cs', json.dumps(self.office_days))
+        if self.after is not None:
+            request = request.gt('id', self.after)
+        if self.limit is not None:
+            # One extra row tells whether there is a next page
+            request = request.order('id').limit(self.limit + 1)
+        return request
+
+    def page_entry(self, rows):
+        """Conditional entry for one page of PostgREST rows"""
+        next_cursor = None
+        if self.limit is not None and len(rows) > self.limit:
+            rows = rows[:self.limit]
+            next_cursor = encode_cursor(rows[-1]['id'])
+
+        employees, updated = [], []
+        for row in rows:
+            details = embedded_row(row.pop('user_details', None))
+            updated.append(details.get('updated_at'))
+            employee = employee_payload(row, details)
+            if self.fields is not None:
+                employee = {field: employee[field] for field in self.fields}
+            employees.append(employee)
+
+        data = {'employees': employees, 'count': len(employees)}
+        if self.limit is not None:
+            data['next_cursor'] = next_cursor
+        data['status'] = 'success'
+        return make_entry(data, last_modified=latest_timestamp(updated))
@@ -0,0 +1,241 @@
+import ast
+import csv
+from dataclasses import dataclass, field
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .models import User, UserDetails
+
+# Importer for the transposed user_details.csv export.
+#
+# The file stores one attribute per row and one employee per column, so rows
+# are read one at a time and each employee's column is assembled from them;
+# employees are then parsed, validated against the model fields and upserted
+# in batches, either through the ORM or through PostgREST bulk upserts.
+#
+# Employees without an Email row get an address from api/onboarding.py's
+# allocator (ASCII first name + last initial, then a counter), in file order.
+# Imports upsert on email, so an address already held by someone else is
+# skipped, while one held by an employee of the same name is reused: that
+# is the same employee, imported by an earlier run of the file.
+
+# CSV row label -> model field
+HEADER_FIELDS = {
+    'first name': 'forename',
+    'last name': 'lastname',
+    'email': 'email',
+    'role': 'role',
+    'location': 'location',
+    'profile bio': 'profile_bio',
+    'office days in the week': 'office_days',
+    'workload status': 'workload_status',
+    "today i'm in": 'today_location',
+    'skills': 'skills',
+    'interests': 'interests',
+    'favorite recipes': 'favorite_recipes',
+    'i can recommend...': 'recommendations',
+    'how long i have been with summ ai': 'days_with_company',
+}
+
+# Rows in the export that have no model field yet
+IGNORED_HEADERS = {'profile pictures'}
+
+USER_FIELDS = ['email', 'forename', 'lastname']
+DETAIL_FIELDS = [
+    'role', 'location', 'profile_bio', 'office_days', 'workload_status',
+    'today_location', 'skills', 'interests', 'favorite_recipes',
+    'recommendations', 'days_with_company',
+]
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+@dataclass
+class ImportResult:
+    """Outcome of an import run"""
+    imported: int = 0
+    skipped: int = 0
+    errors: list = field(default_factory=list)
+
+    def add_error(self, column, name, message):
+        self.errors.append({'column': column, 'employee': name, 'error': message})
+        self.skipped += 1
+
+
+def read_transposed_csv(path, encoding='latin-1'):
+    """Yield (column, {field: raw value}) for every employee column in the file"""
+    columns = {}
+    with open(path, newline='', encoding=encoding) as handle:
+        for row in csv.reader(handle):
+            if not row or not any(cell.strip() for cell in row):
+                continue  # stray blank rows
+            label = row[0].strip().lower()
+            if label in IGNORED_HEADERS:
+                continue
+            field_name = HEADER_FIELDS.get(label)
+            if field_name is None:
+                raise ValueError(f"Unknown row label: {row[0]!r}")
+            for column, value in enumerate(row[1:], start=1):
+                columns.setdefault(column, {})[field_name] = value.strip()
+
+    for column in sorted(columns):
+        values = columns[column]
+        if any(values.values()):
+            yield column, values
+
+
+def parse_office_days(value):
+    """Parse a Python-literal list of weekdays such as "['Monday', 'Friday']" """
+    if not value:
+        return []
+    days = ast.literal_eval(value)
+    if not isinstance(days, (list, tuple)):
+        raise ValueError(f"office days must be a list, got {value!r}")
+    unknown = [day for day in days if day not in WEEKDAYS]
+    if unknown:
+        raise ValueError(f"unknown office days: {', '.join(map(str, unknown))}")
+    return sorted(set(days), key=WEEKDAYS.index)
+
+
+def parse_employee(values):
+    """Convert raw CSV values into validated (user, details) field dicts"""
+    forename = values.get('forename', '')
+    lastname = values.get('lastname', '')
+    if not forename or not lastname:
+        raise ValueError('first and last name are required')
+
+    user_data = {
+        'email': (values.get('email') or '').lower() or None,
+        'forename': forename,
+        'lastname': lastname,
+    }
+
+    details_data = {name: values.get(name) or None for name in DETAIL_FIELDS}
+    details_data['office_days'] = parse_office_days(values.get('office_days'))
+    if details_data['workload_status']:
+        details_data['workload_status'] = details_data['workload_status'].lower()
+    if details_data['days_with_company']:
+        details_data['days_with_company'] = int(details_data['days_with_company'])
+
+    # Validate against model field definitions (choices, lengths, types)
+    User(**user_data).clean_fields(exclude=['id'] if user_data['email'] else ['id', 'email'])
+    UserDetails(**details_data).clean_fields(exclude=['id', 'user'])
+    return user_data, details_data
+
+
+def iter_batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def upsert_orm(batch):
+    """Upsert a batch of (user, details) dicts through the ORM in one transaction"""
+    now = timezone.now()
+    with transaction.atomic():
+        User.objects.bulk_create(
+            [User(**user_data) for user_data, _ in batch],
+            update_conflicts=True,
+            unique_fields=['email'],
+            update_fields=['forename', 'lastname'],
+        )
+        # bulk_create does not return ids of updated rows, so read them back
+        emails = [user_data['email'] for user_data, _ in batch]
+        user_ids = dict(User.objects.filter(email__in=emails).values_list('email', 'id'))
+        UserDetails.objects.bulk_create(
+            [
+                UserDetails(user_id=user_ids[user_data['email']], updated_at=now, **details_data)
+                for user_data, details_data in batch
+            ],
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=DETAIL_FIELDS + ['updated_at'],
+        )
+
+
+def upsert_postgrest(batch, supabase):
+    """Upsert a batch of (user, details) dicts through PostgREST bulk upserts"""
+    users_response = supabase.table('users').upsert(
+        [
+            {'Email': user_data['email'], 'forename': user_data['forename'], 'lastname': user_data['lastname']}
+            for user_data, _ in batch
+        ],
+        on_conflict='Email',
+    ).execute()
+    user_ids = {row['Email']: row['id'] for row in users_response.data}
+    supabase.table('user_details').upsert(
+        [
+            {'user_id': user_ids[user_data['email']], **details_data}
+            for user_data, details_data in batch
+        ],
+        on_conflict='user_id',
+    ).execute()
+
+
+def _validation_message(error):
+    return '; '.join(f"{key}: {' '.join(messages)}" for key, messages in error.message_dict.items())
+
+
+def import_user_details(path, *, batch_size=500, dry_run=False, upsert=upsert_orm,
+                        email_domain='summ-ai.com', encoding='latin-1'):
+    """Parse, validate and upsert every employee in a transposed CSV file"""
+    result = ImportResult()
+    seen_emails = set()
+
+    # The whole file is in memory once its columns are assembled anyway
+    parsed = []
+    for column, values in read_transposed_csv(path, encoding=encoding):
+        name = f"{values.get('forename', '')} {values.get('lastname', '')}".strip()
+        try:
+            user_data, details_data = parse_employee(values)
+        except ValidationError as e:
+            result.add_error(column, name, _validation_message(e))
+            continue
+        except (ValueError, SyntaxError) as e:
+            result.add_error(column, name, str(e))
+            continue
+        parsed.append((column, name, user_data, details_data))
+
+    # api.onboarding imports this module
+    from .onboarding import allocate_emails
+    allocate_emails([(user_data, details_data) for _, _, user_data, details_data in parsed],
+                    domain=email_domain, reuse_own=True)
+
+    def parsed_rows():
+        for column, name, user_data, details_data in parsed:
+            try:
+                # Generated emails are validated here, explicit ones were already
+                User(**user_data).clean_fields(exclude=['id'])
+            except ValidationError as e:
+                result.add_error(column, name, _validation_message(e))
+                continue
+            if user_data['email'] in seen_emails:
+                result.add_error(column, name, f"duplicate email {user_data['email']}")
+                continue
+            seen_emails.add(user_data['email'])
+            yield user_data, details_data
+
+    for batch in iter_batches(parsed_rows(), batch_size):
+        if dry_run:
+            result.imported += len(batch)
+            continue
+        try:
+            upsert(batch)
+            result.imported += len(batch)
+        except Exception:
+            # Retry row by row so one bad employee does not sink the batch
+            for user_data, details_data in batch:
+                try:
+                    upsert([(user_data, details_data)])
+                    result.imported += 1
+                except Exception as e:
+                    name = f"{user_data['forename']} {user_data['lastname']}"
+                    result.add_error(None, name, str(e))
+
+    return result
@@ -0,0 +1,58 @@
+import threading
+import time
+
+# Base for the in-process indexes rebuilt from the database (OfficeIndex in
+# api/office.py, SearchIndex in api/search.py).
+#
+# An index is built on first use and rebuilt once it is older than its TTL.
+# Until the first build completes there is nothing to answer from, so every
+# reader waits for it (one of them doing the load) rather than reading an
+# empty index, which callers would otherwise cache. Once built, one reader
+# rebuilds a stale index while the others keep answering from the old one.
+
+
+class InMemoryIndex:
+    """Index built from database rows on first use and rebuilt after `ttl` seconds"""
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self.built_at = None
+        # Guards the index structures
+        self._lock = threading.Lock()
+        # Held while loading rows for a build, which can take a while
+        self._build_lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        """Empty the index structures"""
+        raise NotImplementedError
+
+    def rebuild(self, rows):
+        """Replace the index with rows and set built_at"""
+        raise NotImplementedError
+
+    @property
+    def is_built(self):
+        return self.built_at is not None
+
+    @property
+    def is_stale(self):
+        return not self.is_built or time.monotonic() - self.built_at > self.ttl
+
+    def ensure_fresh(self, load_rows):
+        """Build on first use; rebuild once stale while other readers use the old index"""
+        if self.is_built and not self.is_stale:
+            return
+        if not self.is_built:
+            # Nothing to answer from yet: wait for the first build (or do it)
+            with self._build_lock:
+                if not self.is_built:
+                    self.rebuild(load_rows())
+            return
+        if not self._build_lock.acquire(blocking=False):
+            return
+        try:
+            if self.is_stale:
+                self.rebuild(load_rows())
+        finally:
+            self._build_lock.release()
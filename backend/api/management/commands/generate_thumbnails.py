@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from api.thumbnails import generate_all, photos_dir, thumbnail_root
+
+
+class Command(BaseCommand):
+    help = 'Generate WebP/JPEG avatar variants for every photo in user_photos/'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate existing variants')
+
+    def handle(self, *args, **options):
+        created = existing = 0
+        for name, path, was_created in generate_all(force=options['force']):
+            if was_created:
+                created += 1
+                if options['verbosity'] > 1:
+                    self.stdout.write(f"{name}: {path.name} ({path.stat().st_size} bytes)")
+            else:
+                existing += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {created} variants ({existing} up to date) "
+            f"from {photos_dir()} into {thumbnail_root()}"
+        ))
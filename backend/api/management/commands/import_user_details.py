@@ -0,0 +1,62 @@
+from functools import partial
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.cache import directory_cache
+from api.importers import import_user_details, upsert_orm, upsert_postgrest
+from api.summary import reconcile
+from api.supabase_client import get_supabase_client
+
+
+class Command(BaseCommand):
+    help = 'Import employees from the transposed user_details.csv export'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?',
+            default=str(settings.BASE_DIR.parent / 'user_details.csv'),
+            help='CSV file with one employee per column (default: repository user_details.csv)',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help='Validate only, write nothing')
+        parser.add_argument(
+            '--target', choices=['orm', 'postgrest'], default='orm',
+            help='Write through the Django ORM or through Supabase PostgREST bulk upserts',
+        )
+        parser.add_argument('--email-domain', default='summ-ai.com',
+                            help='Domain for generated emails when the file has no Email row')
+        parser.add_argument('--encoding', default='latin-1')
+
+    def handle(self, *args, **options):
+        if options['target'] == 'postgrest':
+            upsert = partial(upsert_postgrest, supabase=get_supabase_client())
+        else:
+            upsert = upsert_orm
+
+        try:
+            result = import_user_details(
+                options['path'],
+                batch_size=options['batch_size'],
+                dry_run=options['dry_run'],
+                upsert=upsert,
+                email_domain=options['email_domain'],
+                encoding=options['encoding'],
+            )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for error in result.errors:
+            column = f"column {error['column']}" if error['column'] else 'upsert'
+            self.stderr.write(f"{column} ({error['employee'] or 'unnamed'}): {error['error']}")
+
+        if not options['dry_run'] and result.imported:
+            directory_cache.invalidate()
+            if upsert is upsert_orm:
+                # bulk_create upserts do not send the signals that maintain the summary
+                reconcile()
+
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {result.imported} employees ({result.skipped} skipped)"
+        ))
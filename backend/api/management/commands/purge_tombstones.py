@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import EmployeeTombstone
+
+
+class Command(BaseCommand):
+    help = 'Delete employee tombstones older than the delta sync retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int,
+            default=getattr(settings, 'EMPLOYEE_TOMBSTONE_RETENTION_DAYS', 30),
+            help='Keep tombstones newer than this many days',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        deleted, _ = EmployeeTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f"Purged {deleted} tombstones older than {cutoff:%Y-%m-%d %H:%M}"))
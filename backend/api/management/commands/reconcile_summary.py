@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.summary import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recompute the workforce summary counts from user_details and correct any drift'
+
+    def handle(self, *args, **options):
+        corrected = reconcile()
+        self.stdout.write(self.style.SUCCESS(f"Reconciled workforce summary ({corrected} buckets corrected)"))
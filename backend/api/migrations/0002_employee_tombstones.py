@@ -0,0 +1,57 @@
+from django.db import migrations, models
+
+# Deletions made directly in Supabase (dashboard, SQL, PostgREST) never reach
+# Django's post_delete signal, so on PostgreSQL a trigger on users records
+# the tombstone in the database itself.
+
+CREATE_TRIGGER = """
+CREATE OR REPLACE FUNCTION record_employee_tombstone() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO employee_tombstones (user_id, deleted_at)
+    VALUES (OLD.id, now())
+    ON CONFLICT (user_id) DO UPDATE SET deleted_at = EXCLUDED.deleted_at;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS users_record_tombstone ON users;
+CREATE TRIGGER users_record_tombstone
+    AFTER DELETE ON users
+    FOR EACH ROW EXECUTE FUNCTION record_employee_tombstone();
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS users_record_tombstone ON users;
+DROP FUNCTION IF EXISTS record_employee_tombstone();
+"""
+
+
+def create_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_TRIGGER)
+
+
+def drop_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_TRIGGER)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeTombstone',
+            fields=[
+                ('user_id', models.UUIDField(primary_key=True, serialize=False)),
+                ('deleted_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'db_table': 'employee_tombstones',
+            },
+        ),
+        migrations.RunPython(create_trigger, drop_trigger),
+    ]
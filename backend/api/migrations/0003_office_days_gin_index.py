@@ -0,0 +1,36 @@
+from django.db import migrations
+
+# GIN index for jsonb containment on user_details.office_days
+# (`office_days @> '["Thursday"]'`, PostgREST `cs`), used by the office
+# lookups when the in-memory index is disabled. Built concurrently so the
+# table stays writable, which needs a non-atomic migration.
+
+CREATE_INDEX = """
+CREATE INDEX CONCURRENTLY IF NOT EXISTS user_details_office_days_gin
+    ON user_details USING GIN (office_days jsonb_path_ops);
+"""
+
+DROP_INDEX = "DROP INDEX CONCURRENTLY IF EXISTS user_details_office_days_gin;"
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_INDEX)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('api', '0002_employee_tombstones'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,55 @@
+from collections import Counter
+
+from django.db import migrations, models
+
+# Frozen copy of the bucket rules in api/summary.py as of this migration, so
+# later changes there do not change what the migration does
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def _value(value):
+    return '' if value is None else str(value)
+
+
+def populate_summary(apps, schema_editor):
+    UserDetails = apps.get_model('api', 'UserDetails')
+    WorkforceSummary = apps.get_model('api', 'WorkforceSummary')
+
+    counts = Counter()
+    for values in UserDetails.objects.values('workload_status', 'location', 'role', 'office_days').iterator():
+        counts[('total', '')] += 1
+        for dimension in ('workload_status', 'location', 'role'):
+            counts[(dimension, _value(values[dimension]))] += 1
+        for day in set(values['office_days'] or []):
+            if day in WEEKDAYS:
+                counts[('office_day', day)] += 1
+
+    WorkforceSummary.objects.bulk_create(
+        [WorkforceSummary(dimension=dimension, value=value, count=count)
+         for (dimension, value), count in sorted(counts.items())],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_office_days_gin_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkforceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=32)),
+                ('value', models.CharField(blank=True, max_length=200)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'workforce_summary',
+                'unique_together': {('dimension', 'value')},
+            },
+        ),
+        migrations.RunPython(populate_summary, migrations.RunPython.noop),
+    ]
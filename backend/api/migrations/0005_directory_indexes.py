@@ -0,0 +1,61 @@
+from django.db import migrations
+
+# Indexes for the directory's access paths on Supabase Postgres:
+#
+#   user_details.workload_status / today_location / location  filters
+#   user_details.updated_at, users.created_at                 delta sync (>=) and ordering
+#   user_details.skills / interests                           substring search (pg_trgm)
+#
+# office_days containment already has its GIN index from migration 0003.
+# The tables predate these migrations on Supabase, so every index is built
+# concurrently (the table stays writable, hence the non-atomic migration) and
+# IF NOT EXISTS. A concurrent build that was interrupted leaves an INVALID
+# index behind that IF NOT EXISTS would keep, so those are dropped and
+# rebuilt. tests/test_explain.py checks the plans use them.
+
+INDEXES = [
+    ('user_details_workload_status_idx', 'user_details', '(workload_status)'),
+    ('user_details_today_location_idx', 'user_details', '(today_location)'),
+    ('user_details_location_idx', 'user_details', '(location)'),
+    ('user_details_updated_at_idx', 'user_details', '(updated_at)'),
+    ('users_created_at_idx', 'users', '(created_at)'),
+    ('user_details_skills_trgm', 'user_details', 'USING GIN (skills gin_trgm_ops)'),
+    ('user_details_interests_trgm', 'user_details', 'USING GIN (interests gin_trgm_ops)'),
+]
+
+INVALID_INDEX = """
+SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid
+WHERE pg_class.relname = %s AND NOT pg_index.indisvalid
+"""
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm;')
+    with schema_editor.connection.cursor() as cursor:
+        for name, table, definition in INDEXES:
+            cursor.execute(INVALID_INDEX, [name])
+            if cursor.fetchone():
+                schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name};')
+            schema_editor.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} {definition};')
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name};')
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('api', '0004_workforce_summary'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,99 @@
+from django.db import migrations, transaction
+
+# Full-text search document per employee for api/search.py.
+#
+# The weighted tsvector lives in its own table rather than a generated column
+# on user_details, so `user_details(*)` reads through PostgREST do not carry
+# it. A trigger keeps it current for every write path (ORM, PostgREST, the
+# dashboard). Row level security without policies keeps the table private to
+# the database owner that Django connects as.
+#
+# user_details predates this migration on Supabase, so it must stay writable
+# while it runs (hence the non-atomic migration, like 0005). The trigger is
+# created first and commits, so every later write maintains its own document.
+# The backfill then only reads user_details and inserts the documents that
+# are still missing (DO NOTHING: a document the trigger wrote is newer than
+# the backfill's snapshot). The GIN index is built last, concurrently and IF
+# NOT EXISTS, after dropping an INVALID one left by an interrupted build.
+
+CREATE_SEARCH = """
+CREATE TABLE IF NOT EXISTS user_details_search (
+    user_details_id uuid PRIMARY KEY REFERENCES user_details (id) ON DELETE CASCADE,
+    document tsvector NOT NULL
+);
+ALTER TABLE user_details_search ENABLE ROW LEVEL SECURITY;
+
+CREATE OR REPLACE FUNCTION user_details_search_document(skills text, interests text, profile_bio text,
+                                                        recommendations text) RETURNS tsvector AS $$
+    SELECT setweight(to_tsvector('english', coalesce(skills, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(interests, '')), 'B')
+        || setweight(to_tsvector('english', coalesce(profile_bio, '')), 'C')
+        || setweight(to_tsvector('english', coalesce(recommendations, '')), 'D');
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION refresh_user_details_search() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO user_details_search (user_details_id, document)
+    VALUES (NEW.id, user_details_search_document(NEW.skills, NEW.interests, NEW.profile_bio, NEW.recommendations))
+    ON CONFLICT (user_details_id) DO UPDATE SET document = EXCLUDED.document;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS user_details_refresh_search ON user_details;
+CREATE TRIGGER user_details_refresh_search
+    AFTER INSERT OR UPDATE OF skills, interests, profile_bio, recommendations ON user_details
+    FOR EACH ROW EXECUTE FUNCTION refresh_user_details_search();
+"""
+
+BACKFILL_SEARCH = """
+INSERT INTO user_details_search (user_details_id, document)
+SELECT id, user_details_search_document(skills, interests, profile_bio, recommendations) FROM user_details
+ON CONFLICT (user_details_id) DO NOTHING;
+"""
+
+INDEX_NAME = 'user_details_search_document_gin'
+
+INVALID_INDEX = """
+SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid
+WHERE pg_class.relname = %s AND NOT pg_index.indisvalid
+"""
+
+DROP_SEARCH = """
+DROP TRIGGER IF EXISTS user_details_refresh_search ON user_details;
+DROP FUNCTION IF EXISTS refresh_user_details_search();
+DROP TABLE IF EXISTS user_details_search;
+DROP FUNCTION IF EXISTS user_details_search_document(text, text, text, text);
+"""
+
+
+def create_search(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with transaction.atomic(using=schema_editor.connection.alias):
+        schema_editor.execute(CREATE_SEARCH)
+    schema_editor.execute(BACKFILL_SEARCH)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(INVALID_INDEX, [INDEX_NAME])
+        if cursor.fetchone():
+            schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME};')
+    schema_editor.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME} '
+                          'ON user_details_search USING GIN (document);')
+
+
+def drop_search(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_SEARCH)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('api', '0005_directory_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search, drop_search),
+    ]
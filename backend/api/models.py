@@ -47,3 +47,27 @@ class UserDetails(models.Model):
         db_table = 'user_details'  # Use Supabase table name
         verbose_name = "User Details"
         verbose_name_plural = "User Details"
+
+class EmployeeTombstone(models.Model):
+    """Marker left behind when an employee is deleted, for delta sync clients"""
+    user_id = models.UUIDField(primary_key=True)
+    deleted_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.user_id} deleted at {self.deleted_at}"
+
+    class Meta:
+        db_table = 'employee_tombstones'
+
+class WorkforceSummary(models.Model):
+    """Maintained headcount per (dimension, value) bucket, see api/summary.py"""
+    dimension = models.CharField(max_length=32)
+    value = models.CharField(max_length=200, blank=True)
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.dimension}={self.value}: {self.count}"
+
+    class Meta:
+        db_table = 'workforce_summary'
+        unique_together = [('dimension', 'value')]
@@ -0,0 +1,175 @@
+import json
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+from .importers import WEEKDAYS
+from .indexes import InMemoryIndex
+
+# "Who is in the office" lookups.
+#
+# OfficeIndex maps weekday -> employee ids (from user_details.office_days),
+# (weekday, location), location and today_location -> ids, so a lookup costs
+# the size of its answer and the per-weekday counts are set sizes. It is
+# built from a keyset-paginated PostgREST read of user_details (PostgREST
+# caps every response at its max-rows, 1000 on Supabase) and kept current by
+# update()/remove() from the UserDetails signals and the presence Realtime
+# bridge; edits those do not see are picked up when the index is rebuilt
+# after OFFICE_INDEX_TTL seconds. With the index disabled, queries go to
+# PostgREST, where office_days containment is served by the GIN index from
+# migration 0003.
+
+INDEX_COLUMNS = 'user_id, office_days, location, today_location'
+
+
+class OfficeIndex(InMemoryIndex):
+    """In-memory inverted index of office days and locations"""
+
+    def _reset(self):
+        self._entries = {}
+        self._by_day = defaultdict(set)
+        self._by_day_location = defaultdict(set)
+        self._by_location = defaultdict(set)
+        self._by_today = defaultdict(set)
+        self._by_today_location = defaultdict(set)
+
+    def _add(self, user_id, office_days, location, today_location):
+        days = frozenset(day for day in office_days or [] if day in WEEKDAYS)
+        self._entries[user_id] = (days, location, today_location)
+        for day in days:
+            self._by_day[day].add(user_id)
+            self._by_day_location[(day, location)].add(user_id)
+        self._by_location[location].add(user_id)
+        if today_location:
+            self._by_today[today_location].add(user_id)
+            self._by_today_location[(today_location, location)].add(user_id)
+
+    def _discard(self, user_id):
+        entry = self._entries.pop(user_id, None)
+        if entry is None:
+            return
+        days, location, today_location = entry
+        for day in days:
+            self._by_day[day].discard(user_id)
+            self._by_day_location[(day, location)].discard(user_id)
+        self._by_location[location].discard(user_id)
+        if today_location:
+            self._by_today[today_location].discard(user_id)
+            self._by_today_location[(today_location, location)].discard(user_id)
+
+    def rebuild(self, rows):
+        """Replace the index with user_details rows"""
+        with self._lock:
+            self._reset()
+            for row in rows:
+                self._add(str(row['user_id']), row.get('office_days'), row.get('location'),
+                          row.get('today_location'))
+            self.built_at = time.monotonic()
+
+    def update(self, user_id, office_days, location, today_location):
+        """Re-index one employee after a change"""
+        if not self.is_built:
+            return
+        with self._lock:
+            self._discard(str(user_id))
+            self._add(str(user_id), office_days, location, today_location)
+
+    def remove(self, user_id):
+        if not self.is_built:
+            return
+        with self._lock:
+            self._discard(str(user_id))
+
+    def lookup(self, day=None, location=None, today_location=None):
+        """Ids of employees matching every given criterion"""
+        with self._lock:
+            candidates = []
+            if day and location:
+                candidates.append(self._by_day_location.get((day, location), set()))
+            elif day:
+                candidates.append(self._by_day.get(day, set()))
+            elif location:
+                candidates.append(self._by_location.get(location, set()))
+            if today_location:
+                candidates.append(self._by_today.get(today_location, set()))
+            if not candidates:
+                return []
+            # Walk the smallest set, probe the others
+            smallest, *others = sorted(candidates, key=len)
+            return sorted(user_id for user_id in smallest if all(user_id in other for other in others))
+
+    def weekday_counts(self, location=None):
+        with self._lock:
+            if location:
+                return {day: len(self._by_day_location.get((day, location), ())) for day in WEEKDAYS}
+            return {day: len(self._by_day.get(day, ())) for day in WEEKDAYS}
+
+    def today_counts(self, location=None):
+        with self._lock:
+            if location:
+                counts = {name: len(ids) for (name, name_location), ids in self._by_today_location.items()
+                          if name_location == location}
+            else:
+                counts = {name: len(ids) for name, ids in self._by_today.items()}
+            return {name: count for name, count in sorted(counts.items()) if count}
+
+
+office_index = OfficeIndex(ttl=getattr(settings, 'OFFICE_INDEX_TTL', 300))
+
+
+# Rows per request when reading all of user_details; at most PostgREST's max-rows
+PAGE_SIZE = 1000
+
+
+def all_rows(request):
+    """Every row of a user_details request, paged by user_id so max-rows cannot truncate it
+
+    `request` builds a fresh unexecuted request with the select and filters.
+    """
+    rows, after = [], None
+    while True:
+        page_request = request()
+        if after is not None:
+            page_request = page_request.gt('user_id', after)
+        page = page_request.order('user_id').limit(PAGE_SIZE).execute().data
+        if not page:
+            # A short page may be the server's cap rather than the end
+            return rows
+        rows.extend(page)
+        after = page[-1]['user_id']
+
+
+def load_index_rows(supabase):
+    return all_rows(lambda: supabase.table('user_details').select(INDEX_COLUMNS))
+
+
+def query_office(supabase, day=None, location=None, today_location=None):
+    """Database fallback for lookup() and the counts, in two paged PostgREST reads"""
+    def matches():
+        request = supabase.table('user_details').select('user_id')
+        if day:
+            # jsonb containment, served by the office_days GIN index
+            request = request.filter('office_days', 'cs', json.dumps([day]))
+        if location:
+            request = request.eq('location', location)
+        if today_location:
+            request = request.eq('today_location', today_location)
+        return request
+
+    ids = sorted(str(row['user_id']) for row in all_rows(matches)) if (day or location or today_location) else []
+
+    # One narrow read of every row yields the counts for all weekdays at once
+    def counted():
+        request = supabase.table('user_details').select('user_id, office_days, today_location')
+        return request.eq('location', location) if location else request
+
+    weekday_counts = dict.fromkeys(WEEKDAYS, 0)
+    today_counts = defaultdict(int)
+    for row in all_rows(counted):
+        for day_name in set(row.get('office_days') or []):
+            if day_name in weekday_counts:
+                weekday_counts[day_name] += 1
+        if row.get('today_location'):
+            today_counts[row['today_location']] += 1
+    return ids, weekday_counts, dict(sorted(today_counts.items()))
@@ -0,0 +1,217 @@
+import re
+import threading
+import unicodedata
+from contextlib import contextmanager
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+
+from .cache import directory_cache
+from .importers import DETAIL_FIELDS, WEEKDAYS
+from .models import User, UserDetails
+from .office import office_index
+from .search import instance_row, search_index
+from .summary import apply_changes, snapshot
+
+# Employee creation for create_employee and create_employees.
+#
+# Employees are identified by their unique users.Email. When a request has
+# no email, one is allocated from the name like usernames used to be:
+# first name + last initial, then a counter (mariaa@, mariaa1@, mariaa2@...).
+# A batch costs one query for every taken address starting with any of its
+# bases (plus the explicit emails), after which suffixes are assigned in
+# memory, and two bulk_create inserts in the same transaction. Creators
+# going through here take turns (a transaction-level advisory lock on
+# PostgreSQL, a process lock elsewhere); other writers (PostgREST, signup)
+# can still take an address in between, in which case the unique constraint
+# rejects the whole batch and it is allocated and inserted again.
+#
+# bulk_create sends no post_save signals, so their work is done for the
+# batch instead: summary counts in the insert transaction, then the
+# directory cache and the office/search indexes in created().
+
+ALLOCATION_ATTEMPTS = 3
+ALLOCATION_LOCK_ID = 0x656d706c  # pg_advisory_xact_lock key
+
+_allocation_lock = threading.Lock()
+
+
+class EmployeeValidationError(ValueError):
+    """One or more submitted employees are invalid"""
+
+    def __init__(self, errors):
+        super().__init__('; '.join(f"#{error['index']}: {error['error']}" for error in errors))
+        self.errors = errors
+
+
+class EmployeeConflict(ValueError):
+    """Submitted emails that already belong to employees"""
+
+    def __init__(self, emails):
+        super().__init__(f"Employees already exist: {', '.join(emails)}")
+        self.emails = emails
+
+
+def email_domain():
+    return getattr(settings, 'EMPLOYEE_EMAIL_DOMAIN', 'summ-ai.com')
+
+
+def email_base(first_name, last_name):
+    """ASCII local part an allocated email starts with"""
+    name = f'{first_name}{last_name[:1]}'
+    ascii_name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode()
+    return re.sub(r'[^a-z0-9]', '', ascii_name.lower()) or 'employee'
+
+
+def parse_employee(data):
+    """Validated (user, details) field dicts from an API employee object"""
+    if not isinstance(data, dict):
+        raise ValueError('employee must be an object')
+    first_name = (data.get('first_name') or '').strip()
+    last_name = (data.get('last_name') or '').strip()
+    if not first_name or not last_name:
+        raise ValueError('first_name and last_name are required')
+
+    user_data = {
+        'email': (data.get('email') or '').strip().lower() or None,
+        'forename': first_name,
+        'lastname': last_name,
+    }
+    details_data = {name: data.get(name) for name in DETAIL_FIELDS}
+    office_days = details_data['office_days'] or []
+    if not isinstance(office_days, list) or any(day not in WEEKDAYS for day in office_days):
+        raise ValueError(f'office_days must be a list of {", ".join(WEEKDAYS)}')
+    details_data['office_days'] = sorted(set(office_days), key=WEEKDAYS.index)
+
+    # Allocated emails are valid by construction
+    User(**user_data).clean_fields(exclude=['id'] if user_data['email'] else ['id', 'email'])
+    UserDetails(**details_data).clean_fields(exclude=['id', 'user'])
+    return user_data, details_data
+
+
+def parse_employees(items):
+    parsed, errors, seen = [], [], {}
+    for index, data in enumerate(items):
+        try:
+            user_data, details_data = parse_employee(data)
+        except ValidationError as e:
+            errors.append({'index': index, 'error': '; '.join(
+                f"{key}: {' '.join(messages)}" for key, messages in e.message_dict.items()
+            )})
+            continue
+        except ValueError as e:
+            errors.append({'index': index, 'error': str(e)})
+            continue
+
+        email = user_data['email']
+        if email and email in seen:
+            errors.append({'index': index, 'error': f'duplicate email {email} (also #{seen[email]})'})
+        seen.setdefault(email, index)
+        parsed.append((user_data, details_data))
+
+    if errors:
+        raise EmployeeValidationError(errors)
+    return parsed
+
+
+def allocate_emails(parsed, domain=None, reuse_own=False):
+    """Fill in missing emails; one query for the whole batch
+
+    With reuse_own, for imports that upsert on email, explicit emails may
+    already exist, and an allocated address held by an employee of the same
+    name is reused, so importing a file again yields the same addresses.
+    """
+    domain = domain or email_domain()
+    explicit = [user_data['email'] for user_data, _ in parsed if user_data['email']]
+    bases = sorted({email_base(user_data['forename'], user_data['lastname'])
+                    for user_data, _ in parsed if not user_data['email']})
+
+    conditions = [Q(email__istartswith=base) for base in bases]
+    if explicit:
+        conditions.append(Q(email__in=explicit))
+    taken = {}
+    if conditions:
+        taken = {email.lower(): (forename, lastname) for email, forename, lastname in
+                 User.objects.filter(reduce(or_, conditions)).values_list('email', 'forename', 'lastname')}
+
+    conflicts = [email for email in explicit if email in taken]
+    if conflicts and not reuse_own:
+        raise EmployeeConflict(conflicts)
+
+    used = set(explicit)
+    counters = {}
+    for user_data, _ in parsed:
+        if user_data['email']:
+            continue
+        base = email_base(user_data['forename'], user_data['lastname'])
+        own = (user_data['forename'], user_data['lastname']) if reuse_own else None
+        counter = counters.get(base, 0)
+        while True:
+            email = f'{base}{counter or ""}@{domain}'
+            counter += 1
+            if email not in used and taken.get(email, own) == own:
+                break
+        counters[base] = counter
+        used.add(email)
+        user_data['email'] = email
+
+
+@contextmanager
+def allocation_transaction():
+    """Transaction during which no other creator allocates emails"""
+    if connection.vendor == 'postgresql':
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)', [ALLOCATION_LOCK_ID])
+            yield
+    else:
+        with _allocation_lock, transaction.atomic():
+            yield
+
+
+def insert_employees(parsed):
+    """Insert users and their details with two bulk_create statements"""
+    users = [User(**user_data) for user_data, _ in parsed]
+    details = [UserDetails(user=user, **details_data) for user, (_, details_data) in zip(users, parsed)]
+    User.objects.bulk_create(users)
+    UserDetails.objects.bulk_create(details)
+    # One +n update per summary bucket the batch touches
+    apply_changes([], [bucket for row in details for bucket in snapshot(row)])
+    return users, details
+
+
+def created(details):
+    """Do the rest of the post_save signal work for a bulk-created batch"""
+    directory_cache.invalidate()
+    for row in details:
+        office_index.update(row.user_id, row.office_days, row.location, row.today_location)
+        if search_index.is_built:
+            search_index.update(instance_row(row))
+
+
+def create_employees(items):
+    """Validate, allocate emails for and insert a batch of employees"""
+    parsed = parse_employees(items)
+    requested = [user_data['email'] for user_data, _ in parsed]
+    for attempt in range(ALLOCATION_ATTEMPTS):
+        for (user_data, _), email in zip(parsed, requested):
+            user_data['email'] = email
+        try:
+            with allocation_transaction():
+                allocate_emails(parsed)
+                users, details = insert_employees(parsed)
+            break
+        except IntegrityError:
+            # Another request took one of the addresses since the allocation query
+            if attempt == ALLOCATION_ATTEMPTS - 1:
+                raise
+    created(details)
+    return users
+
+
+def employee_summary(user):
+    return {'id': str(user.id), 'email': user.email, 'first_name': user.forename, 'last_name': user.lastname}
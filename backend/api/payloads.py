@@ -0,0 +1,52 @@
+from .conditional import latest_timestamp, make_entry
+from .thumbnails import profile_picture_urls
+
+# Response shapes shared by the sync and async directory views.
+#
+# Both views turn raw PostgREST rows from users/user_details (or the
+# employees fallback table) into the same employee dicts, so the shape is
+# defined once here.
+
+
+def embedded_row(value):
+    """Normalize an embedded PostgREST resource (object or list) to a dict"""
+    if isinstance(value, list):
+        return value[0] if value else {}
+    return value or {}
+
+
+def profile_picture_fields(first_name, details):
+    """Avatar variant URLs when a photo exists, else the stored picture"""
+    urls = profile_picture_urls(first_name)
+    return {
+        'profile_picture': urls['src'] if urls else details.get('profile_picture'),
+        'profile_picture_variants': urls['variants'] if urls else None,
+    }
+
+
+def employee_payload(user, details, office_days_default=None):
+    """Combine a users row and its details row into an employee dict"""
+    return {
+        'id': user.get('id'),
+        'email': user.get('Email'),
+        'first_name': user.get('forename'),
+        'last_name': user.get('lastname'),
+        **profile_picture_fields(user.get('forename'), details),
+        'role': details.get('role'),
+        'location': details.get('location'),
+        'profile_bio': details.get('profile_bio'),
+        'office_days': details.get('office_days', office_days_default),
+        'workload_status': details.get('workload_status'),
+        'today_location': details.get('today_location'),
+        'skills': details.get('skills'),
+        'interests': details.get('interests'),
+        'favorite_recipes': details.get('favorite_recipes'),
+        'recommendations': details.get('recommendations'),
+        'days_with_company': details.get('days_with_company'),
+    }
+
+
+def user_details_entry(user_data, details_data):
+    """Conditional entry for the get_user_details response body"""
+    employee_data = employee_payload(user_data, details_data, office_days_default=[])
+    return make_entry(employee_data, last_modified=latest_timestamp([details_data.get('updated_at')]))
@@ -0,0 +1,156 @@
+import asyncio
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# Presence fan-out for the dashboard.
+#
+# today_location and workload_status change during the day; instead of
+# clients re-polling get_employees, every change is published to a broker
+# that pushes per-employee deltas to connected WebSocket/SSE clients (see
+# api/presence_asgi.py and async_views.presence_stream).
+#
+# Each client has a Subscription that coalesces pending deltas by employee,
+# so a burst of updates to one person goes out as one change, and which is
+# bounded: a client that falls more than MAX_PENDING employees behind is
+# sent a single "resync" message (refetch the directory) instead of an
+# ever-growing backlog. LocalBroker delivers within one process, which is
+# enough for tests and single-node deployments; multi-node deployments can
+# enable the Supabase Realtime bridge on every node or plug in another
+# broker through PRESENCE['BACKEND'].
+
+PRESENCE_FIELDS = ('today_location', 'workload_status')
+
+DEFAULT_PRESENCE = {
+    'BACKEND': 'api.presence.LocalBroker',
+    'FLUSH_INTERVAL': 0.25,
+    'MAX_PENDING': 1000,
+    'HEARTBEAT': 25,
+    'SSE_MAX_AGE': 300,
+    'REALTIME_BRIDGE': False,
+}
+
+
+def presence_settings():
+    return {**DEFAULT_PRESENCE, **getattr(settings, 'PRESENCE', {})}
+
+
+class Subscription:
+    """Coalescing, bounded buffer of presence deltas for one client"""
+
+    def __init__(self, loop, max_pending):
+        self.loop = loop
+        self.max_pending = max_pending
+        self.pending = {}
+        self.overflowed = False
+        self._wakeup = asyncio.Event()
+
+    def offer(self, changes):
+        """Merge (user_id, fields) changes into the buffer; runs on self.loop"""
+        if not self.overflowed:
+            for user_id, fields in changes:
+                if user_id in self.pending:
+                    self.pending[user_id].update(fields)
+                elif len(self.pending) >= self.max_pending:
+                    self.overflowed = True
+                    self.pending.clear()
+                    break
+                else:
+                    self.pending[user_id] = dict(fields)
+        self._wakeup.set()
+
+    def overflow(self):
+        self.overflowed = True
+        self.pending.clear()
+        self._wakeup.set()
+
+    async def next_message(self, flush_interval=0.0):
+        """Wait for pending changes and drain them as one message"""
+        await self._wakeup.wait()
+        if flush_interval:
+            # Let the rest of a burst arrive so it goes out as one message
+            await asyncio.sleep(flush_interval)
+        self._wakeup.clear()
+        if self.overflowed:
+            self.overflowed = False
+            self.pending.clear()
+            return {'type': 'resync'}
+        changes = [{'id': user_id, **fields} for user_id, fields in self.pending.items()]
+        self.pending.clear()
+        return {'type': 'presence', 'changes': changes}
+
+
+class LocalBroker:
+    """In-process broker delivering to subscriptions on any event loop"""
+
+    def __init__(self, max_pending=1000):
+        self.max_pending = max_pending
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        """Register a subscription on the running event loop"""
+        subscription = Subscription(asyncio.get_running_loop(), self.max_pending)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscriptions)
+
+    def _deliver(self, method, *args):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(method(subscription), *args)
+            except RuntimeError:
+                # The subscriber's event loop is gone
+                self.unsubscribe(subscription)
+
+    def publish(self, changes):
+        """Fan (user_id, fields) changes out to every subscription; thread-safe"""
+        if changes:
+            self._deliver(lambda subscription: subscription.offer, changes)
+
+    def resync(self):
+        """Tell every client to refetch, e.g. after a bulk import"""
+        self._deliver(lambda subscription: subscription.overflow)
+
+
+def build_presence_broker():
+    config = presence_settings()
+    return import_string(config['BACKEND'])(max_pending=config['MAX_PENDING'])
+
+
+presence_broker = build_presence_broker()
+
+
+def presence_fields(values):
+    """The presence fields present in a mapping of column values"""
+    return {field: values[field] for field in PRESENCE_FIELDS if field in values}
+
+
+def publish_presence(user_id, values):
+    """Publish the presence fields of one employee's changed columns"""
+    fields = presence_fields(values)
+    if user_id and fields:
+        presence_broker.publish([(str(user_id), fields)])
+
+
+async def iter_messages(subscription):
+    """Messages for a client: coalesced deltas, resyncs and idle heartbeats"""
+    config = presence_settings()
+    while True:
+        try:
+            yield await asyncio.wait_for(
+                subscription.next_message(config['FLUSH_INTERVAL']), timeout=config['HEARTBEAT']
+            )
+        except asyncio.TimeoutError:
+            yield {'type': 'ping'}
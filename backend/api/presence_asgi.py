@@ -0,0 +1,118 @@
+import asyncio
+import json
+import logging
+
+from .cache import directory_cache
+from .office import office_index
+from .presence import presence_broker, presence_settings, iter_messages, publish_presence
+from .supabase_client import get_async_realtime_client
+
+# ASGI side of presence push (see api/presence.py).
+#
+# PresenceRouter wraps the Django ASGI application: WebSocket connections
+# to PRESENCE_WEBSOCKET_PATH get the presence stream, lifespan events start
+# and stop the optional Supabase Realtime bridge, and everything else goes
+# to Django. The bridge subscribes to user_details changes through Supabase
+# Realtime, so edits made outside this process (other nodes, the Supabase
+# dashboard) are pushed and applied to the office index as well; it requires
+# Realtime to be enabled for the user_details table.
+
+logger = logging.getLogger(__name__)
+
+PRESENCE_WEBSOCKET_PATH = '/api/presence/ws/'
+
+
+async def presence_websocket(scope, receive, send):
+    """Push presence messages to one WebSocket client until it disconnects"""
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    await send({'type': 'websocket.accept'})
+
+    subscription = presence_broker.subscribe()
+
+    async def wait_for_disconnect():
+        # Clients do not send anything; drain until they go away
+        while (await receive())['type'] != 'websocket.disconnect':
+            pass
+
+    async def push():
+        async for item in iter_messages(subscription):
+            await send({'type': 'websocket.send', 'text': json.dumps(item)})
+
+    disconnect = asyncio.ensure_future(wait_for_disconnect())
+    sender = asyncio.ensure_future(push())
+    try:
+        # A slow client blocks only its own sender; its subscription keeps
+        # coalescing and falls back to a resync if it gets too far behind.
+        await asyncio.wait({disconnect, sender}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        presence_broker.unsubscribe(subscription)
+        for task in (disconnect, sender):
+            task.cancel()
+        await asyncio.gather(disconnect, sender, return_exceptions=True)
+
+
+class RealtimeBridge:
+    """Republish Supabase Realtime user_details changes to the presence broker"""
+
+    def __init__(self):
+        self.channel = None
+
+    def on_change(self, payload):
+        data = payload.get('data', payload)
+        record = data.get('record') or {}
+        directory_cache.invalidate()
+        if record.get('user_id'):
+            office_index.update(record['user_id'], record.get('office_days'), record.get('location'),
+                                record.get('today_location'))
+        publish_presence(record.get('user_id'), record)
+
+    async def start(self):
+        self.channel = get_async_realtime_client().channel('presence-bridge')
+        for event in ('INSERT', 'UPDATE'):
+            self.channel.on_postgres_changes(event, callback=self.on_change, table='user_details')
+        await self.channel.subscribe()
+        logger.info("Presence bridge subscribed to user_details changes")
+
+    async def stop(self):
+        if self.channel is not None:
+            await get_async_realtime_client().remove_channel(self.channel)
+            self.channel = None
+
+
+class PresenceRouter:
+    """ASGI application routing presence WebSockets and lifespan around Django"""
+
+    def __init__(self, django_application):
+        self.django_application = django_application
+        self.bridge = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] == 'websocket':
+            if scope['path'] == PRESENCE_WEBSOCKET_PATH:
+                return await presence_websocket(scope, receive, send)
+            await send({'type': 'websocket.close', 'code': 4404})
+            return
+        return await self.django_application(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                if presence_settings()['REALTIME_BRIDGE']:
+                    try:
+                        self.bridge = RealtimeBridge()
+                        await self.bridge.start()
+                    except Exception:
+                        # Local (signal) presence still works without the bridge
+                        logger.exception("Could not start the presence bridge")
+                        self.bridge = None
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.bridge is not None:
+                    await self.bridge.stop()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
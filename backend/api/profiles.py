@@ -0,0 +1,102 @@
+import uuid
+
+from django.conf import settings
+
+from .payloads import embedded_row, user_details_entry
+
+# Batch profile lookups for /api/users/details/.
+#
+# Instead of one get_user_details call (and its PostgREST round trips) per
+# profile card, clients send every id at once. Profiles already in the
+# directory cache under get_user_details' `user:<id>` keys are reused; the
+# rest are read with one `in` request on users (embedding user_details) and,
+# only for users without details, one on the employees fallback table. Ids
+# are sent in chunks of PROFILE_CHUNK_SIZE to keep PostgREST URLs short.
+# Each profile has exactly the shape get_user_details returns.
+
+PROFILE_CHUNK_SIZE = 200
+
+
+class ProfileBatchError(ValueError):
+    """Invalid batch profile request"""
+
+
+def parse_ids(values):
+    """Canonical, de-duplicated user ids from lists of (comma-separated) ids"""
+    ids = []
+    for value in values:
+        if not isinstance(value, str):
+            raise ProfileBatchError('ids must be strings')
+        ids.extend(part.strip() for part in value.split(',') if part.strip())
+    if not ids:
+        raise ProfileBatchError('ids is required')
+
+    try:
+        ids = list(dict.fromkeys(str(uuid.UUID(value)) for value in ids))
+    except ValueError:
+        raise ProfileBatchError('ids must be UUIDs')
+
+    max_ids = getattr(settings, 'USER_DETAILS_BATCH_MAX', 500)
+    if len(ids) > max_ids:
+        raise ProfileBatchError(f'At most {max_ids} ids can be requested at once')
+    return ids
+
+
+def cache_key(user_id):
+    return f'user:{user_id}'
+
+
+def chunked(ids):
+    return [ids[start:start + PROFILE_CHUNK_SIZE] for start in range(0, len(ids), PROFILE_CHUNK_SIZE)]
+
+
+def users_requests(supabase, ids):
+    """Unexecuted users requests (embedding user_details) for the ids"""
+    return [supabase.table('users').select('*, user_details(*)').in_('id', chunk) for chunk in chunked(ids)]
+
+
+def employees_requests(supabase, user_ids):
+    """Unexecuted employees fallback requests for users without details"""
+    return [supabase.table('employees').select('*').in_('user_id', chunk) for chunk in chunked(user_ids)]
+
+
+def split_users(user_rows):
+    """(user, details) per user id, and the ids that need the employees fallback"""
+    profiles = {}
+    for user_data in user_rows:
+        details_data = embedded_row(user_data.pop('user_details', None))
+        profiles[str(user_data['id'])] = (user_data, details_data)
+    without_details = [user_id for user_id, (_, details_data) in profiles.items() if not details_data]
+    return profiles, without_details
+
+
+def profile_entries(profiles, employee_rows):
+    """Conditional entries per user id, as get_user_details caches them"""
+    fallback = {}
+    for row in employee_rows:
+        fallback.setdefault(str(row.get('user_id')), row)
+    return {
+        user_id: user_details_entry(user_data, details_data or fallback.get(user_id, {}))
+        for user_id, (user_data, details_data) in profiles.items()
+    }
+
+
+def batch_payload(ids, entries):
+    """Response body: profiles by id in request order, plus the ids without one"""
+    users, missing, incomplete = {}, [], []
+    for user_id in ids:
+        entry = entries.get(user_id)
+        if entry is None:
+            missing.append(user_id)
+        elif not entry['data']['first_name'] or not entry['data']['last_name']:
+            # get_user_details answers these with 404 'Incomplete user data'
+            incomplete.append(user_id)
+        else:
+            users[user_id] = entry['data']
+    return {
+        'users': users,
+        'missing': missing,
+        'incomplete': incomplete,
+        'count': len(users),
+        'status': 'success',
+    }
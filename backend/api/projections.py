@@ -0,0 +1,93 @@
+from django.utils import timezone
+
+from .importers import DETAIL_FIELDS
+from .payloads import profile_picture_fields
+from .thumbnails import photo_names
+
+# Serializer-free payloads for the ORM list endpoints.
+#
+# UserSerializer and UserDetailsSerializer instantiate a serializer, its
+# fields and a model instance per row, which dominates /api/users/,
+# /api/user-details/ and with_details once the directory has thousands of
+# employees. These build the same dicts from one values() query instead;
+# datetimes and UUIDs are formatted the way the serializers format them, so
+# the responses (and their ETags) do not depend on which path built them.
+# Serializers remain in use for single objects and writes.
+
+USER_FIELDS = ('id', 'email', 'forename', 'lastname', 'created_at')
+DETAILS_FIELDS = ('id', *DETAIL_FIELDS, 'created_at', 'updated_at')
+
+
+def iso_datetime(value, tz):
+    """DRF DateTimeField representation of an aware datetime"""
+    if value is None:
+        return None
+    value = value.astimezone(tz).isoformat()
+    return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+
+class _Projection:
+    """Per-request state: the current timezone and profile_picture per first name"""
+
+    def __init__(self):
+        self.tz = timezone.get_current_timezone()
+        self.photos = photo_names()
+        self.pictures = {}
+
+    def picture(self, first_name):
+        if first_name not in self.photos:
+            return None
+        picture = self.pictures.get(first_name)
+        if picture is None:
+            picture = self.pictures[first_name] = profile_picture_fields(first_name, {})['profile_picture']
+        return picture
+
+    def user(self, values, prefix=''):
+        return {
+            'id': str(values[f'{prefix}id']),
+            'email': values[f'{prefix}email'],
+            'first_name': values[f'{prefix}forename'],
+            'last_name': values[f'{prefix}lastname'],
+            'profile_picture': self.picture(values[f'{prefix}forename']),
+            'created_at': iso_datetime(values[f'{prefix}created_at'], self.tz),
+        }
+
+    def details(self, values, user, prefix=''):
+        return {
+            'id': str(values[f'{prefix}id']),
+            'user': user,
+            **{name: values[f'{prefix}{name}'] for name in DETAIL_FIELDS},
+            'created_at': iso_datetime(values[f'{prefix}created_at'], self.tz),
+            'updated_at': iso_datetime(values[f'{prefix}updated_at'], self.tz),
+        }
+
+
+def user_rows(queryset):
+    """UserSerializer(many=True).data for a User queryset"""
+    projection = _Projection()
+    return [projection.user(values) for values in queryset.values(*USER_FIELDS).iterator()]
+
+
+def user_details_rows(queryset):
+    """UserDetailsSerializer(many=True).data for a UserDetails queryset"""
+    projection = _Projection()
+    fields = DETAILS_FIELDS + tuple(f'user__{name}' for name in USER_FIELDS)
+    return [
+        projection.details(values, projection.user(values, 'user__'))
+        for values in queryset.values(*fields).iterator()
+    ]
+
+
+def users_with_details_rows(queryset):
+    """UserViewSet.with_details payload: each user with its details (or None)"""
+    projection = _Projection()
+    fields = USER_FIELDS + tuple(f'details__{name}' for name in DETAILS_FIELDS)
+    rows = []
+    for values in queryset.values(*fields).iterator():
+        user = projection.user(values)
+        details = None
+        if values['details__id'] is not None:
+            # UserDetailsSerializer nests its own copy of the user
+            details = projection.details(values, dict(user), 'details__')
+        rows.append({**user, 'details': details})
+    return rows
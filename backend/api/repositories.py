@@ -0,0 +1,209 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.utils.module_loading import import_string
+
+from .importers import DETAIL_FIELDS
+from .models import User
+from .payloads import embedded_row, user_details_entry
+from .profiles import chunked, employees_requests, profile_entries, split_users, users_requests
+from .supabase_client import get_async_supabase_client, get_supabase_client
+
+# Data access for the employee directory reads.
+#
+# get_employees, get_user_details and the batch profile endpoint (sync and
+# async) read through the repository configured by
+# settings.DIRECTORY_REPOSITORY. RestRepository goes through PostgREST with
+# the Supabase API key and works wherever the database itself is not
+# reachable. OrmRepository reads the same tables through Django's database
+# connection, each page or profile lookup being one SQL join of users and
+# user_details without the HTTP hop and PostgREST's JSON encoding. Like
+# api/projections.py it reads the joined columns with values() rather than
+# model instances (select_related('details')), which would cost more than
+# the query itself. Both build their entries from rows of the same
+# shape with the helpers in api/directory.py, api/payloads.py and
+# api/profiles.py, so responses, ETags and cache keys do not depend on the
+# backend; tests/test_repositories.py checks that and
+# benchmarks/repositories.py compares their latency.
+#
+# The employees fallback table for users without details has no Django
+# model, so OrmRepository returns those profiles with empty details.
+
+DEFAULT_DIRECTORY_REPOSITORY = 'api.repositories.RestRepository'
+
+# PostgREST users column -> User field
+USER_COLUMNS = {'id': 'id', 'Email': 'email', 'forename': 'forename', 'lastname': 'lastname'}
+
+
+class DirectoryRepository:
+    """Directory reads returning conditional entries (see api/conditional.py)"""
+
+    def employees_page(self, query):
+        """Entry for one page of the directory described by an EmployeeQuery"""
+        raise NotImplementedError
+
+    def user_profile(self, user_id):
+        """Entry for one employee profile, or None if the user is unknown"""
+        raise NotImplementedError
+
+    def profiles(self, ids):
+        """Entries by user id for the known users among ids"""
+        raise NotImplementedError
+
+    async def aemployees_page(self, query):
+        return await sync_to_async(self.employees_page)(query)
+
+    async def auser_profile(self, user_id):
+        return await sync_to_async(self.user_profile)(user_id)
+
+    async def aprofiles(self, ids):
+        return await sync_to_async(self.profiles)(ids)
+
+
+class RestRepository(DirectoryRepository):
+    """Reads through PostgREST with the sync or async Supabase client"""
+
+    def employees_page(self, query):
+        supabase = get_supabase_client()
+        response = query.build(supabase).execute()
+        return query.page_entry(response.data)
+
+    def user_profile(self, user_id):
+        supabase = get_supabase_client()
+
+        # Fetch the user and its user_details row in a single round trip
+        user_response = supabase.table('users').select('*, user_details(*)').eq('id', user_id).execute()
+
+        if not user_response.data:
+            return None
+
+        user_data = user_response.data[0]
+        details_data = embedded_row(user_data.pop('user_details', None))
+
+        # If no details found, try to get basic info from employees endpoint
+        if not details_data:
+            employees_response = supabase.table('employees').select('*').eq('user_id', user_id).execute()
+            if employees_response.data:
+                details_data = employees_response.data[0]
+
+        return user_details_entry(user_data, details_data)
+
+    def profiles(self, ids):
+        supabase = get_supabase_client()
+        user_rows = [row for request in users_requests(supabase, ids) for row in request.execute().data]
+        profiles, without_details = split_users(user_rows)
+        employee_rows = [row for request in employees_requests(supabase, without_details)
+                         for row in request.execute().data]
+        return profile_entries(profiles, employee_rows)
+
+    async def aemployees_page(self, query):
+        supabase = await get_async_supabase_client()
+        response = await query.build(supabase).execute()
+        return query.page_entry(response.data)
+
+    async def auser_profile(self, user_id):
+        supabase = await get_async_supabase_client()
+        user_response = await supabase.table('users').select('*, user_details(*)').eq('id', user_id).execute()
+
+        if not user_response.data:
+            return None
+
+        user_data = user_response.data[0]
+        details_data = embedded_row(user_data.pop('user_details', None))
+
+        # If no details found, try to get basic info from employees endpoint
+        if not details_data:
+            employees_response = await supabase.table('employees').select('*').eq('user_id', user_id).execute()
+            if employees_response.data:
+                details_data = employees_response.data[0]
+
+        return user_details_entry(user_data, details_data)
+
+    async def aprofiles(self, ids):
+        # The batched in() requests run concurrently
+        supabase = await get_async_supabase_client()
+        responses = await asyncio.gather(*(request.execute() for request in users_requests(supabase, ids)))
+        profiles, without_details = split_users([row for response in responses for row in response.data])
+        responses = await asyncio.gather(*(request.execute()
+                                           for request in employees_requests(supabase, without_details)))
+        return profile_entries(profiles, [row for response in responses for row in response.data])
+
+
+def _rows(users, user_fields, detail_fields):
+    """PostgREST-shaped users rows, with user_details embedded, from one values() query"""
+    fields = list(user_fields)
+    if detail_fields is not None:
+        fields += ['details__id', 'details__updated_at', *(f'details__{name}' for name in detail_fields)]
+    rows = []
+    for values in users.values(*fields).iterator(chunk_size=2000):
+        row = {column: values[name] for column, name in USER_COLUMNS.items() if name in user_fields}
+        row['id'] = str(values['id'])
+        if detail_fields is not None and values['details__id'] is not None:
+            row['user_details'] = {
+                'user_id': row['id'],
+                'updated_at': values['details__updated_at'],
+                **{name: values[f'details__{name}'] for name in detail_fields},
+            }
+        rows.append(row)
+    return rows
+
+
+class OrmRepository(DirectoryRepository):
+    """Reads users joined to user_details through the Django ORM"""
+
+    def employees_page(self, query):
+        user_columns = query.columns('users')
+        detail_columns = query.columns('user_details')
+        # The same columns the PostgREST select reads
+        if user_columns is None:
+            user_columns = USER_COLUMNS
+        user_fields = list(dict.fromkeys(['id', *(USER_COLUMNS[column] for column in user_columns)]))
+        detail_fields = None
+        if query.embeds_details:
+            detail_fields = DETAIL_FIELDS if detail_columns is None else detail_columns
+
+        # Filtering on details turns the outer join into an inner one, as !inner does
+        users = User.objects.all()
+        for name, values in query.filters.items():
+            users = users.filter(**{f'details__{name}__in': values})
+        if query.office_days:
+            if connection.features.supports_json_field_contains:
+                users = users.filter(details__office_days__contains=query.office_days)
+            else:
+                # SQLite has no JSON containment: match each day in the array's text
+                for day in query.office_days:
+                    users = users.filter(details__office_days__icontains=json.dumps(day))
+        if query.after is not None:
+            users = users.filter(id__gt=query.after)
+        if query.limit is not None:
+            # One extra row tells whether there is a next page
+            users = users.order_by('id')[:query.limit + 1]
+        return query.page_entry(_rows(users, user_fields, detail_fields))
+
+    def user_profile(self, user_id):
+        try:
+            rows = _rows(User.objects.filter(id=user_id), USER_COLUMNS.values(), DETAIL_FIELDS)
+        except ValidationError:
+            # Not a UUID, so not a user
+            return None
+        if not rows:
+            return None
+        return user_details_entry(rows[0], rows[0].pop('user_details', {}))
+
+    def profiles(self, ids):
+        user_rows = [row for chunk in chunked(ids)
+                     for row in _rows(User.objects.filter(id__in=chunk), USER_COLUMNS.values(), DETAIL_FIELDS)]
+        profiles, _ = split_users(user_rows)
+        return profile_entries(profiles, [])
+
+
+def build_directory_repository():
+    """Build the repository named by settings.DIRECTORY_REPOSITORY"""
+    return import_string(getattr(settings, 'DIRECTORY_REPOSITORY', DEFAULT_DIRECTORY_REPOSITORY))()
+
+
+directory_repository = build_directory_repository()
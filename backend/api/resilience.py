@@ -0,0 +1,371 @@
+import asyncio
+import random
+import threading
+import time
+
+import httpx
+from django.conf import settings
+
+from .timing import classify_request, metrics
+
+# Deadlines, retries and circuit breaking for every Supabase call.
+#
+# ResilientTransport wraps the httpx transports of the shared Supabase
+# clients (see api/supabase_client.py), so every PostgREST `.execute()` and
+# every GoTrue call made by the views goes through it:
+#
+# - Each call gets a deadline covering all of its attempts: READ_DEADLINE
+#   for GET/HEAD, WRITE_DEADLINE otherwise, or DEADLINES['<upstream>:<op>']
+#   for one operation (e.g. 'postgrest:GET users', 'auth:POST token').
+#   Attempts run with their timeouts clamped to the time left.
+# - Idempotent reads are retried on connection errors, timeouts and
+#   502/503/504 answers, with full-jitter exponential backoff. Writes are
+#   only retried when the request was never sent. Retries draw on a per-
+#   upstream budget that earns RETRY_BUDGET_RATIO tokens per call, so an
+#   upstream in trouble sees at most ~20% extra load instead of a retry
+#   storm. A 502/503/504 answer that is given up on raises UpstreamError,
+#   like any other transport failure.
+# - After BREAKER_FAILURES consecutive failed attempts an upstream's circuit
+#   opens. Calls then fail immediately with UpstreamUnavailable until
+#   BREAKER_RESET seconds have passed and a single probe call succeeds.
+#   Directory reads fall back to their last good payload meanwhile (see
+#   api/cache.py); otherwise the views answer upstream failures with 503.
+#
+# Breaker state is served by /api/upstreams/ and exported as the
+# upstream_circuit_state gauge on /api/metrics/.
+
+DEFAULT_RESILIENCE = {
+    'READ_DEADLINE': 5.0,
+    'WRITE_DEADLINE': 10.0,
+    'DEADLINES': {},
+    'RETRY_ATTEMPTS': 2,
+    'RETRY_BACKOFF': 0.05,
+    'RETRY_BACKOFF_MAX': 1.0,
+    'RETRY_BUDGET_RATIO': 0.2,
+    'RETRY_BUDGET_MAX': 10.0,
+    'BREAKER_FAILURES': 5,
+    'BREAKER_RESET': 30.0,
+}
+
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+RETRYABLE_STATUS = frozenset({502, 503, 504})
+# Failures that happen before any byte of the request is sent
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+STATE_VALUES = {'closed': 0, 'half_open': 1, 'open': 2}
+
+metrics.describe('upstream_circuit_state', 'Circuit breaker state per upstream (0 closed, 1 half-open, 2 open)')
+
+
+def resilience_settings():
+    return {**DEFAULT_RESILIENCE, **getattr(settings, 'SUPABASE_RESILIENCE', {})}
+
+
+class UpstreamUnavailable(httpx.TransportError):
+    """Call rejected without contacting the upstream because its circuit is open"""
+
+    def __init__(self, upstream, retry_after, request=None):
+        super().__init__(f'{upstream} is unavailable (circuit open, retry in {retry_after:.0f}s)', request=request)
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(httpx.TimeoutException):
+    """The call's deadline passed before another attempt could be made"""
+
+
+class UpstreamError(httpx.TransportError):
+    """The upstream kept answering 502/503/504"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open probe"""
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self.rejected = 0
+        self._probing = False
+        self._lock = threading.Lock()
+        self._publish()
+
+    def _publish(self):
+        metrics.set_gauge('upstream_circuit_state', STATE_VALUES[self.state], upstream=self.name)
+
+    def _set_state(self, state):
+        self.state = state
+        self._publish()
+
+    def retry_after(self):
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def allow(self):
+        """Whether a call may go out now; in half-open state only one probe may"""
+        with self._lock:
+            if self.state == 'open':
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    return False
+                self._set_state('half_open')
+                self._probing = False
+            if self.state == 'half_open':
+                if self._probing:
+                    self.rejected += 1
+                    return False
+                self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            if self.state != 'closed':
+                self.opened_at = None
+                self._set_state('closed')
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == 'half_open' or (self.state == 'closed' and self.failures >= self.failure_threshold):
+                self.opened_at = time.monotonic()
+                self.times_opened += 1
+                self._set_state('open')
+
+    def release(self):
+        """Let another probe through after one ended without an outcome"""
+        with self._lock:
+            self._probing = False
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'consecutive_failures': self.failures,
+            'retry_after': round(self.retry_after(), 1) if self.state == 'open' else None,
+            'times_opened': self.times_opened,
+            'rejected': self.rejected,
+        }
+
+
+class RetryBudget:
+    """Token bucket that caps retries at a fraction of the calls made"""
+
+    def __init__(self, ratio=0.2, max_tokens=10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.retries = 0
+        self.denied = 0
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            if self.tokens < 1:
+                self.denied += 1
+                return False
+            self.tokens -= 1
+            self.retries += 1
+            return True
+
+    def stats(self):
+        return {'tokens': round(self.tokens, 2), 'retries': self.retries, 'denied': self.denied}
+
+
+class Upstream:
+    """Breaker and retry budget shared by all calls to one upstream"""
+
+    def __init__(self, name, config):
+        self.name = name
+        self.breaker = CircuitBreaker(name, config['BREAKER_FAILURES'], config['BREAKER_RESET'])
+        self.budget = RetryBudget(config['RETRY_BUDGET_RATIO'], config['RETRY_BUDGET_MAX'])
+
+
+_upstreams = {}
+_upstreams_lock = threading.Lock()
+
+
+def get_upstream(name):
+    upstream = _upstreams.get(name)
+    if upstream is None:
+        with _upstreams_lock:
+            upstream = _upstreams.get(name)
+            if upstream is None:
+                upstream = _upstreams[name] = Upstream(name, resilience_settings())
+    return upstream
+
+
+def upstream_status():
+    """Breaker and retry budget state of every upstream called so far"""
+    return {
+        name: {**upstream.breaker.stats(), 'retry_budget': upstream.budget.stats()}
+        for name, upstream in sorted(_upstreams.items())
+    }
+
+
+def reset_upstreams():
+    with _upstreams_lock:
+        _upstreams.clear()
+
+
+def upstream_failure(exc):
+    """The UpstreamUnavailable or other transport error behind an exception, if any"""
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        if isinstance(exc, httpx.TransportError):
+            return exc
+        seen.add(id(exc))
+        exc = exc.__cause__ or exc.__context__
+    return None
+
+
+def unavailable_payload(failure):
+    """503 body and headers for a call that failed upstream"""
+    headers = {}
+    if isinstance(failure, UpstreamUnavailable):
+        headers['Retry-After'] = str(max(1, round(failure.retry_after)))
+    return {
+        'error': 'Upstream unavailable',
+        'details': str(failure),
+        'status': 'failed'
+    }, headers
+
+
+class UpstreamCall:
+    """Retry, deadline and breaker bookkeeping for one upstream request"""
+
+    def __init__(self, request, config):
+        self.request = request
+        self.config = config
+        name, operation = classify_request(request)
+        self.upstream = get_upstream(name)
+        self.idempotent = request.method in IDEMPOTENT_METHODS
+        deadline = config['DEADLINES'].get(f'{name}:{operation}')
+        if deadline is None:
+            deadline = config['READ_DEADLINE'] if self.idempotent else config['WRITE_DEADLINE']
+        self.deadline = time.monotonic() + deadline
+        self.attempt = 0
+
+    def start(self):
+        breaker = self.upstream.breaker
+        if not breaker.allow():
+            raise UpstreamUnavailable(self.upstream.name, breaker.retry_after(), request=self.request)
+        self.upstream.budget.deposit()
+
+    def before_attempt(self):
+        """Clamp the attempt's timeouts to the time left before the deadline"""
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded(f'{self.upstream.name} deadline exceeded', request=self.request)
+        timeouts = self.request.extensions.get('timeout') or dict.fromkeys(('connect', 'read', 'write', 'pool'))
+        self.request.extensions['timeout'] = {
+            phase: remaining if value is None else min(value, remaining) for phase, value in timeouts.items()
+        }
+        self.attempt += 1
+
+    def _backoff(self):
+        """Delay before the next attempt, or None if the call should not be retried"""
+        if self.attempt > self.config['RETRY_ATTEMPTS'] or self.upstream.breaker.state != 'closed':
+            return None
+        cap = min(self.config['RETRY_BACKOFF_MAX'], self.config['RETRY_BACKOFF'] * 2 ** (self.attempt - 1))
+        delay = random.uniform(0, cap)
+        if time.monotonic() + delay >= self.deadline or not self.upstream.budget.withdraw():
+            return None
+        return delay
+
+    def after_response(self, response):
+        """Delay before retrying a 502/503/504 answer; raises UpstreamError when giving up"""
+        if response.status_code not in RETRYABLE_STATUS:
+            self.upstream.breaker.record_success()
+            return None
+        self.upstream.breaker.record_failure()
+        delay = self._backoff() if self.idempotent else None
+        if delay is None:
+            raise UpstreamError(f'{self.upstream.name} answered {response.status_code} '
+                                f'after {self.attempt} attempt(s)', request=self.request)
+        return delay
+
+    def after_error(self, error):
+        self.upstream.breaker.record_failure()
+        if self.idempotent or isinstance(error, NOT_SENT_ERRORS):
+            return self._backoff()
+        return None
+
+
+class ResilientTransport(httpx.BaseTransport):
+    """httpx transport applying deadlines, retries and the circuit breaker"""
+
+    def __init__(self, transport):
+        self._transport = transport
+        self.config = resilience_settings()
+
+    def handle_request(self, request):
+        call = UpstreamCall(request, self.config)
+        call.start()
+        try:
+            while True:
+                call.before_attempt()
+                try:
+                    response = self._transport.handle_request(request)
+                except httpx.TransportError as e:
+                    delay = call.after_error(e)
+                    if delay is None:
+                        raise
+                    time.sleep(delay)
+                    continue
+                if response.status_code not in RETRYABLE_STATUS:
+                    call.after_response(response)
+                    return response
+                response.close()
+                time.sleep(call.after_response(response))
+        except BaseException:
+            call.upstream.breaker.release()
+            raise
+
+    def close(self):
+        self._transport.close()
+
+
+class ResilientAsyncTransport(httpx.AsyncBaseTransport):
+    """Async httpx transport applying deadlines, retries and the circuit breaker"""
+
+    def __init__(self, transport):
+        self._transport = transport
+        self.config = resilience_settings()
+
+    async def handle_async_request(self, request):
+        call = UpstreamCall(request, self.config)
+        call.start()
+        try:
+            while True:
+                call.before_attempt()
+                try:
+                    response = await self._transport.handle_async_request(request)
+                except httpx.TransportError as e:
+                    delay = call.after_error(e)
+                    if delay is None:
+                        raise
+                    await asyncio.sleep(delay)
+                    continue
+                if response.status_code not in RETRYABLE_STATUS:
+                    call.after_response(response)
+                    return response
+                await response.aclose()
+                await asyncio.sleep(call.after_response(response))
+        except BaseException:
+            # e.g. a cancelled request: do not leave a half-open probe pending
+            call.upstream.breaker.release()
+            raise
+
+    async def aclose(self):
+        await self._transport.aclose()
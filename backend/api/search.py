@@ -0,0 +1,276 @@
+import bisect
+import heapq
+import html
+import re
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+
+from .indexes import InMemoryIndex
+from .models import UserDetails
+
+# Full-text search over the free-text profile columns.
+#
+# On PostgreSQL the user_details_search table (migration 0006) holds a
+# weighted tsvector per employee: skills (A), interests (B), profile_bio (C)
+# and recommendations (D), kept current by a trigger and served by a GIN
+# index. A query becomes a prefix tsquery (`pyth dja` -> `pyth:* & dja:*`),
+# matches are ranked with ts_rank_cd and only the returned page gets
+# ts_headline snippets. Other databases (SQLite in development and the
+# benchmarks) use SearchIndex, an in-process inverted index with the same
+# weights and prefix semantics, kept current by the UserDetails signals.
+#
+# Snippets come back as HTML with the matched words in <mark> and all
+# profile text escaped, so clients can render them as they are.
+
+SEARCH_FIELDS = ('skills', 'interests', 'profile_bio', 'recommendations')
+
+# Same relative weights as ts_rank_cd's defaults for the A-D labels
+FIELD_WEIGHTS = {'skills': 1.0, 'interests': 0.4, 'profile_bio': 0.2, 'recommendations': 0.1}
+
+MAX_TERMS = 8
+SNIPPET_WORDS = 12
+
+# Highlight delimiters: control characters that cannot occur in profile text
+START_SEL, STOP_SEL = '\x02', '\x03'
+
+_TOKEN = re.compile(r'[^\W_]+')
+
+
+class SearchQueryError(ValueError):
+    """Invalid search query parameter"""
+
+
+def query_terms(text):
+    """Lowercased search terms of a query string"""
+    terms = list(dict.fromkeys(_TOKEN.findall((text or '').lower())))
+    if not terms:
+        raise SearchQueryError('q must contain at least one word')
+    if len(terms) > MAX_TERMS:
+        raise SearchQueryError(f'q must not contain more than {MAX_TERMS} words')
+    return terms
+
+
+def highlight_html(snippet):
+    """Escape a delimited snippet and turn the delimiters into <mark> tags"""
+    escaped = html.escape(snippet)
+    return escaped.replace(START_SEL, '<mark>').replace(STOP_SEL, '</mark>')
+
+
+def search_result(user_id, first_name, last_name, email, role, location, rank, snippets):
+    return {
+        'id': str(user_id),
+        'first_name': first_name,
+        'last_name': last_name,
+        'email': email,
+        'role': role,
+        'location': location,
+        'rank': round(float(rank), 4),
+        'highlights': {field: highlight_html(snippet) for field, snippet in snippets.items() if snippet},
+    }
+
+
+# ===== POSTGRESQL =====
+
+HEADLINE_OPTIONS = (
+    f'StartSel={START_SEL}, StopSel={STOP_SEL}, MaxWords={SNIPPET_WORDS}, MinWords=4, '
+    'MaxFragments=2, FragmentDelimiter=" … "'
+)
+
+SEARCH_SQL = """
+WITH query AS (
+    SELECT to_tsquery('english', %(tsquery)s) AS q
+), ranked AS (
+    SELECT s.user_details_id, ts_rank_cd(s.document, query.q) AS rank
+    FROM user_details_search s, query
+    WHERE s.document @@ query.q
+    ORDER BY rank DESC, s.user_details_id
+    LIMIT %(limit)s
+)
+SELECT d.user_id, u.forename, u.lastname, u."Email", d.role, d.location, ranked.rank, {headlines}
+FROM ranked
+JOIN user_details d ON d.id = ranked.user_details_id
+JOIN users u ON u.id = d.user_id
+CROSS JOIN query
+ORDER BY ranked.rank DESC, ranked.user_details_id
+""".format(headlines=', '.join(
+    f"CASE WHEN to_tsvector('english', coalesce(d.{field}, '')) @@ query.q "
+    f"THEN ts_headline('english', d.{field}, query.q, %(options)s) END"
+    for field in SEARCH_FIELDS
+))
+
+
+def search_postgres(terms, limit):
+    tsquery = ' & '.join(f'{term}:*' for term in terms)
+    with connection.cursor() as cursor:
+        cursor.execute(SEARCH_SQL, {'tsquery': tsquery, 'limit': limit, 'options': HEADLINE_OPTIONS})
+        rows = cursor.fetchall()
+    return [
+        search_result(*row[:7], dict(zip(SEARCH_FIELDS, row[7:])))
+        for row in rows
+    ]
+
+
+# ===== IN-PROCESS FALLBACK =====
+
+class SearchIndex(InMemoryIndex):
+    """In-memory inverted index of the profile text with prefix lookups"""
+
+    def _reset(self):
+        self._documents = {}
+        self._postings = defaultdict(dict)
+        self._terms = []
+        # token -> user ids by descending score, built on demand
+        self._ranked = {}
+
+    def _add(self, row, new_terms):
+        user_id = str(row['user_id'])
+        self._documents[user_id] = row
+        scores = defaultdict(float)
+        for field in SEARCH_FIELDS:
+            for token in _TOKEN.findall((row.get(field) or '').lower()):
+                scores[token] += FIELD_WEIGHTS[field]
+        for token, score in scores.items():
+            if token not in self._postings:
+                new_terms.add(token)
+            self._postings[token][user_id] = score
+            self._ranked.pop(token, None)
+
+    def _discard(self, user_id):
+        row = self._documents.pop(user_id, None)
+        if row is None:
+            return
+        for field in SEARCH_FIELDS:
+            for token in _TOKEN.findall((row.get(field) or '').lower()):
+                postings = self._postings.get(token)
+                if postings is not None:
+                    postings.pop(user_id, None)
+                    self._ranked.pop(token, None)
+
+    def rebuild(self, rows):
+        """Replace the index with user_details rows joined with their user"""
+        with self._lock:
+            self._reset()
+            new_terms = set()
+            for row in rows:
+                self._add(row, new_terms)
+            self._terms = sorted(self._postings)
+            self.built_at = time.monotonic()
+
+    def update(self, row):
+        """Re-index one employee after a change"""
+        if not self.is_built:
+            return
+        with self._lock:
+            self._discard(str(row['user_id']))
+            new_terms = set()
+            self._add(row, new_terms)
+            for term in new_terms:
+                bisect.insort(self._terms, term)
+
+    def remove(self, user_id):
+        if not self.is_built:
+            return
+        with self._lock:
+            self._discard(str(user_id))
+
+    def _expand(self, prefix):
+        """Indexed terms starting with a prefix, from the sorted vocabulary"""
+        start = bisect.bisect_left(self._terms, prefix)
+        end = bisect.bisect_left(self._terms, prefix + '\uffff')
+        return self._terms[start:end]
+
+    def _term_scores(self, term):
+        tokens = self._expand(term)
+        if len(tokens) == 1:
+            return self._postings[tokens[0]]
+        scores = {}
+        for token in tokens:
+            for user_id, score in self._postings[token].items():
+                scores[user_id] = scores.get(user_id, 0.0) + score
+        return scores
+
+    def search(self, terms, limit):
+        """Top `limit` employees matching every term as a prefix"""
+        with self._lock:
+            if len(terms) == 1:
+                tokens = self._expand(terms[0])
+                if len(tokens) == 1:
+                    # One token: its postings sorted by score are the answer
+                    postings = self._postings[tokens[0]]
+                    ranked = self._ranked.get(tokens[0])
+                    if ranked is None:
+                        ranked = self._ranked[tokens[0]] = sorted(postings, key=postings.__getitem__, reverse=True)
+                    return [(self._documents[user_id], postings[user_id]) for user_id in ranked[:limit]]
+
+            # Intersect starting from the most selective term
+            per_term = sorted((self._term_scores(term) for term in terms), key=len)
+            scores = per_term[0]
+            for other in per_term[1:]:
+                scores = {user_id: score + other[user_id] for user_id, score in scores.items() if user_id in other}
+                if not scores:
+                    break
+            top = heapq.nlargest(limit, scores, key=scores.__getitem__)
+            return [(self._documents[user_id], scores[user_id]) for user_id in top]
+
+
+search_index = SearchIndex(ttl=getattr(settings, 'EMPLOYEE_SEARCH_INDEX_TTL', 300))
+
+INDEX_VALUES = ('user_id', 'user__forename', 'user__lastname', 'user__email', 'role', 'location') + SEARCH_FIELDS
+
+
+def index_row(values):
+    """Index row from UserDetails values() or a saved instance"""
+    return {
+        'user_id': str(values['user_id']),
+        'forename': values['user__forename'],
+        'lastname': values['user__lastname'],
+        'email': values['user__email'],
+        **{name: values[name] for name in ('role', 'location') + SEARCH_FIELDS},
+    }
+
+
+def instance_row(instance):
+    user = instance.user
+    return index_row({
+        'user_id': instance.user_id, 'user__forename': user.forename, 'user__lastname': user.lastname,
+        'user__email': user.email, **{name: getattr(instance, name) for name in ('role', 'location') + SEARCH_FIELDS},
+    })
+
+
+def load_index_rows():
+    return [index_row(values) for values in UserDetails.objects.values(*INDEX_VALUES).iterator()]
+
+
+def snippet(text, terms):
+    """Window of words around the first match, matched tokens wrapped in the delimiters"""
+    def mark(match):
+        token = match.group(0)
+        return f'{START_SEL}{token}{STOP_SEL}' if token.lower().startswith(terms) else token
+
+    words = (text or '').split()
+    marked = [_TOKEN.sub(mark, word) for word in words]
+    hits = [START_SEL in word for word in marked]
+    if not any(hits):
+        return None
+    start = max(0, hits.index(True) - SNIPPET_WORDS // 3)
+    end = min(len(words), start + SNIPPET_WORDS)
+    return ('… ' if start else '') + ' '.join(marked[start:end]) + (' …' if end < len(words) else '')
+
+
+def search_fallback(terms, limit):
+    search_index.ensure_fresh(load_index_rows)
+    return [
+        search_result(row['user_id'], row['forename'], row['lastname'], row['email'], row['role'],
+                      row['location'], score, {field: snippet(row.get(field), tuple(terms)) for field in SEARCH_FIELDS})
+        for row, score in search_index.search(terms, limit)
+    ]
+
+
+def find_employees(terms, limit):
+    """Ranked employees matching every term, with highlighted snippets"""
+    if connection.vendor == 'postgresql':
+        return search_postgres(terms, limit)
+    return search_fallback(terms, limit)
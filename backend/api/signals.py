@@ -0,0 +1,102 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import directory_cache
+from .models import EmployeeTombstone, User, UserDetails
+from .office import office_index
+from .presence import PRESENCE_FIELDS, publish_presence
+from .search import instance_row, search_index
+from .summary import TRACKED_FIELDS, apply_changes, buckets, reconcile, snapshot
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=UserDetails)
+@receiver(post_delete, sender=UserDetails)
+def invalidate_directory_cache(sender, **kwargs):
+    """Drop cached directory payloads whenever an employee changes"""
+    directory_cache.invalidate()
+
+
+@receiver(post_delete, sender=User)
+def record_tombstone(sender, instance, **kwargs):
+    """Remember deleted employees so delta sync can report them"""
+    # On PostgreSQL the users trigger from migration 0002 has already written
+    # it; this covers other databases and is idempotent.
+    EmployeeTombstone.objects.update_or_create(
+        user_id=instance.id, defaults={'deleted_at': timezone.now()}
+    )
+
+
+@receiver(post_save, sender=UserDetails)
+def push_presence(sender, instance, update_fields=None, **kwargs):
+    """Push today_location/workload_status to connected dashboards"""
+    if update_fields is not None and not set(update_fields) & set(PRESENCE_FIELDS):
+        return
+    publish_presence(instance.user_id, {field: getattr(instance, field) for field in PRESENCE_FIELDS})
+
+
+@receiver(post_save, sender=UserDetails)
+def update_office_index(sender, instance, **kwargs):
+    """Keep the who's-in-the-office index current"""
+    office_index.update(instance.user_id, instance.office_days, instance.location, instance.today_location)
+
+
+@receiver(post_delete, sender=UserDetails)
+def remove_from_office_index(sender, instance, **kwargs):
+    office_index.remove(instance.user_id)
+
+
+@receiver(pre_save, sender=UserDetails)
+def remember_summary_buckets(sender, instance, update_fields=None, **kwargs):
+    """Read the stored buckets of a row about to be updated so the save applies as a difference"""
+    # Reads (list and summary pages included) never pay for this, and saves
+    # that leave the tracked fields alone skip the query too.
+    if instance._state.adding or (update_fields is not None and not set(update_fields) & set(TRACKED_FIELDS)):
+        return
+    stored = sender.objects.filter(pk=instance.pk).values(*TRACKED_FIELDS).first()
+    instance._summary_buckets = buckets(stored) if stored is not None else []
+
+
+@receiver(post_save, sender=UserDetails)
+def update_summary(sender, instance, created, update_fields=None, **kwargs):
+    """Apply a save to the workforce summary counts"""
+    if update_fields is not None and not set(update_fields) & set(TRACKED_FIELDS):
+        return
+    previous = [] if created else instance.__dict__.pop('_summary_buckets', None)
+    current = snapshot(instance)
+    if previous is None or current is None:
+        # Saved with deferred fields: the new buckets are unknown
+        reconcile()
+    else:
+        apply_changes(previous, current)
+
+
+@receiver(post_delete, sender=UserDetails)
+def remove_from_summary(sender, instance, **kwargs):
+    previous = snapshot(instance)
+    if previous is None:
+        reconcile()
+    else:
+        apply_changes(previous, [])
+
+
+@receiver(post_save, sender=UserDetails)
+def update_search_index(sender, instance, **kwargs):
+    """Keep the in-process search index current (non-PostgreSQL databases)"""
+    if search_index.is_built:
+        search_index.update(instance_row(instance))
+
+
+@receiver(post_save, sender=User)
+def update_search_index_names(sender, instance, created, **kwargs):
+    if search_index.is_built and not created:
+        details = UserDetails.objects.filter(user=instance).first()
+        if details is not None:
+            search_index.update(instance_row(details))
+
+
+@receiver(post_delete, sender=UserDetails)
+def remove_from_search_index(sender, instance, **kwargs):
+    search_index.remove(instance.user_id)
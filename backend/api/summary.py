@@ -0,0 +1,116 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F
+
+from .importers import WEEKDAYS
+from .models import UserDetails, WorkforceSummary
+
+# Headcount aggregates behind UserDetailsViewSet.summary.
+#
+# Instead of a count() plus group-bys on every call, the counts live in the
+# workforce_summary table as (dimension, value) -> count rows: the total and
+# one bucket per workload status, location, role and office day. The
+# UserDetails signals apply each save/delete as a handful of +1/-1 updates,
+# so a summary read is one query over the buckets regardless of headcount.
+# Writes that bypass the ORM signals (bulk upserts, PostgREST, the Supabase
+# dashboard) are corrected by reconcile(), run by the reconcile_summary
+# management command and after ORM imports.
+
+DIMENSIONS = ('total', 'workload_status', 'location', 'role', 'office_day')
+
+TRACKED_FIELDS = ('workload_status', 'location', 'role', 'office_days')
+
+# Bucket value standing in for NULL, which cannot be part of a unique key
+NONE_VALUE = ''
+
+# Its key in the distributions: JSON object keys must be strings
+UNSET_KEY = 'unset'
+
+
+def _value(value):
+    return NONE_VALUE if value is None else str(value)
+
+
+def buckets(values):
+    """(dimension, value) buckets one employee counts towards"""
+    keys = [
+        ('total', NONE_VALUE),
+        ('workload_status', _value(values.get('workload_status'))),
+        ('location', _value(values.get('location'))),
+        ('role', _value(values.get('role'))),
+    ]
+    keys.extend(('office_day', day) for day in sorted(set(values.get('office_days') or [])) if day in WEEKDAYS)
+    return keys
+
+
+def snapshot(instance):
+    """Buckets of a loaded UserDetails, or None if a tracked field is deferred"""
+    if any(field not in instance.__dict__ for field in TRACKED_FIELDS):
+        return None
+    return buckets({field: instance.__dict__[field] for field in TRACKED_FIELDS})
+
+
+def compute(details_model):
+    """Bucket counts recomputed from user_details"""
+    counts = Counter()
+    for values in details_model.objects.values(*TRACKED_FIELDS).iterator():
+        counts.update(buckets(values))
+    return counts
+
+
+def apply_changes(removed, added, summary_model=WorkforceSummary):
+    """Move one employee from the `removed` buckets to the `added` ones"""
+    deltas = Counter(added)
+    deltas.subtract(removed)
+    with transaction.atomic():
+        for (dimension, value), delta in sorted(deltas.items()):
+            if not delta:
+                continue
+            rows = summary_model.objects.filter(dimension=dimension, value=value)
+            if not rows.update(count=F('count') + delta):
+                summary_model.objects.get_or_create(dimension=dimension, value=value)
+                rows.update(count=F('count') + delta)
+
+
+def reconcile(details_model=UserDetails, summary_model=WorkforceSummary):
+    """Rewrite the summary from user_details; returns the number of corrected buckets"""
+    with transaction.atomic():
+        expected = compute(details_model)
+        current = {
+            (row.dimension, row.value): row
+            for row in summary_model.objects.select_for_update()
+        }
+        stale = [row for key, row in current.items() if key not in expected]
+        summary_model.objects.filter(pk__in=[row.pk for row in stale]).delete()
+
+        # Emptied buckets are dropped without counting as drift
+        corrected = sum(1 for row in stale if row.count)
+        changed, created = [], []
+        for key, count in expected.items():
+            row = current.get(key)
+            if row is None:
+                created.append(summary_model(dimension=key[0], value=key[1], count=count))
+            elif row.count != count:
+                row.count = count
+                changed.append(row)
+        summary_model.objects.bulk_create(created)
+        summary_model.objects.bulk_update(changed, ['count'])
+        return corrected + len(created) + len(changed)
+
+
+def summary_payload(summary_model=WorkforceSummary):
+    """Summary response body from the aggregate rows"""
+    distributions = {dimension: {} for dimension in DIMENSIONS}
+    for dimension, value, count in summary_model.objects.filter(count__gt=0).values_list(
+            'dimension', 'value', 'count'):
+        distributions[dimension][UNSET_KEY if value == NONE_VALUE else value] = count
+
+    return {
+        'total_users': distributions['total'].get(UNSET_KEY, 0),
+        'workload_distribution': distributions['workload_status'],
+        'location_distribution': distributions['location'],
+        'role_distribution': distributions['role'],
+        'office_day_distribution': {day: distributions['office_day'].get(day, 0) for day in WEEKDAYS},
+        'status': 'success',
+    }
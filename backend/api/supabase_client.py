@@ -0,0 +1,211 @@
+import asyncio
+import os
+import threading
+import weakref
+from typing import TYPE_CHECKING
+
+import httpx
+from django.conf import settings
+
+from .resilience import ResilientAsyncTransport, ResilientTransport, reset_upstreams
+from .timing import TimedAsyncTransport, TimedTransport
+
+if TYPE_CHECKING:
+    from gotrue import AsyncGoTrueClient, SyncGoTrueClient
+    from postgrest import AsyncPostgrestClient, SyncPostgrestClient
+    from realtime import AsyncRealtimeClient
+
+# Process-wide Supabase clients shared by all request threads.
+#
+# The data client and its httpx connection pool are built once per process so
+# PostgREST requests reuse keep-alive connections instead of paying for a new
+# TLS handshake on every call. Auth operations (sign in, get_user, sign out)
+# mutate session state on the client, so every request gets its own
+# lightweight auth client that only shares the underlying connection pool.
+#
+# Async views get the same pair of clients per event loop, because httpx
+# async connection pools cannot be shared across loops.
+#
+# The views only use PostgREST (`.table()`), GoTrue and, for the presence
+# bridge, Realtime, so those sub-clients are built directly instead of a full
+# `supabase.Client`. Each SDK package is imported on first use: importing the
+# `supabase` package pulls in all of them plus storage and functions, which
+# made every worker spawn and manage.py command several hundred ms slower.
+
+_lock = threading.Lock()
+_client = None
+_auth_http_client = None
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_supabase_credentials():
+    """Get Supabase base URL and API key from the environment"""
+    # Get base URL (without any trailing slashes or auth paths)
+    supabase_url = os.getenv('SUPABASE_URL', '').rstrip('/')
+    if supabase_url.endswith('/auth/v1'):
+        supabase_url = supabase_url[:-8]
+
+    supabase_key = os.getenv('SUPABASE_API_KEY')
+    if not supabase_url or not supabase_key:
+        raise ValueError("SUPABASE_URL and SUPABASE_API_KEY must be set")
+
+    return supabase_url, supabase_key
+
+
+def _rest_headers(supabase_key):
+    """Headers supabase.create_client sends to PostgREST with the API key"""
+    return {'apiKey': supabase_key, 'Authorization': f'Bearer {supabase_key}'}
+
+
+def _build_http_client(timeout: float, client_class=httpx.Client):
+    """Build a keep-alive connection pool sized from settings"""
+    pool_size = getattr(settings, 'SUPABASE_POOL_SIZE', 20)
+    limits = httpx.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=pool_size,
+        keepalive_expiry=getattr(settings, 'SUPABASE_POOL_KEEPALIVE', 30.0),
+    )
+    # Every upstream call gets a deadline, retries and a circuit breaker, and
+    # each attempt is timed for Server-Timing and the metrics endpoint
+    if issubclass(client_class, httpx.AsyncClient):
+        transport = ResilientAsyncTransport(TimedAsyncTransport(httpx.AsyncHTTPTransport(limits=limits, http2=True)))
+    else:
+        transport = ResilientTransport(TimedTransport(httpx.HTTPTransport(limits=limits, http2=True)))
+    return client_class(
+        timeout=httpx.Timeout(timeout),
+        transport=transport,
+        follow_redirects=True,
+    )
+
+
+def get_supabase_client() -> 'SyncPostgrestClient':
+    """Get the shared PostgREST client for table queries"""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                from postgrest import SyncPostgrestClient
+
+                supabase_url, supabase_key = get_supabase_credentials()
+                _client = SyncPostgrestClient(
+                    f"{supabase_url}/rest/v1",
+                    headers=_rest_headers(supabase_key),
+                    http_client=_build_http_client(
+                        getattr(settings, 'SUPABASE_POSTGREST_TIMEOUT', 10.0)
+                    ),
+                )
+    return _client
+
+
+def get_auth_client() -> 'SyncGoTrueClient':
+    """Get an isolated per-request auth client on the shared connection pool"""
+    from gotrue import SyncGoTrueClient, SyncMemoryStorage
+    from gotrue.http_clients import SyncClient
+
+    global _auth_http_client
+    supabase_url, supabase_key = get_supabase_credentials()
+    if _auth_http_client is None:
+        with _lock:
+            if _auth_http_client is None:
+                _auth_http_client = _build_http_client(
+                    getattr(settings, 'SUPABASE_AUTH_TIMEOUT', 10.0),
+                    client_class=SyncClient,
+                )
+    return SyncGoTrueClient(
+        url=f"{supabase_url}/auth/v1",
+        headers={
+            'apikey': supabase_key,
+            'Authorization': f'Bearer {supabase_key}',
+        },
+        storage=SyncMemoryStorage(),
+        auto_refresh_token=False,
+        persist_session=False,
+        http_client=_auth_http_client,
+    )
+
+
+class _AsyncClients:
+    """Async data, auth and realtime clients bound to one event loop"""
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.client = None
+        self.auth_http_client = None
+        self.realtime = None
+
+
+def _async_clients_for_loop():
+    loop = asyncio.get_running_loop()
+    clients = _async_clients.get(loop)
+    if clients is None:
+        clients = _async_clients.setdefault(loop, _AsyncClients())
+    return clients
+
+
+async def get_async_supabase_client() -> 'AsyncPostgrestClient':
+    """Get the shared async PostgREST client for the running event loop"""
+    clients = _async_clients_for_loop()
+    if clients.client is None:
+        async with clients.lock:
+            if clients.client is None:
+                from postgrest import AsyncPostgrestClient
+
+                supabase_url, supabase_key = get_supabase_credentials()
+                clients.client = AsyncPostgrestClient(
+                    f"{supabase_url}/rest/v1",
+                    headers=_rest_headers(supabase_key),
+                    http_client=_build_http_client(
+                        getattr(settings, 'SUPABASE_POSTGREST_TIMEOUT', 10.0),
+                        client_class=httpx.AsyncClient,
+                    ),
+                )
+    return clients.client
+
+
+def get_async_auth_client() -> 'AsyncGoTrueClient':
+    """Get an isolated per-request async auth client on the loop's connection pool"""
+    from gotrue import AsyncGoTrueClient, AsyncMemoryStorage
+
+    supabase_url, supabase_key = get_supabase_credentials()
+    clients = _async_clients_for_loop()
+    if clients.auth_http_client is None:
+        clients.auth_http_client = _build_http_client(
+            getattr(settings, 'SUPABASE_AUTH_TIMEOUT', 10.0),
+            client_class=httpx.AsyncClient,
+        )
+    return AsyncGoTrueClient(
+        url=f"{supabase_url}/auth/v1",
+        headers={
+            'apikey': supabase_key,
+            'Authorization': f'Bearer {supabase_key}',
+        },
+        storage=AsyncMemoryStorage(),
+        auto_refresh_token=False,
+        persist_session=False,
+        http_client=clients.auth_http_client,
+    )
+
+
+def get_async_realtime_client() -> 'AsyncRealtimeClient':
+    """Get the Realtime client for the running event loop; it connects on first subscribe"""
+    from realtime import AsyncRealtimeClient
+
+    clients = _async_clients_for_loop()
+    if clients.realtime is None:
+        supabase_url, supabase_key = get_supabase_credentials()
+        clients.realtime = AsyncRealtimeClient(f"{supabase_url}/realtime/v1", token=supabase_key)
+    return clients.realtime
+
+
+def reset_supabase_clients():
+    """Close the shared clients so the next call rebuilds them"""
+    global _client, _auth_http_client
+    reset_upstreams()
+    with _lock:
+        if _client is not None:
+            _client.session.close()
+        if _auth_http_client is not None:
+            _auth_http_client.close()
+        _client = None
+        _auth_http_client = None
+        _async_clients.clear()
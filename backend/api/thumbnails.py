@@ -0,0 +1,152 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+
+from django.conf import settings
+
+# Avatar variants for the portraits in user_photos/.
+#
+# Originals are multi-megabyte PNGs, so fixed-size WebP/JPEG variants are
+# generated from them and stored under THUMBNAIL_ROOT, named after the
+# original's content hash. Because a changed photo gets a new hash, variant
+# URLs never change content and can be served with immutable cache headers.
+# Variants are built by `manage.py generate_thumbnails` or lazily on the
+# first request for them.
+
+AVATAR_SIZES = (48, 96, 192)
+DEFAULT_SIZE = 96
+FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 82, 'method': 4}),
+    'jpeg': ('JPEG', 'image/jpeg', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+DEFAULT_FORMAT = 'webp'
+PHOTO_SUFFIX = '.png'
+
+_valid_name = re.compile(r'^[\w-]+$')
+_digests = {}
+_digests_lock = threading.Lock()
+
+
+def photos_dir() -> Path:
+    return Path(getattr(settings, 'USER_PHOTOS_DIR', settings.BASE_DIR.parent / 'user_photos'))
+
+
+def thumbnail_root() -> Path:
+    return Path(getattr(settings, 'THUMBNAIL_ROOT', settings.BASE_DIR / 'thumbnails'))
+
+
+def source_path(name):
+    """Path of the original photo for a name, or None if there is none"""
+    if not name or not _valid_name.match(name):
+        return None
+    path = photos_dir() / f"{name}{PHOTO_SUFFIX}"
+    return path if path.is_file() else None
+
+
+def photo_names():
+    """Names with an original photo, from a single directory listing"""
+    try:
+        with os.scandir(photos_dir()) as entries:
+            return {
+                entry.name[:-len(PHOTO_SUFFIX)] for entry in entries
+                if entry.name.endswith(PHOTO_SUFFIX) and entry.is_file()
+            }
+    except FileNotFoundError:
+        return set()
+
+
+def content_digest(path):
+    """Short SHA-256 of a file, memoized on (path, mtime, size)"""
+    stat = path.stat()
+    key = (str(path), stat.st_mtime_ns, stat.st_size)
+    digest = _digests.get(key)
+    if digest is None:
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as handle:
+            for chunk in iter(lambda: handle.read(1 << 20), b''):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()[:16]
+        with _digests_lock:
+            _digests[key] = digest
+    return digest
+
+
+def variant_path(name, digest, size, fmt):
+    return thumbnail_root() / name / f"{digest}-{size}.{fmt}"
+
+
+def variant_url(name, digest, size=DEFAULT_SIZE, fmt=DEFAULT_FORMAT):
+    base_url = getattr(settings, 'THUMBNAIL_BASE_URL', 'http://localhost:8000').rstrip('/')
+    return f"{base_url}/api/photos/{name}/{digest}/{size}.{fmt}"
+
+
+def profile_picture_urls(name):
+    """Variant URLs for a person's photo, or None if there is no photo"""
+    path = source_path(name)
+    if path is None:
+        return None
+    digest = content_digest(path)
+    return {
+        'src': variant_url(name, digest),
+        'variants': {
+            fmt: {str(size): variant_url(name, digest, size, fmt) for size in AVATAR_SIZES}
+            for fmt in FORMATS
+        },
+    }
+
+
+def generate_variant(source, target, size, fmt):
+    """Render one square avatar variant and write it atomically"""
+    from PIL import Image, ImageOps
+
+    pil_format, _, save_options = FORMATS[fmt]
+    with Image.open(source) as image:
+        image = ImageOps.fit(image, (size, size), method=Image.Resampling.LANCZOS)
+        if pil_format == 'JPEG' and image.mode != 'RGB':
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A') if 'A' in image.getbands() else None)
+            image = background
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=target.parent, suffix=f'.{fmt}.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                image.save(handle, pil_format, **save_options)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, target)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    return target
+
+
+def get_variant(name, digest, size, fmt):
+    """Path of an up-to-date variant, generating it on first use; None if unknown"""
+    if size not in AVATAR_SIZES or fmt not in FORMATS:
+        return None
+    source = source_path(name)
+    if source is None or content_digest(source) != digest:
+        return None
+    target = variant_path(name, digest, size, fmt)
+    if not target.exists():
+        generate_variant(source, target, size, fmt)
+    return target
+
+
+def generate_all(force=False):
+    """Generate every variant of every photo; yields (name, path, created)"""
+    for source in sorted(photos_dir().glob(f'*{PHOTO_SUFFIX}')):
+        name = source.stem
+        if not _valid_name.match(name):
+            continue
+        digest = content_digest(source)
+        for fmt in FORMATS:
+            for size in AVATAR_SIZES:
+                target = variant_path(name, digest, size, fmt)
+                created = force or not target.exists()
+                if created:
+                    generate_variant(source, target, size, fmt)
+                yield name, target, created
@@ -0,0 +1,260 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import httpx
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+# Per-request timing instrumentation.
+#
+# ServerTimingMiddleware opens a RequestTimings for every request; timed()
+# blocks, the httpx transports used by the Supabase clients and an execute
+# wrapper installed on every database connection record into it. When the
+# response leaves, the breakdown is emitted as a Server-Timing header and a
+# JSON log line, and fed into the Prometheus histograms served by the
+# metrics view.
+
+logger = logging.getLogger('api.timing')
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current = ContextVar('request_timings', default=None)
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram for one label set"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+
+class MetricsRegistry:
+    """Named, labeled histograms and gauges rendered in Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._help = {}
+        self._buckets = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self._help[name] = help_text
+        self._buckets[name] = buckets
+
+    def observe(self, name, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            histogram = self._metrics.setdefault(name, {}).get(key)
+            if histogram is None:
+                histogram = self._metrics[name][key] = Histogram(self._buckets.get(name, DEFAULT_BUCKETS))
+            histogram.observe(value)
+
+    def set_gauge(self, name, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = value
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name in sorted(self._gauges):
+                if name in self._help:
+                    lines.append(f'# HELP {name} {self._help[name]}')
+                lines.append(f'# TYPE {name} gauge')
+                for key, value in sorted(self._gauges[name].items()):
+                    labels = [f'{label}="{_escape(label_value)}"' for label, label_value in key]
+                    lines.append(f'{name}{_labels(labels)} {value}')
+            for name in sorted(self._metrics):
+                if name in self._help:
+                    lines.append(f'# HELP {name} {self._help[name]}')
+                lines.append(f'# TYPE {name} histogram')
+                for key, histogram in sorted(self._metrics[name].items()):
+                    labels = [f'{label}="{_escape(value)}"' for label, value in key]
+                    buckets = [str(bound) for bound in histogram.buckets] + ['+Inf']
+                    counts = histogram.counts + [histogram.count]
+                    for bound, count in zip(buckets, counts):
+                        le = 'le="%s"' % bound
+                        lines.append(f'{name}_bucket{_labels(labels + [le])} {count}')
+                    lines.append(f'{name}_sum{_labels(labels)} {histogram.sum:.6f}')
+                    lines.append(f'{name}_count{_labels(labels)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels):
+    return '{' + ','.join(labels) + '}' if labels else ''
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+metrics = MetricsRegistry()
+metrics.describe('http_request_duration_seconds', 'Request latency by endpoint')
+metrics.describe('upstream_call_duration_seconds', 'Latency of upstream calls by upstream and operation')
+
+
+class RequestTimings:
+    """Timed steps recorded while serving one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.steps = []
+
+    def record(self, name, duration, detail=None):
+        self.steps.append((name, duration, detail))
+
+    def summary(self):
+        """Total duration and call count per step name, in recording order"""
+        totals = {}
+        for name, duration, _ in self.steps:
+            total, count = totals.get(name, (0.0, 0))
+            totals[name] = (total + duration, count + 1)
+        return totals
+
+
+def record(name, duration, upstream=None, operation=None):
+    """Record a step on the current request and in the upstream histograms"""
+    timings = _current.get()
+    if timings is not None:
+        timings.record(name, duration, operation)
+    if upstream is not None:
+        metrics.observe('upstream_call_duration_seconds', duration,
+                        upstream=upstream, operation=operation or name)
+
+
+@contextmanager
+def timed(name, upstream=None, operation=None):
+    """Time a block as a named step of the current request"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - started, upstream=upstream, operation=operation)
+
+
+def request_endpoint(request):
+    """Route pattern a request resolved to, the endpoint label of the metrics"""
+    match = getattr(request, 'resolver_match', None)
+    return match.route if match else 'unmatched'
+
+
+def classify_request(request):
+    """Upstream name and operation for a Supabase HTTP request"""
+    path = request.url.path
+    if path.startswith('/rest/v1/'):
+        table = path[len('/rest/v1/'):].split('/')[0]
+        return 'postgrest', f'{request.method} {table}'
+    if path.startswith('/auth/v1/'):
+        return 'auth', f'{request.method} {path[len("/auth/v1/"):]}'
+    return 'supabase', f'{request.method} {path}'
+
+
+class TimedTransport(httpx.BaseTransport):
+    """httpx transport that records every Supabase call"""
+
+    def __init__(self, transport):
+        self._transport = transport
+
+    def handle_request(self, request):
+        upstream, operation = classify_request(request)
+        with timed(upstream, upstream=upstream, operation=operation):
+            return self._transport.handle_request(request)
+
+    def close(self):
+        self._transport.close()
+
+
+class TimedAsyncTransport(httpx.AsyncBaseTransport):
+    """Async httpx transport that records every Supabase call"""
+
+    def __init__(self, transport):
+        self._transport = transport
+
+    async def handle_async_request(self, request):
+        upstream, operation = classify_request(request)
+        with timed(upstream, upstream=upstream, operation=operation):
+            return await self._transport.handle_async_request(request)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def _time_query(execute, sql, params, many, context):
+    with timed('db', upstream='database', operation=sql.split(' ', 1)[0].upper()):
+        return execute(sql, params, many, context)
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """connection_created receiver that times every ORM query on the connection"""
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+class ServerTimingMiddleware:
+    """Emit per-request timing breakdowns as Server-Timing and log lines"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings)
+
+    def _finish(self, request, response, timings):
+        total = time.perf_counter() - timings.started
+        endpoint = request_endpoint(request)
+
+        summary = timings.summary()
+        entries = [f'{name};dur={duration * 1000:.1f}' for name, (duration, _) in summary.items()]
+        entries.append(f'total;dur={total * 1000:.1f}')
+        response['Server-Timing'] = ', '.join(entries)
+
+        metrics.observe('http_request_duration_seconds', total,
+                        endpoint=endpoint, method=request.method)
+        logger.info(json.dumps({
+            'event': 'request_timing',
+            'method': request.method,
+            'endpoint': endpoint,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'steps': {
+                name: {'ms': round(duration * 1000, 2), 'calls': count}
+                for name, (duration, count) in summary.items()
+            },
+        }))
+        return response
@@ -1,23 +1,44 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import async_views, views
+
+# Hot read/auth endpoints can be served by async views under ASGI
+hot_views = async_views if settings.API_ASYNC_VIEWS else views
 
 router = DefaultRouter()
 router.register(r'users', views.UserViewSet)
+router.register(r'user-details', views.UserDetailsViewSet)
 
 urlpatterns = [
+    # Before the router, whose users/<pk>/ route would match users/details/
+    path('users/details/', hot_views.get_user_details_batch, name='get_user_details_batch'),
     path('', include(router.urls)),
-    path('employees/', views.get_employees, name='get_employees'),
+    path('employees/', hot_views.get_employees, name='get_employees'),
+    path('employees/search/', views.search_employees, name='search_employees'),
+    path('employees/changes/', hot_views.get_employee_changes, name='get_employee_changes'),
     path('employees/create/', views.create_employee, name='create_employee'),
+    path('employees/bulk/', views.create_employees_bulk, name='create_employees_bulk'),
+    path('office/', views.office_presence, name='office_presence'),
+    path('employees/cache/', views.directory_cache_stats, name='directory_cache_stats'),
+    path('upstreams/', views.upstreams_status, name='upstreams_status'),
     # Basic API endpoints
     path('status/', views.api_status, name='api_status'),
+    path('metrics/', views.metrics_view, name='metrics'),
     
     # Authentication endpoints
     path('auth/signup/', views.signup, name='signup'),
-    path('auth/login/', views.login, name='login'),
+    path('auth/login/', hot_views.login, name='login'),
     path('auth/logout/', views.logout, name='logout'),
-    path('auth/me/', views.get_current_user, name='get_current_user'),
+    path('auth/me/', hot_views.get_current_user, name='get_current_user'),
+    
+    # Presence push: SSE fallback for the WebSocket served by api.presence_asgi;
+    # answers 204 (no push) when not running under ASGI
+    path('presence/stream/', async_views.presence_stream, name='presence_stream'),
+    
+    # Resized avatar variants (content-hashed, immutable)
+    path('photos/<str:name>/<str:digest>/<int:size>.<str:fmt>', views.photo_variant, name='photo_variant'),
     
     # User details endpoints
-    path('users/<str:user_id>/details/', views.get_user_details, name='get_user_details'),
+    path('users/<str:user_id>/details/', hot_views.get_user_details, name='get_user_details'),
 ] 
\ No newline at end of file
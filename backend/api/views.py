@@ -2,14 +2,35 @@ from django.shortcuts import render
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
-from django.http import JsonResponse
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.views.decorators.http import require_GET
 from django.conf import settings
-from supabase import create_client, Client
 import json
+import logging
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from django.shortcuts import get_object_or_404
+from .auth import AuthenticationError, AuthUnavailableError, claims_cache, get_bearer_token, verify_access_token
+from .cache import directory_cache
+from .changes import SyncTokenError, SyncTokenExpired, build_requests, changes_entry, decode_token
+from .compression import compressed_bodies
+from .conditional import conditional_response, make_entry
+from .dbpool import database_status
+from .directory import DirectoryQueryError, EmployeeQuery
+from .importers import WEEKDAYS
 from .models import User, UserDetails
+from .office import load_index_rows, office_index, query_office
+from .onboarding import EmployeeConflict, EmployeeValidationError, create_employees, employee_summary
+from .payloads import profile_picture_fields
+from .profiles import ProfileBatchError, batch_payload, cache_key, parse_ids
+from .projections import user_details_rows, user_rows, users_with_details_rows
+from .repositories import directory_repository
+from .resilience import unavailable_payload, upstream_failure, upstream_status
+from .search import SearchQueryError, find_employees, query_terms
+from .summary import summary_payload
+from .supabase_client import get_auth_client, get_supabase_client
+from .thumbnails import FORMATS, get_variant
+from .timing import metrics
 from rest_framework import serializers
 from django.db import models
 import os
@@ -18,26 +39,7 @@ import socket
 
 # Create your views here.
 
-# Initialize Supabase client
-def get_supabase_client() -> Client:
-    """Get configured Supabase client"""
-    try:
-        # Get base URL (without any trailing slashes or auth paths)
-        supabase_url = os.getenv('SUPABASE_URL', '').rstrip('/')
-        if supabase_url.endswith('/auth/v1'):
-            supabase_url = supabase_url[:-8]
-        
-        supabase_key = os.getenv('SUPABASE_API_KEY')
-        if not supabase_url or not supabase_key:
-            raise ValueError("SUPABASE_URL and SUPABASE_API_KEY must be set")
-            
-        # Create client with proper typing
-        return create_client(supabase_url, supabase_key)
-    except Exception as e:
-        print(f"Debug - Error in get_supabase_client: {str(e)}")
-        raise e
-
-
+logger = logging.getLogger(__name__)
 
 @api_view(['GET'])
 def api_status(request):
@@ -74,7 +76,7 @@ def signup(request):
         
         # Sign up with Supabase Auth
         try:
-            auth_response = supabase.auth.sign_up({
+            auth_response = get_auth_client().sign_up({
                 "email": email,
                 "password": password,
                 "options": {
@@ -99,6 +101,7 @@ def signup(request):
                 
                 # Insert into users table
                 supabase.table('users').insert(user_data).execute()
+                directory_cache.invalidate()
                 
             except Exception as table_error:
                 # Auth user created but table insert failed
@@ -144,7 +147,8 @@ def login(request):
         
         # Create Supabase client
         try:
-            supabase: Client = get_supabase_client()
+            supabase = get_supabase_client()
+            auth = get_auth_client()
         except Exception as e:
             return Response({
                 'error': 'Authentication service unavailable',
@@ -155,7 +159,7 @@ def login(request):
         # Sign in with Supabase Auth
         try:
             # Use the correct auth method from the SDK
-            auth_response = supabase.auth.sign_in_with_password({
+            auth_response = auth.sign_in_with_password({
                 "email": email,
                 "password": password
             })
@@ -171,7 +175,7 @@ def login(request):
                 user_details = supabase.table('users').select('*').eq('id', auth_response.user.id).execute()
                 user_data = user_details.data[0] if user_details.data else {}
             except Exception as e:
-                print(f"Debug - Error fetching user details: {str(e)}")
+                logger.warning("Error fetching user details: %s", e)
                 user_data = {}
             
             return Response({
@@ -192,7 +196,13 @@ def login(request):
             })
             
         except Exception as auth_error:
-            print(f"Debug - Auth error: {str(auth_error)}")
+            logger.info("Auth error: %s", auth_error)
+            if upstream_failure(auth_error):
+                return Response({
+                    'error': 'Authentication service unavailable',
+                    'status': 'failed',
+                    'details': str(auth_error)
+                }, status=503)
             if "Email not confirmed" in str(auth_error):
                 return Response({
                     'error': 'Email not confirmed',
@@ -207,7 +217,7 @@ def login(request):
                 }, status=400)
             
     except Exception as e:
-        print(f"Debug - General error: {str(e)}")
+        logger.exception("Error in login")
         return Response({
             'error': 'Login failed',
             'status': 'failed',
@@ -219,23 +229,32 @@ def logout(request):
     """Logout user from Supabase Auth"""
     try:
         # Get auth token from request headers
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
+        token = get_bearer_token(request)
+        if not token:
             return Response({
                 'error': 'Authorization token required',
                 'status': 'failed'
             }, status=401)
         
-        token = auth_header.split(' ')[1]
-        
-        # Create Supabase client
-        supabase = get_supabase_client()
-        
-        # Set the session
-        supabase.auth.set_session(token, token)  # Use token for both access and refresh
+        # Verify the token locally before doing any upstream work
+        try:
+            claims = verify_access_token(token)
+        except AuthUnavailableError as e:
+            return Response({
+                'error': 'Authentication service unavailable',
+                'status': 'failed',
+                'details': str(e)
+            }, status=503)
+        except AuthenticationError as e:
+            return Response({
+                'error': 'Invalid or expired token',
+                'status': 'failed',
+                'details': str(e)
+            }, status=401)
         
-        # Sign out
-        supabase.auth.sign_out()
+        # Sign out with an isolated auth client so no shared session is touched
+        get_auth_client().admin.sign_out(token)
+        claims_cache.discard(token)
         
         return Response({
             'message': 'Logout successful',
@@ -254,49 +273,51 @@ def get_current_user(request):
     """Get current user details"""
     try:
         # Get auth token from request headers
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
+        token = get_bearer_token(request)
+        if not token:
             return Response({
                 'error': 'Authorization token required',
                 'status': 'failed'
             }, status=401)
         
-        token = auth_header.split(' ')[1]
+        # Verify the token locally before doing any upstream work
+        try:
+            claims = verify_access_token(token)
+        except AuthUnavailableError as e:
+            return Response({
+                'error': 'Authentication service unavailable',
+                'status': 'failed',
+                'details': str(e)
+            }, status=503)
+        except AuthenticationError as e:
+            return Response({
+                'error': 'Invalid or expired token',
+                'status': 'failed',
+                'details': str(e)
+            }, status=401)
         
-        # Create Supabase client
         supabase = get_supabase_client()
+        user_id = claims['sub']
         
-        # Set the session
-        supabase.auth.set_session(token, token)
-        
-        # Get current user
-        user_response = supabase.auth.get_user()
+        # Get user details from users table
+        try:
+            user_details = supabase.table('users').select('*').eq('id', user_id).execute()
+            user_data = user_details.data[0] if user_details.data else {}
+        except Exception as e:
+            logger.warning("Error fetching user %s: %s", user_id, e)
+            user_data = {}
         
-        if user_response.user:
-            # Get user details from users table
-            try:
-                user_details = supabase.table('users').select('*').eq('id', user_response.user.id).execute()
-                user_data = user_details.data[0] if user_details.data else {}
-            except Exception as e:
-                # Log this in production with proper logging
-                user_data = {}
-            
-            return Response({
-                'message': 'User retrieved successfully',
-                'status': 'success',
-                'user': {
-                    'id': user_response.user.id,
-                    'email': user_response.user.email,
-                    'forename': user_data.get('forename', ''),
-                    'lastname': user_data.get('lastname', ''),
-                    'created_at': user_data.get('created_at', '')
-                }
-            })
-        else:
-            return Response({
-                'error': 'User not found',
-                'status': 'failed'
-            }, status=404)
+        return Response({
+            'message': 'User retrieved successfully',
+            'status': 'success',
+            'user': {
+                'id': user_id,
+                'email': claims.get('email') or user_data.get('Email', ''),
+                'forename': user_data.get('forename', ''),
+                'lastname': user_data.get('lastname', ''),
+                'created_at': user_data.get('created_at', '')
+            }
+        })
             
     except Exception as e:
         return Response({
@@ -306,9 +327,16 @@ def get_current_user(request):
         }, status=500)
 
 class UserSerializer(serializers.ModelSerializer):
+    first_name = serializers.CharField(source='forename', allow_null=True, required=False)
+    last_name = serializers.CharField(source='lastname', allow_null=True, required=False)
+    profile_picture = serializers.SerializerMethodField()
+
     class Meta:
         model = User
-        fields = ['id', 'email', 'first_name', 'last_name', 'profile_picture', 'created_at', 'updated_at']
+        fields = ['id', 'email', 'first_name', 'last_name', 'profile_picture', 'created_at']
+
+    def get_profile_picture(self, user):
+        return profile_picture_fields(user.forename, {})['profile_picture']
 
 class UserDetailsSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
@@ -327,164 +355,332 @@ class UserViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def with_details(self, request):
         """Get all users with their details"""
-        users = User.objects.select_related('details').all()
-        data = []
-        
-        for user in users:
-            user_data = UserSerializer(user).data
-            try:
-                user_data['details'] = UserDetailsSerializer(user.details).data
-            except UserDetails.DoesNotExist:
-                user_data['details'] = None
-            data.append(user_data)
-        
-        return Response(data)
+        entry = directory_cache.get_or_set('users_with_details', self._build_with_details)
+        return conditional_response(request, entry)
+    
+    def list(self, request, *args, **kwargs):
+        return Response(user_rows(self.filter_queryset(self.get_queryset())))
+    
+    def _build_with_details(self):
+        data = users_with_details_rows(User.objects.all())
+        last_modified = UserDetails.objects.aggregate(latest=models.Max('updated_at'))['latest']
+        return make_entry(data, last_modified=last_modified)
 
 class UserDetailsViewSet(viewsets.ModelViewSet):
     queryset = UserDetails.objects.select_related('user').all()
     serializer_class = UserDetailsSerializer
     
+    def list(self, request, *args, **kwargs):
+        return Response(user_details_rows(self.filter_queryset(self.get_queryset())))
+    
     @action(detail=False, methods=['get'])
     def summary(self, request):
-        """Get summary statistics"""
-        total_users = UserDetails.objects.count()
-        workload_counts = UserDetails.objects.values('workload_status').annotate(count=models.Count('workload_status'))
-        
-        return Response({
-            'total_users': total_users,
-            'workload_distribution': {item['workload_status']: item['count'] for item in workload_counts},
-            'status': 'success'
-        })
+        """Get summary statistics from the maintained aggregates"""
+        return Response(summary_payload())
+
+def _upstream_error(e):
+    """503 response when a Supabase call failed or its circuit is open, else None"""
+    failure = upstream_failure(e)
+    if failure is None:
+        return None
+    logger.warning("Supabase unavailable: %s", failure)
+    payload, headers = unavailable_payload(failure)
+    return Response(payload, status=503, headers=headers)
 
 # Additional employee endpoints for compatibility
 @api_view(['GET'])
 def get_employees(request):
-    """Get all employees with their details using Supabase client"""
+    """Get employees with their details, optionally filtered, projected and paginated"""
     try:
-        supabase = get_supabase_client()
-        
-        # Fetch all users from the 'users' table
-        users_response = supabase.table('users').select('id, forename, lastname, Email').execute()
-        
-        if not users_response.data:
-            return Response({'employees': [], 'count': 0, 'status': 'success'})
-            
-        users_data = users_response.data
-        user_ids = [user['id'] for user in users_data]
-        
-        # Fetch all user details from the 'user_details' table
-        details_response = supabase.table('user_details').select('*').in_('user_id', user_ids).execute()
-        details_data = {item['user_id']: item for item in details_response.data}
+        query = EmployeeQuery.from_params(request.query_params)
+    except DirectoryQueryError as e:
+        return Response({
+            'error': 'Invalid query',
+            'details': str(e),
+            'status': 'failed'
+        }, status=400)
+
+    try:
+        entry = directory_cache.get_or_set(query.cache_key, lambda: directory_repository.employees_page(query))
+        return conditional_response(request, entry)
         
-        # Combine the data
-        employees_data = []
-        for user in users_data:
-            details = details_data.get(user['id'], {})
-            employee = {
-                'id': user.get('id'),
-                'email': user.get('Email'),
-                'first_name': user.get('forename'),
-                'last_name': user.get('lastname'),
-                'profile_picture': details.get('profile_picture'),
-                'role': details.get('role'),
-                'location': details.get('location'),
-                'profile_bio': details.get('profile_bio'),
-                'office_days': details.get('office_days'),
-                'workload_status': details.get('workload_status'),
-                'today_location': details.get('today_location'),
-                'skills': details.get('skills'),
-                'interests': details.get('interests'),
-                'favorite_recipes': details.get('favorite_recipes'),
-                'recommendations': details.get('recommendations'),
-                'days_with_company': details.get('days_with_company'),
-            }
-            employees_data.append(employee)
-            
+    except Exception as e:
+        if (response := _upstream_error(e)):
+            return response
+        logger.exception("Error in get_employees")
+        return Response({
+            'error': 'Failed to fetch employees',
+            'details': str(e),
+            'status': 'failed'
+        }, status=500)
+
+def _fetch_changes(watermark):
+    """Fetch the employees changed and deleted since a watermark"""
+    supabase = get_supabase_client()
+    requests = build_requests(supabase, watermark)
+    rows = {name: request.execute().data for name, request in requests.items()}
+    return changes_entry(watermark, rows)
+
+@api_view(['GET'])
+def get_employee_changes(request):
+    """Get employees created, updated or deleted since a sync token"""
+    try:
+        watermark = decode_token(request.query_params.get('since'))
+    except SyncTokenExpired as e:
+        return Response({
+            'error': 'Sync token expired',
+            'details': str(e),
+            'status': 'failed'
+        }, status=410)
+    except SyncTokenError as e:
+        return Response({
+            'error': 'Invalid sync token',
+            'details': str(e),
+            'status': 'failed'
+        }, status=400)
+
+    try:
+        key = f'changes:{watermark.isoformat() if watermark else ""}'
+        entry = directory_cache.get_or_set(key, lambda: _fetch_changes(watermark))
+        return conditional_response(request, entry)
+
+    except Exception as e:
+        if (response := _upstream_error(e)):
+            return response
+        logger.exception("Error in get_employee_changes")
         return Response({
-            'employees': employees_data,
-            'count': len(employees_data),
+            'error': 'Failed to fetch employee changes',
+            'details': str(e),
+            'status': 'failed'
+        }, status=500)
+
+@api_view(['GET'])
+def office_presence(request):
+    """Get who is in the office on a weekday, with head counts for every weekday"""
+    day = request.query_params.get('day')
+    location = request.query_params.get('location')
+    today_location = request.query_params.get('today_location')
+    if day and day not in WEEKDAYS:
+        return Response({
+            'error': 'Invalid day',
+            'details': f'day must be one of {", ".join(WEEKDAYS)}',
+            'status': 'failed'
+        }, status=400)
+
+    try:
+        supabase = get_supabase_client()
+        if getattr(settings, 'OFFICE_INDEX_ENABLED', True):
+            office_index.ensure_fresh(lambda: load_index_rows(supabase))
+            employee_ids = office_index.lookup(day, location, today_location)
+            weekday_counts = office_index.weekday_counts(location)
+            today_counts = office_index.today_counts(location)
+        else:
+            employee_ids, weekday_counts, today_counts = query_office(supabase, day, location, today_location)
+
+        return Response({
+            'day': day,
+            'location': location,
+            'today_location': today_location,
+            'employee_ids': employee_ids,
+            'count': len(employee_ids),
+            'weekday_counts': weekday_counts,
+            'today_counts': today_counts,
             'status': 'success'
         })
-        
+
     except Exception as e:
-        print(f"Error in get_employees: {str(e)}") # Enhanced logging
+        if (response := _upstream_error(e)):
+            return response
+        logger.exception("Error in office_presence")
         return Response({
-            'error': 'Failed to fetch employees',
+            'error': 'Failed to fetch office presence',
+            'details': str(e),
+            'status': 'failed'
+        }, status=500)
+
+@api_view(['GET'])
+def search_employees(request):
+    """Search skills, interests, bios and recommendations, best matches first"""
+    try:
+        terms = query_terms(request.query_params.get('q'))
+        limit = request.query_params.get('limit', getattr(settings, 'EMPLOYEE_SEARCH_LIMIT', 20))
+        max_limit = getattr(settings, 'EMPLOYEE_SEARCH_MAX_LIMIT', 100)
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise SearchQueryError('limit must be an integer')
+        if not 1 <= limit <= max_limit:
+            raise SearchQueryError(f'limit must be between 1 and {max_limit}')
+    except SearchQueryError as e:
+        return Response({
+            'error': 'Invalid query',
+            'details': str(e),
+            'status': 'failed'
+        }, status=400)
+
+    try:
+        def build():
+            results = find_employees(terms, limit)
+            return make_entry({'query': terms, 'results': results, 'count': len(results), 'status': 'success'})
+
+        entry = directory_cache.get_or_set(f'search:{limit}:{" ".join(terms)}', build)
+        return conditional_response(request, entry)
+
+    except Exception as e:
+        logger.exception("Error in search_employees")
+        return Response({
+            'error': 'Failed to search employees',
             'details': str(e),
             'status': 'failed'
         }, status=500)
 
+@require_GET
+def photo_variant(request, name, digest, size, fmt):
+    """Serve a resized avatar variant (generated on first request)"""
+    path = get_variant(name, digest, size, fmt)
+    if path is None:
+        raise Http404('Unknown photo variant')
+    response = FileResponse(open(path, 'rb'), content_type=FORMATS[fmt][1])
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+@require_GET
+def metrics_view(request):
+    """Request and upstream latency histograms in Prometheus text format"""
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@api_view(['GET'])
+def upstreams_status(request):
+    """Get circuit breaker and retry budget state of the Supabase upstreams and database connection counters"""
+    return Response({
+        'upstreams': upstream_status(),
+        'database': database_status(),
+        'status': 'success'
+    })
+
+@api_view(['GET'])
+def directory_cache_stats(request):
+    """Get hit/miss counters of the employee directory cache"""
+    return Response({
+        'cache': directory_cache.stats(),
+        'compressed': compressed_bodies.stats(),
+        'status': 'success'
+    })
+
+
+def _creation_error(e):
+    """Response for an EmployeeValidationError or EmployeeConflict"""
+    if isinstance(e, EmployeeConflict):
+        return Response({
+            'error': 'Employees already exist',
+            'details': e.emails,
+            'status': 'failed'
+        }, status=409)
+    return Response({
+        'error': 'Invalid employees',
+        'details': e.errors,
+        'status': 'failed'
+    }, status=400)
 
 @api_view(['POST'])
 def create_employee(request):
-    """Create a new employee"""
+    """Create a new employee; the email is allocated from the name if omitted"""
     try:
         data = json.loads(request.body)
-        
-        # Required fields
-        email = data.get('email')
-        first_name = data.get('first_name')
-        last_name = data.get('last_name')
-        
-        if not email or not first_name or not last_name:
+        user, = create_employees([data])
+
+        return Response({
+            'message': 'Employee created successfully',
+            'employee': employee_summary(user),
+            'status': 'success'
+        })
+
+    except (EmployeeValidationError, EmployeeConflict) as e:
+        return _creation_error(e)
+    except Exception as e:
+        return Response({
+            'error': 'Failed to create employee',
+            'details': str(e),
+            'status': 'failed'
+        }, status=500)
+
+@api_view(['POST'])
+def create_employees_bulk(request):
+    """Create many employees in one transaction, all or none"""
+    try:
+        data = json.loads(request.body)
+        items = data.get('employees') if isinstance(data, dict) else None
+        max_items = getattr(settings, 'EMPLOYEES_BULK_MAX', 1000)
+        if not isinstance(items, list) or not items:
             return Response({
-                'error': 'Email, first_name, and last_name are required',
+                'error': 'employees must be a non-empty list',
                 'status': 'failed'
             }, status=400)
-        
-        # Create username from first name and last name
-        username = f"{first_name.lower()}{last_name[0].lower()}"
-        
-        # Make username unique
-        original_username = username
-        counter = 1
-        while User.objects.filter(username=username).exists():
-            username = f"{original_username}{counter}"
-            counter += 1
-        
-        # Create user
-        user = User.objects.create_user(
-            username=username,
-            email=email,
-            first_name=first_name,
-            last_name=last_name,
-            password=data.get('password', 'defaultpassword123'),
-            profile_picture=data.get('profile_picture', '')
-        )
-        
-        # Create user details if provided
-        details_data = {
-            'user': user,
-            'role': data.get('role', ''),
-            'location': data.get('location', ''),
-            'profile_bio': data.get('profile_bio', ''),
-            'office_days': data.get('office_days', []),
-            'workload_status': data.get('workload_status', None),
-            'today_location': data.get('today_location', ''),
-            'skills': data.get('skills', ''),
-            'interests': data.get('interests', ''),
-            'favorite_recipes': data.get('favorite_recipes', ''),
-            'recommendations': data.get('recommendations', ''),
-            'days_with_company': data.get('days_with_company', None),
-        }
-        
-        UserDetails.objects.create(**details_data)
-        
+        if len(items) > max_items:
+            return Response({
+                'error': f'At most {max_items} employees can be created at once',
+                'status': 'failed'
+            }, status=400)
+
+        users = create_employees(items)
+
         return Response({
-            'message': 'Employee created successfully',
-            'employee': {
-                'id': user.id,
-                'email': user.email,
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-                'username': user.username
-            },
+            'message': f'{len(users)} employees created successfully',
+            'employees': [employee_summary(user) for user in users],
+            'count': len(users),
             'status': 'success'
         })
-        
+
+    except (EmployeeValidationError, EmployeeConflict) as e:
+        return _creation_error(e)
     except Exception as e:
+        logger.exception("Error in create_employees_bulk")
         return Response({
-            'error': 'Failed to create employee',
+            'error': 'Failed to create employees',
+            'details': str(e),
+            'status': 'failed'
+        }, status=500)
+
+def _batch_ids(request):
+    """Requested ids from ?ids= or a JSON body {"ids": [...]}"""
+    if request.method == 'POST':
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        if isinstance(ids, str):
+            ids = [ids]
+        if not isinstance(ids, list):
+            raise ProfileBatchError('ids must be a list')
+        return parse_ids(ids)
+    return parse_ids(request.query_params.getlist('ids'))
+
+@api_view(['GET', 'POST'])
+def get_user_details_batch(request):
+    """Get several user profiles at once, each shaped like get_user_details"""
+    try:
+        ids = _batch_ids(request)
+    except ProfileBatchError as e:
+        return Response({
+            'error': 'Invalid ids',
+            'details': str(e),
+            'status': 'failed'
+        }, status=400)
+
+    try:
+        cached = directory_cache.get_many([cache_key(user_id) for user_id in ids])
+        entries = {user_id: cached[cache_key(user_id)] for user_id in ids if cache_key(user_id) in cached}
+        uncached = [user_id for user_id in ids if user_id not in entries]
+        if uncached:
+            fetched = directory_repository.profiles(uncached)
+            directory_cache.set_many({cache_key(user_id): entry for user_id, entry in fetched.items()})
+            entries.update(fetched)
+
+        return conditional_response(request, make_entry(batch_payload(ids, entries)))
+
+    except Exception as e:
+        if (response := _upstream_error(e)):
+            return response
+        logger.exception("Error in get_user_details_batch")
+        return Response({
+            'error': 'Failed to fetch user details',
             'details': str(e),
             'status': 'failed'
         }, status=500)
@@ -493,73 +689,28 @@ def create_employee(request):
 def get_user_details(request, user_id):
     """Get user details by user ID"""
     try:
-        print(f"\nFetching details for user_id: {user_id}")
-        supabase = get_supabase_client()
+        entry = directory_cache.get_or_set(f'user:{user_id}', lambda: directory_repository.user_profile(user_id))
         
-        # Get user details from the users table
-        print("Fetching from users table...")
-        user_response = supabase.table('users').select('*').eq('id', user_id).execute()
-        print(f"Users table response: {user_response.data}")
-        
-        if not user_response.data:
-            print(f"No user found with ID: {user_id}")
+        if entry is None:
             return Response({
                 'error': 'User not found',
                 'status': 'failed'
             }, status=404)
-            
-        user_data = user_response.data[0]
-        print(f"Found user: {user_data.get('forename')} {user_data.get('lastname')}")
-        
-        # Get additional details from user_details table
-        print("Fetching from user_details table...")
-        details_response = supabase.table('user_details').select('*').eq('user_id', user_id).execute()
-        print(f"User details response: {details_response.data}")
-        
-        details_data = details_response.data[0] if details_response.data else {}
-        
-        # If no details found, try to get basic info from employees endpoint
-        if not details_data:
-            print("No details found in user_details table, checking employees data...")
-            # Get all employees to find matching data
-            employees_response = supabase.table('employees').select('*').eq('user_id', user_id).execute()
-            if employees_response.data:
-                print("Found matching employee data")
-                details_data = employees_response.data[0]
-        
-        # Combine the data in the same format as get_employees
-        employee_data = {
-            'id': user_data.get('id'),
-            'email': user_data.get('Email'),
-            'first_name': user_data.get('forename'),
-            'last_name': user_data.get('lastname'),
-            'profile_picture': details_data.get('profile_picture'),
-            'role': details_data.get('role'),
-            'location': details_data.get('location'),
-            'profile_bio': details_data.get('profile_bio'),
-            'office_days': details_data.get('office_days', []),
-            'workload_status': details_data.get('workload_status'),
-            'today_location': details_data.get('today_location'),
-            'skills': details_data.get('skills'),
-            'interests': details_data.get('interests'),
-            'favorite_recipes': details_data.get('favorite_recipes'),
-            'recommendations': details_data.get('recommendations'),
-            'days_with_company': details_data.get('days_with_company'),
-        }
         
         # Check if we have minimum required data
+        employee_data = entry['data']
         if not employee_data['first_name'] or not employee_data['last_name']:
-            print("Missing required user data")
             return Response({
                 'error': 'Incomplete user data',
                 'status': 'failed'
             }, status=404)
         
-        print(f"Successfully compiled user data: {employee_data}")
-        return Response(employee_data)
+        return conditional_response(request, entry)
         
     except Exception as e:
-        print(f"Error in get_user_details: {str(e)}")
+        if (response := _upstream_error(e)):
+            return response
+        logger.exception("Error in get_user_details")
         return Response({
             'error': 'Failed to fetch user details',
             'details': str(e),
@@ -0,0 +1,204 @@
+"""Compare per-request and persistent database connections under load.
+
+Serves the API from a WSGI server with a fixed pool of worker threads (as
+gunicorn's gthread workers do, so connections kept by a thread are reused
+by its next request) and drives ORM routes over HTTP from concurrent
+clients, once per connection mode: one connection per request
+(CONN_MAX_AGE=0, the old behaviour), persistent connections with health
+checks and persistent connections without. Reports throughput, latency,
+the connections opened and the mean checkout time (api/dbpool.py) per mode.
+
+Runs against a throwaway SQLite database by default, where connecting is
+nearly free; point DATABASE_URL at PostgreSQL (e.g. Supabase, directly on
+5432 or through the pooler on 6543 with DATABASE_POOLER=transaction) to
+measure the handshakes that matter. As in benchmarks.explain, a test
+database is created on that server and dropped afterwards.
+
+Usage (from backend/):
+
+    python -m benchmarks.db_connections
+    DATABASE_URL=postgres://... python -m benchmarks.db_connections --workers 8 --concurrency 16
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+from .fake_supabase import synthesize_directory
+from .run import BACKEND_DIR, percentile
+
+# (name, CONN_MAX_AGE, CONN_HEALTH_CHECKS)
+MODES = [
+    ('per request', 0, False),
+    ('persistent', 600, True),
+    ('persistent, no checks', 600, False),
+]
+
+
+class PooledWSGIServer(WSGIServer):
+    """WSGI server handing each connection to a fixed pool of threads"""
+
+    # The default backlog of 5 drops connections under load (1s SYN retries)
+    request_queue_size = 128
+
+    def __init__(self, address, workers):
+        super().__init__(address, QuietHandler)
+        self.workers = workers
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        from django.db import connections
+
+        super().server_close()
+        # One task per thread, held at the barrier so each thread closes its own connections
+        barrier = threading.Barrier(self.workers)
+
+        def close_connections():
+            connections.close_all()
+            barrier.wait()
+
+        for _ in range(self.workers):
+            self.pool.submit(close_connections)
+        self.pool.shutdown(wait=True)
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def configure_environment(workdir):
+    os.environ.setdefault('DATABASE_URL', f'sqlite:///{workdir / "db_connections.sqlite3"}')
+    os.environ.update({
+        'DJANGO_SETTINGS_MODULE': 'employee_tracker.settings',
+        'SUPABASE_URL': os.environ.get('SUPABASE_URL', 'http://127.0.0.1:9'),
+        'SUPABASE_API_KEY': os.environ.get('SUPABASE_API_KEY', 'benchmark-api-key'),
+        'API_LOG_LEVEL': 'CRITICAL',
+    })
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+
+
+def run_mode(mode, paths, options):
+    import httpx
+    from django.core.wsgi import get_wsgi_application
+    from django.db import connections
+
+    from api.dbpool import connection_stats
+
+    name, max_age, health_checks = mode
+    connections.settings['default'].update(CONN_MAX_AGE=max_age, CONN_HEALTH_CHECKS=health_checks)
+    stats = connection_stats('default')
+    before = stats.stats()
+
+    server = PooledWSGIServer(('127.0.0.1', 0), options.workers)
+    server.set_app(get_wsgi_application())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f'http://127.0.0.1:{server.server_address[1]}'
+    local = threading.local()
+
+    def one(index):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = httpx.Client(base_url=base_url, timeout=30)
+        started = time.perf_counter()
+        response = client.get(paths[index % len(paths)])
+        return time.perf_counter() - started, response.status_code >= 400
+
+    try:
+        with ThreadPoolExecutor(max_workers=options.concurrency) as pool:
+            list(pool.map(one, range(options.warmup)))
+            started = time.perf_counter()
+            results = list(pool.map(one, range(options.requests)))
+            elapsed = time.perf_counter() - started
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    after = stats.stats()
+    latencies = sorted(latency for latency, _ in results)
+    checkouts = {}
+    for outcome, value in after['checkouts'].items():
+        previous = before['checkouts'].get(outcome, {'count': 0, 'mean_ms': 0.0})
+        count = value['count'] - previous['count']
+        if count:
+            total = value['count'] * value['mean_ms'] - previous['count'] * previous['mean_ms']
+            checkouts[outcome] = (count, round(total / count, 3))
+    return {
+        'mode': name,
+        'requests': len(results),
+        'errors': sum(error for _, error in results),
+        'rps': round(len(results) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'opened': after['opened'] - before['opened'],
+        'checkouts': checkouts,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--employees', type=int, default=1000, help='Synthetic employees to seed')
+    parser.add_argument('--requests', type=int, default=2000, help='Timed requests per mode')
+    parser.add_argument('--warmup', type=int, default=50, help='Untimed requests per mode')
+    parser.add_argument('--workers', type=int, default=8, help='Server worker threads')
+    parser.add_argument('--concurrency', type=int, default=16, help='Concurrent client requests')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the synthetic directory')
+    options = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='api-db-connections-') as tmp:
+        configure_environment(Path(tmp))
+        import django
+        django.setup()
+        from django.conf import settings
+        from django.db import connection
+
+        from benchmarks.run import seed_database
+
+        settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, '127.0.0.1']
+        old_name = None
+        if connection.vendor == 'postgresql':
+            old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            users, details = synthesize_directory(options.employees, seed=options.seed)
+            seed_database(SimpleNamespace(tables={'users': users, 'user_details': details}))
+            connection.close()
+            paths = [f'/api/users/{user["id"]}/' for user in users[:50]]
+            paths += [f'/api/user-details/{row["id"]}/' for row in details[:50]]
+
+            print(f'{connection.vendor}, {options.workers} server threads, {options.concurrency} clients, '
+                  f'{options.requests} requests per mode')
+            print(f'  {"mode":<22} {"err":>5} {"rps":>9} {"p50 ms":>9} {"p99 ms":>9} {"opened":>7}  checkouts (mean ms)')
+            for mode in MODES:
+                result = run_mode(mode, paths, options)
+                checkouts = ', '.join(f'{outcome} {count} ({mean_ms})'
+                                      for outcome, (count, mean_ms) in result['checkouts'].items())
+                print(f'  {result["mode"]:<22} {result["errors"]:>5} {result["rps"]:>9} {result["p50_ms"]:>9} '
+                      f'{result["p99_ms"]:>9} {result["opened"]:>7}  {checkouts}', flush=True)
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
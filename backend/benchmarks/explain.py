@@ -0,0 +1,150 @@
+"""Check that the directory queries use their indexes at realistic row counts.
+
+Creates a throwaway test database on the configured PostgreSQL server (the
+same way Django's test runner does, so every migration including the
+indexes of 0003, 0005 and the search table of 0006 is applied), inserts N
+synthetic employees, ANALYZEs and EXPLAINs each directory access path,
+asserting that its plan uses the expected index. The database is dropped
+afterwards. Exits non-zero when a plan does not use its index.
+
+tests/test_explain.py runs the same checks under pytest whenever
+DATABASE_URL points at PostgreSQL; this script prints the plans.
+
+The synthetic values are skewed the way a real directory is (hundreds of
+locations, few red workloads, few people in on Fridays, few rows changed
+since the last sync) because a B-tree or GIN index only pays off, and is
+only chosen by the planner, for selective predicates.
+
+Usage (from backend/, with DATABASE_URL pointing at PostgreSQL):
+
+    python -m benchmarks.explain
+    python -m benchmarks.explain --rows 250000 --verbose
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+SEED_SQL = """
+WITH numbered AS (
+    SELECT i, gen_random_uuid() AS user_id FROM generate_series(1, %(rows)s) AS i
+), inserted_users AS (
+    INSERT INTO users (id, password, is_superuser, username, is_staff, is_active, date_joined,
+                       "Email", forename, lastname, created_at)
+    SELECT user_id, '', false, 'employee' || i, false, true, now(),
+           'employee' || i || '@summ-ai.com', 'Employee' || i, 'Lastname' || (i %% 997),
+           now() - i * interval '1 second'
+    FROM numbered
+)
+INSERT INTO user_details (id, user_id, role, location, profile_bio, office_days, workload_status,
+                          today_location, skills, interests, favorite_recipes, recommendations,
+                          days_with_company, created_at, updated_at)
+SELECT gen_random_uuid(), user_id, 'Role ' || (i %% 40), 'City ' || (i %% 250), 'Bio ' || i,
+       CASE WHEN i %% 40 = 0 THEN '["Friday"]'::jsonb ELSE '["Monday", "Tuesday", "Wednesday"]'::jsonb END,
+       CASE WHEN i %% 50 = 0 THEN 'red' WHEN i %% 5 = 0 THEN 'yellow' ELSE 'green' END,
+       'Site ' || (i %% 120), 'python, skill' || (i %% 5000), 'hiking, hobby' || (i %% 3000),
+       '', '', i %% 2000, now() - i * interval '1 second', now() - i * interval '1 second'
+FROM numbered
+"""
+
+# (name, the SQL PostgREST runs for a directory request, index its plan must use)
+CHECKS = [
+    ('workload_status filter', "SELECT user_id FROM user_details WHERE workload_status = 'red'",
+     'user_details_workload_status_idx'),
+    ('today_location filter', "SELECT user_id FROM user_details WHERE today_location = 'Site 7'",
+     'user_details_today_location_idx'),
+    ('location filter', "SELECT user_id FROM user_details WHERE location = 'City 7'",
+     'user_details_location_idx'),
+    ('office_days containment', """SELECT user_id FROM user_details WHERE office_days @> '["Friday"]'""",
+     'user_details_office_days_gin'),
+    ('details changed since', "SELECT * FROM user_details WHERE updated_at >= now() - interval '5 minutes'",
+     'user_details_updated_at_idx'),
+    ('latest details', "SELECT * FROM user_details ORDER BY updated_at DESC LIMIT 100",
+     'user_details_updated_at_idx'),
+    ('users created since', "SELECT id FROM users WHERE created_at >= now() - interval '5 minutes'",
+     'users_created_at_idx'),
+    ('skills search', "SELECT user_id FROM user_details WHERE skills ILIKE '%skill4242%'",
+     'user_details_skills_trgm'),
+    ('interests search', "SELECT user_id FROM user_details WHERE interests ILIKE '%hobby777%'",
+     'user_details_interests_trgm'),
+    ('full-text search', "SELECT user_details_id FROM user_details_search "
+                         "WHERE document @@ to_tsquery('english', 'skill4242:*')",
+     'user_details_search_document_gin'),
+]
+
+
+def index_names(plan):
+    """Every index a JSON EXPLAIN plan node or its children scan"""
+    names = {plan['Index Name']} if 'Index Name' in plan else set()
+    for child in plan.get('Plans', []):
+        names |= index_names(child)
+    return names
+
+
+def explain(cursor, query):
+    cursor.execute(f'EXPLAIN (FORMAT JSON) {query}')
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']
+
+
+def run_checks(connection, rows, verbose=False):
+    """Seed, analyze and explain; returns the names of the failed checks"""
+    failed = []
+    with connection.cursor() as cursor:
+        cursor.execute(SEED_SQL, {'rows': rows})
+        cursor.execute('ANALYZE users')
+        cursor.execute('ANALYZE user_details')
+        cursor.execute('ANALYZE user_details_search')
+        for name, query, index in CHECKS:
+            plan = explain(cursor, query)
+            used = index_names(plan)
+            ok = index in used
+            if not ok:
+                failed.append(name)
+            print(f"  {'ok  ' if ok else 'FAIL'} {name:<26} {plan['Node Type']:<18} {', '.join(sorted(used)) or '-'}")
+            if verbose:
+                print(json.dumps(plan, indent=2))
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000, help='Synthetic employees to insert')
+    parser.add_argument('--keepdb', action='store_true', help='Keep the test database between runs')
+    parser.add_argument('--verbose', action='store_true', help='Print the full plans')
+    options = parser.parse_args(argv)
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'employee_tracker.settings')
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+
+    import django
+    django.setup()
+    from django.db import connection
+
+    if connection.vendor != 'postgresql':
+        sys.exit(f'DATABASE_URL must point at PostgreSQL, not {connection.vendor}')
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False, keepdb=options.keepdb)
+    try:
+        if options.keepdb:
+            with connection.cursor() as cursor:
+                cursor.execute('TRUNCATE users, user_details CASCADE')
+        print(f'{options.rows} employees')
+        failed = run_checks(connection, options.rows, verbose=options.verbose)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options.keepdb)
+
+    if failed:
+        sys.exit(f'{len(failed)} queries do not use their index: {", ".join(failed)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,445 @@
+"""Local stand-in for the Supabase PostgREST and GoTrue endpoints the API uses.
+
+FakeSupabase keeps the users, user_details and employees tables in memory
+and serves them over HTTP on localhost with a subset of PostgREST semantics
+(column selection with one level of embedding, eq/neq/in/gt/gte/lt/lte/
+like/ilike/cs/is filters, order, limit/offset, exact counts, insert/upsert,
+PATCH and DELETE). It also serves the GoTrue routes used by signup, login,
+get_user and logout. Access tokens are HS256 JWTs signed with `jwt_secret`,
+so the API can verify them locally.
+
+Every request can be delayed by a fixed latency plus uniform jitter to
+approximate a remote Supabase project, and a fraction `error_rate` of the
+requests is answered with 503 to simulate a degraded one. Both can be
+changed while the server runs.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+import jwt
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+LOCATIONS = ['Munich', 'Berlin', 'Hamburg', 'Bamberg', 'Bremen', 'Remote']
+TODAY_LOCATIONS = ['MUC Office', 'Home Office', 'Business Trip', 'Vacation']
+ROLES = ['Engineer', 'Designer', 'Account Executive', 'Customer Success Manager', 'Expert in Easy Language']
+WORDS = ['coffee', 'origami', 'python', 'react', 'hiking', 'baking', 'chess', 'design', 'sales', 'jazz']
+
+# table -> {embedded table: (local column, foreign column, one-to-one)}
+RELATIONSHIPS = {
+    'users': {'user_details': ('id', 'user_id', True), 'employees': ('id', 'user_id', True)},
+    'user_details': {'users': ('user_id', 'id', True)},
+}
+PRIMARY_KEYS = {'users': 'id', 'user_details': 'id', 'employees': 'id', 'employee_tombstones': 'user_id'}
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def synthesize_directory(count, seed=0):
+    """Build users and user_details rows for `count` synthetic employees"""
+    rng = random.Random(seed)
+    users, details = [], []
+    # Recent enough to be inside the delta sync retention window
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    base = today - timedelta(days=7)
+    for index in range(count):
+        user_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        forename = f'Employee{index}'
+        created = (base + timedelta(seconds=index)).isoformat()
+        users.append({
+            'id': user_id,
+            'Email': f'employee{index}@summ-ai.com',
+            'forename': forename,
+            'lastname': f'Lastname{index % 997}',
+            'created_at': created,
+        })
+        details.append({
+            'id': str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            'user_id': user_id,
+            'role': rng.choice(ROLES),
+            'location': rng.choice(LOCATIONS),
+            'profile_bio': ' '.join(rng.choices(WORDS, k=20)),
+            'office_days': sorted(rng.sample(WEEKDAYS, rng.randint(0, 5)), key=WEEKDAYS.index),
+            'workload_status': rng.choice(['green', 'yellow', 'red']),
+            'today_location': rng.choice(TODAY_LOCATIONS),
+            'skills': ', '.join(rng.sample(WORDS, 3)),
+            'interests': ', '.join(rng.sample(WORDS, 3)),
+            'favorite_recipes': ' '.join(rng.choices(WORDS, k=8)),
+            'recommendations': ' '.join(rng.choices(WORDS, k=8)),
+            'days_with_company': rng.randint(1, 2000),
+            'created_at': created,
+            'updated_at': created,
+        })
+    return users, details
+
+
+class FakeSupabase:
+    """In-memory Supabase stand-in served by a threaded HTTP server"""
+
+    def __init__(self, employees=100, latency=0.0, jitter=0.0, jwt_secret='benchmark-secret',
+                 password='benchmark-password', seed=0, host='127.0.0.1', port=0, error_rate=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.jwt_secret = jwt_secret
+        self.password = password
+        self.lock = threading.Lock()
+        users, details = synthesize_directory(employees, seed=seed)
+        self.tables = {'users': users, 'user_details': details, 'employees': [], 'employee_tombstones': []}
+        self.auth_users = {
+            user['Email']: {'id': user['id'], 'email': user['Email'], 'password': password}
+            for user in users
+        }
+        self.request_count = 0
+        self._indexes = {}
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def delay(self):
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+
+    def injected_error(self):
+        return self.error_rate > 0 and random.random() < self.error_rate
+
+    # ----- auth -----
+
+    def issue_session(self, user):
+        now = int(time.time())
+        access_token = jwt.encode({
+            'sub': user['id'], 'email': user['email'], 'aud': 'authenticated',
+            'role': 'authenticated', 'iat': now, 'exp': now + 3600,
+        }, self.jwt_secret, algorithm='HS256')
+        return {
+            'access_token': access_token,
+            'refresh_token': uuid.uuid4().hex,
+            'token_type': 'bearer',
+            'expires_in': 3600,
+            'expires_at': now + 3600,
+            'user': self.user_payload(user),
+        }
+
+    @staticmethod
+    def user_payload(user):
+        return {
+            'id': user['id'], 'aud': 'authenticated', 'role': 'authenticated',
+            'email': user['email'], 'email_confirmed_at': _now(),
+            'app_metadata': {}, 'user_metadata': user.get('metadata', {}),
+            'created_at': _now(), 'updated_at': _now(),
+        }
+
+    def token_user(self, authorization):
+        token = (authorization or '').removeprefix('Bearer ').strip()
+        try:
+            claims = jwt.decode(token, self.jwt_secret, algorithms=['HS256'], audience='authenticated')
+        except jwt.PyJWTError:
+            return None
+        return self.auth_users.get(claims.get('email'))
+
+    def handle_auth(self, method, path, query, body, headers):
+        if method == 'POST' and path == 'signup':
+            with self.lock:
+                if body['email'] in self.auth_users:
+                    return 422, {'code': 422, 'error_code': 'user_already_exists', 'msg': 'User already registered'}
+                user = {'id': str(uuid.uuid4()), 'email': body['email'], 'password': body['password'],
+                        'metadata': body.get('data', {})}
+                self.auth_users[body['email']] = user
+            return 200, self.issue_session(user)
+        if method == 'POST' and path == 'token' and query.get('grant_type') == 'password':
+            user = self.auth_users.get(body.get('email'))
+            if user is None or user['password'] != body.get('password'):
+                return 400, {'code': 400, 'error_code': 'invalid_credentials', 'msg': 'Invalid login credentials'}
+            return 200, self.issue_session(user)
+        if method == 'GET' and path == 'user':
+            user = self.token_user(headers.get('Authorization'))
+            if user is None:
+                return 401, {'code': 401, 'error_code': 'bad_jwt', 'msg': 'invalid JWT'}
+            return 200, self.user_payload(user)
+        if method == 'POST' and path == 'logout':
+            return 204, None
+        return 404, {'code': 404, 'msg': f'Unknown auth route {method} {path}'}
+
+    # ----- PostgREST -----
+
+    def lookup(self, table, column, value):
+        """Rows of `table` whose `column` equals `value`, via a lazily built index"""
+        index = self._indexes.get((table, column))
+        if index is None:
+            index = {}
+            for row in self.tables[table]:
+                index.setdefault(str(row.get(column)), []).append(row)
+            self._indexes[(table, column)] = index
+        return index.get(str(value), [])
+
+    def candidates(self, table, filters):
+        """Narrow the scan to an indexed equality filter when there is one"""
+        for key, value in filters:
+            if value.startswith('eq.'):
+                return self.lookup(table, key, value[3:])
+        return self.tables[table]
+
+    def handle_rest(self, method, table, query_items, body, headers):
+        if table not in self.tables:
+            return 404, {'code': '42P01', 'message': f'relation "public.{table}" does not exist'}, {}
+        rows = self.tables[table]
+        filters = [(key, value) for key, value in query_items
+                   if key not in ('select', 'order', 'limit', 'offset', 'on_conflict', 'columns')]
+        params = dict(query_items)
+        prefer = headers.get('Prefer', '')
+
+        if method == 'GET':
+            # Filters on embedded resources ("user_details.role=eq.x") apply to the embedding
+            embedded_filters = {}
+            for key, value in [item for item in filters if '.' in item[0]]:
+                name, _, column = key.partition('.')
+                embedded_filters.setdefault(name, []).append((column, value))
+            filters = [item for item in filters if '.' not in item[0]]
+            select = params.get('select', '*')
+            matched = [row for row in self.candidates(table, filters)
+                       if all(_match(row, key, value) for key, value in filters)]
+            if 'order' in params:
+                for clause in reversed(params['order'].split(',')):
+                    column, _, direction = clause.partition('.')
+                    descending = direction.startswith('desc')
+                    matched = sorted(matched, key=lambda row: (row.get(column) is None, row.get(column)),
+                                     reverse=descending)
+            offset = int(params.get('offset', 0))
+            end = offset + int(params['limit']) if 'limit' in params else None
+            counting = 'count=exact' in prefer
+
+            # Project lazily so a small page of a large table stays cheap
+            result, total = [], 0
+            for row in matched:
+                if end is not None and total >= end and not counting:
+                    break
+                projected = self.project(table, row, select, embedded_filters)
+                if projected is None:
+                    continue
+                if total >= offset and (end is None or total < end):
+                    result.append(projected)
+                total += 1
+            extra_headers = {}
+            if counting:
+                last = offset + len(result) - 1
+                extra_headers['Content-Range'] = f'{offset}-{last}/{total}' if result else f'*/{total}'
+            return 200, result, extra_headers
+
+        if method == 'POST':
+            payload = body if isinstance(body, list) else [body]
+            on_conflict = params.get('on_conflict')
+            merge = 'resolution=merge-duplicates' in prefer
+            written = []
+            with self.lock:
+                self._indexes.clear()
+                for item in payload:
+                    existing = None
+                    if on_conflict:
+                        existing = next((row for row in rows if row.get(on_conflict) == item.get(on_conflict)), None)
+                    if existing is not None:
+                        if not merge:
+                            return 409, {'code': '23505', 'message': 'duplicate key value violates unique constraint'}, {}
+                        existing.update(item)
+                        existing['updated_at'] = _now()
+                        written.append(existing)
+                    else:
+                        row = {PRIMARY_KEYS[table]: str(uuid.uuid4()), 'created_at': _now(), 'updated_at': _now(), **item}
+                        rows.append(row)
+                        written.append(row)
+            return 201, written, {}
+
+        if method == 'PATCH':
+            with self.lock:
+                self._indexes.clear()
+                matched = [row for row in rows if all(_match(row, key, value) for key, value in filters)]
+                for row in matched:
+                    row.update(body)
+                    row['updated_at'] = _now()
+            return 200, matched, {}
+
+        if method == 'DELETE':
+            with self.lock:
+                self._indexes.clear()
+                matched = [row for row in rows if all(_match(row, key, value) for key, value in filters)]
+                removed = {id(row) for row in matched}
+                self.tables[table] = [row for row in rows if id(row) not in removed]
+                if table == 'users':
+                    # Cascade and record tombstones like the users trigger
+                    gone = {row['id'] for row in matched}
+                    self.tables['user_details'] = [row for row in self.tables['user_details']
+                                                   if row['user_id'] not in gone]
+                    tombstones = [row for row in self.tables['employee_tombstones'] if row['user_id'] not in gone]
+                    tombstones += [{'user_id': user_id, 'deleted_at': _now()} for user_id in gone]
+                    self.tables['employee_tombstones'] = tombstones
+            return 200, matched, {}
+
+        return 405, {'message': f'{method} not supported'}, {}
+
+    def project(self, table, row, select, embedded_filters=None):
+        """Apply a PostgREST select clause with one level of embedding
+
+        Returns None when an !inner embedding has no row matching its filters.
+        """
+        result = {}
+        for column in _split_select(select):
+            embedded = re.match(r'^(\w+)(?:!(\w+))?\((.*)\)$', column)
+            if embedded:
+                name, hint, inner = embedded.groups()
+                local, foreign, one_to_one = RELATIONSHIPS[table][name]
+                conditions = (embedded_filters or {}).get(name, [])
+                related = [self.project(name, other, inner)
+                           for other in self.lookup(name, foreign, row.get(local))
+                           if all(_match(other, key, value) for key, value in conditions)]
+                if hint == 'inner' and not related:
+                    return None
+                result[name] = (related[0] if related else None) if one_to_one else related
+            elif column == '*':
+                result.update(row)
+            else:
+                result[column] = row.get(column)
+        return result
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _dispatch(self):
+                fake.delay()
+                with fake.lock:
+                    fake.request_count += 1
+                parts = urlsplit(self.path)
+                query_items = parse_qsl(parts.query, keep_blank_values=True)
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length)) if length else None
+
+                if fake.injected_error():
+                    status, payload, extra_headers = 503, {'message': 'Service Unavailable'}, {}
+                elif parts.path.startswith('/auth/v1/'):
+                    status, payload = fake.handle_auth(
+                        self.command, parts.path[len('/auth/v1/'):], dict(query_items), body or {}, self.headers)
+                    extra_headers = {}
+                elif parts.path.startswith('/rest/v1/'):
+                    status, payload, extra_headers = fake.handle_rest(
+                        self.command, unquote(parts.path[len('/rest/v1/'):]), query_items, body, self.headers)
+                else:
+                    status, payload, extra_headers = 404, {'message': 'not found'}, {}
+
+                encoded = b'' if payload is None else json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(encoded)))
+                for name, value in extra_headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                try:
+                    self.wfile.write(encoded)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up, e.g. its deadline passed during fake.delay()
+                    self.close_connection = True
+
+            do_GET = do_POST = do_PATCH = do_DELETE = do_HEAD = _dispatch
+
+        return Handler
+
+
+def _split_select(select):
+    """Split a select clause on top-level commas"""
+    columns, depth, current = [], 0, ''
+    for char in select:
+        if char == ',' and depth == 0:
+            columns.append(current.strip())
+            current = ''
+            continue
+        depth += char == '('
+        depth -= char == ')'
+        current += char
+    if current.strip():
+        columns.append(current.strip())
+    return columns
+
+
+def _coerce(value):
+    if value == 'null':
+        return None
+    if value in ('true', 'false'):
+        return value == 'true'
+    return value
+
+
+def _compare(left, right):
+    """Compare a row value with a filter literal, numerically when possible"""
+    if isinstance(left, (int, float)) and not isinstance(left, bool):
+        try:
+            return left, float(right)
+        except ValueError:
+            pass
+    return str(left), right
+
+
+def _match(row, key, expression):
+    """Evaluate one PostgREST horizontal filter against a row"""
+    negate = expression.startswith('not.')
+    if negate:
+        expression = expression[4:]
+    operator, _, operand = expression.partition('.')
+    value = row.get(key)
+
+    if operator == 'eq':
+        result = value is not None and str(value) == operand if not isinstance(value, bool) else value == _coerce(operand)
+    elif operator == 'neq':
+        result = value is not None and str(value) != operand
+    elif operator == 'in':
+        options = [option.strip().strip('"') for option in operand.strip('()').split(',')] if operand.strip('()') else []
+        result = value is not None and str(value) in options
+    elif operator in ('gt', 'gte', 'lt', 'lte'):
+        if value is None:
+            result = False
+        else:
+            left, right = _compare(value, operand)
+            result = {'gt': left > right, 'gte': left >= right, 'lt': left < right, 'lte': left <= right}[operator]
+    elif operator in ('like', 'ilike'):
+        pattern = '^' + re.escape(operand).replace(r'\*', '.*').replace('%', '.*') + '$'
+        result = value is not None and re.match(pattern, str(value), re.IGNORECASE if operator == 'ilike' else 0) is not None
+    elif operator == 'cs':
+        wanted = json.loads(operand) if operand.startswith('[') else [item.strip('"') for item in operand.strip('{}').split(',')]
+        result = isinstance(value, list) and all(item in value for item in wanted)
+    elif operator == 'is':
+        result = value is _coerce(operand) or (operand == 'null' and value is None)
+    else:
+        raise ValueError(f'Unsupported filter operator: {operator}')
+
+    return not result if negate else result
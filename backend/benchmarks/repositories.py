@@ -0,0 +1,140 @@
+"""Compare the latency of the directory repositories.
+
+Starts benchmarks.fake_supabase.FakeSupabase with a synthetic directory and
+seeds a throwaway SQLite database (or a test database on the server in
+DATABASE_URL) with the same rows, a few users without details included.
+Then times each directory operation --repeat times through
+api.repositories.RestRepository and OrmRepository and reports p50/p99, with
+--latency injected into every PostgREST call as the network hop to
+Supabase.
+
+tests/test_repositories.py checks on the same data that both return equal
+entries (payload, ETag and Last-Modified) for every query, sync and async.
+
+Usage (from backend/):
+
+    python -m benchmarks.repositories
+    python -m benchmarks.repositories --employees 5000 --latency 0.01 --repeat 500
+    DATABASE_URL=postgres://... python -m benchmarks.repositories
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from .fake_supabase import ROLES, FakeSupabase
+from .run import BACKEND_DIR, percentile
+
+# Every tenth user has no user_details row
+WITHOUT_DETAILS_EVERY = 10
+
+def configure_environment(fake, workdir):
+    os.environ.setdefault('DATABASE_URL', f'sqlite:///{workdir / "repositories.sqlite3"}')
+    os.environ.update({
+        'DJANGO_SETTINGS_MODULE': 'employee_tracker.settings',
+        'SUPABASE_URL': fake.url,
+        'SUPABASE_API_KEY': 'benchmark-api-key',
+        'API_LOG_LEVEL': 'CRITICAL',
+    })
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+
+
+def seed(fake):
+    """Drop some details from the fake, then mirror it into the ORM tables with its timestamps"""
+    from django.utils.dateparse import parse_datetime
+
+    from api.models import UserDetails
+    from benchmarks.run import seed_database
+
+    without = {user['id'] for user in fake.tables['users'][::WITHOUT_DETAILS_EVERY]}
+    fake.tables['user_details'] = [row for row in fake.tables['user_details'] if row['user_id'] not in without]
+    seed_database(fake)
+
+    # updated_at is auto_now; Last-Modified must come from the same timestamps
+    details = list(UserDetails.objects.all())
+    updated = {row['id']: parse_datetime(row['updated_at']) for row in fake.tables['user_details']}
+    for row in details:
+        row.updated_at = updated[str(row.id)]
+    UserDetails.objects.bulk_update(details, ['updated_at'], batch_size=2000)
+
+
+def query_for(params, cursor=None):
+    from django.http import QueryDict
+
+    from api.directory import EmployeeQuery
+
+    query_dict = QueryDict(mutable=True)
+    query_dict.update(params)
+    if cursor:
+        query_dict['cursor'] = cursor
+    return EmployeeQuery.from_params(query_dict)
+
+
+def time_operation(function, repeat):
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return percentile(latencies, 0.50) * 1000, percentile(latencies, 0.99) * 1000
+
+
+def run_latency(fake, rest, orm, options):
+    user_ids = [user['id'] for user in fake.tables['users']]
+    operations = [
+        ('page of 100', lambda repository: repository.employees_page(query_for({'limit': '100'}))),
+        ('filtered page', lambda repository: repository.employees_page(
+            query_for({'role': ROLES[0], 'office_days': 'Monday', 'limit': '100'}))),
+        ('full listing', lambda repository: repository.employees_page(query_for({}))),
+        ('profile', lambda repository: repository.user_profile(user_ids[1])),
+        ('batch of 50', lambda repository: repository.profiles(user_ids[:50])),
+    ]
+
+    print(f'\nLatency over {options.repeat} calls, {options.latency * 1000:.1f} ms injected per PostgREST call')
+    print(f'  {"operation":<16} {"rest p50":>9} {"orm p50":>9} {"rest p99":>9} {"orm p99":>9} {"speedup":>8}')
+    for name, operation in operations:
+        repeat = max(1, options.repeat // 10) if name == 'full listing' else options.repeat
+        rest_p50, rest_p99 = time_operation(lambda: operation(rest), repeat)
+        orm_p50, orm_p99 = time_operation(lambda: operation(orm), repeat)
+        print(f'  {name:<16} {rest_p50:>9.2f} {orm_p50:>9.2f} {rest_p99:>9.2f} {orm_p99:>9.2f} '
+              f'{rest_p50 / orm_p50:>7.1f}x', flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--employees', type=int, default=1000, help='Synthetic employees to seed')
+    parser.add_argument('--latency', type=float, default=0.002, help='Seconds injected per PostgREST call')
+    parser.add_argument('--repeat', type=int, default=200, help='Timed calls per operation and backend')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the synthetic directory')
+    options = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='api-repositories-') as tmp, \
+            FakeSupabase(employees=options.employees, seed=options.seed) as fake:
+        configure_environment(fake, Path(tmp))
+        import django
+        django.setup()
+        from django.db import connection
+
+        from api.repositories import OrmRepository, RestRepository
+
+        old_name = None
+        if connection.vendor == 'postgresql':
+            old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            seed(fake)
+            fake.latency = options.latency
+            print(f'RestRepository and OrmRepository ({connection.vendor}, {options.employees} employees)')
+            run_latency(fake, RestRepository(), OrmRepository(), options)
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
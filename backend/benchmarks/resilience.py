@@ -0,0 +1,136 @@
+"""Drive the API through upstream failures and report how it degrades.
+
+Starts benchmarks.fake_supabase.FakeSupabase and sends directory requests
+(employee pages and profiles, with the directory cache TTL at 0 so every
+request reaches the upstream) through Django's test client while the fake
+goes through a sequence of phases: healthy, flaky (a share of 503s), slow
+(latency beyond the read deadline), down (every request fails) and
+recovered. For each phase it reports the responses by status, how many
+were served from the last good payload, the latency, the upstream calls per
+request and the circuit breaker and retry budget afterwards.
+
+What to look for: retries absorb the flaky phase; in the slow and down
+phases requests take at most about one deadline, then the breaker opens and
+they fail fast (or are served stale); after BREAKER_RESET one probe closes
+the breaker again.
+
+Usage (from backend/):
+
+    python -m benchmarks.resilience
+    python -m benchmarks.resilience --requests 100 --deadline 0.5 --reset 2
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+from .fake_supabase import FakeSupabase
+from .run import BACKEND_DIR, percentile
+
+# latency None means three read deadlines. Every phase but `recovered`
+# starts with fresh breakers; `recovered` waits out BREAKER_RESET first and
+# `down, cold` also drops the last good payloads, so nothing can be served stale.
+PHASES = [
+    {'name': 'healthy', 'latency': 0.0, 'error_rate': 0.0},
+    {'name': 'flaky 30%', 'latency': 0.0, 'error_rate': 0.3},
+    {'name': 'slow', 'latency': None, 'error_rate': 0.0},
+    {'name': 'down', 'latency': 0.0, 'error_rate': 1.0},
+    {'name': 'down, cold', 'latency': 0.0, 'error_rate': 1.0, 'cold': True},
+    {'name': 'recovered', 'latency': 0.0, 'error_rate': 0.0, 'recovery': True},
+]
+
+
+def configure_environment(fake, options, workdir):
+    os.environ.update({
+        'DJANGO_SETTINGS_MODULE': 'employee_tracker.settings',
+        'SUPABASE_URL': fake.url,
+        'SUPABASE_API_KEY': 'benchmark-api-key',
+        'DATABASE_URL': f'sqlite:///{workdir / "resilience.sqlite3"}',
+        'DIRECTORY_CACHE_TTL': '0',
+        'SUPABASE_READ_DEADLINE': str(options.deadline),
+        'SUPABASE_BREAKER_RESET': str(options.reset),
+        'API_LOG_LEVEL': 'CRITICAL',
+    })
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+
+
+def run_phase(client, fake, paths, options):
+    from api.cache import directory_cache
+    from api.resilience import get_upstream
+
+    statuses, latencies = Counter(), []
+    stale_before, calls_before = directory_cache.stale_served, fake.request_count
+    for index in range(options.requests):
+        started = time.perf_counter()
+        response = client.get(paths[index % len(paths)])
+        latencies.append(time.perf_counter() - started)
+        statuses[response.status_code] += 1
+
+    latencies.sort()
+    upstream = get_upstream('postgrest')
+    return {
+        'statuses': dict(sorted(statuses.items())),
+        'stale': directory_cache.stale_served - stale_before,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 1),
+        'max_ms': round(latencies[-1] * 1000, 1),
+        'upstream_per_request': round((fake.request_count - calls_before) / options.requests, 2),
+        'breaker': upstream.breaker.state,
+        'retries': upstream.budget.retries,
+        'retries_denied': upstream.budget.denied,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--employees', type=int, default=200, help='Synthetic employees in the fake')
+    parser.add_argument('--requests', type=int, default=60, help='Requests per phase')
+    parser.add_argument('--deadline', type=float, default=0.3, help='SUPABASE_READ_DEADLINE in seconds')
+    parser.add_argument('--reset', type=float, default=1.0, help='SUPABASE_BREAKER_RESET in seconds')
+    options = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='api-resilience-') as tmp, \
+            FakeSupabase(employees=options.employees) as fake:
+        configure_environment(fake, options, Path(tmp))
+        import django
+        django.setup()
+        import logging
+        from django.conf import settings
+        from django.test import Client
+        from api.cache import directory_cache
+        from api.resilience import reset_upstreams
+
+        settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        client = Client(raise_request_exception=False)
+        users = fake.tables['users'][:5]
+        paths = ['/api/employees/?limit=20'] + [f'/api/users/{user["id"]}/details/' for user in users]
+
+        print(f'{options.requests} requests per phase, read deadline {options.deadline}s, '
+              f'breaker reset {options.reset}s')
+        print(f'  {"phase":<12} {"statuses":<22} {"stale":>6} {"p50 ms":>8} {"max ms":>8} '
+              f'{"upstream":>9} {"breaker":>10} {"retries":>8} {"denied":>7}')
+        for phase in PHASES:
+            if phase.get('recovery'):
+                time.sleep(options.reset + 0.1)
+            else:
+                reset_upstreams()
+            if phase.get('cold'):
+                directory_cache._last_good.clear()
+            fake.latency = options.deadline * 3 if phase['latency'] is None else phase['latency']
+            fake.error_rate = phase['error_rate']
+            result = run_phase(client, fake, paths, options)
+            statuses = ' '.join(f'{status}:{count}' for status, count in result['statuses'].items())
+            print(f'  {phase["name"]:<12} {statuses:<22} {result["stale"]:>6} {result["p50_ms"]:>8} {result["max_ms"]:>8} '
+                  f'{result["upstream_per_request"]:>9} {result["breaker"]:>10} {result["retries"]:>8} '
+                  f'{result["retries_denied"]:>7}', flush=True)
+            # Leave the fake quiet so slow requests still in flight finish
+            fake.latency = 0.0
+
+
+if __name__ == '__main__':
+    main()
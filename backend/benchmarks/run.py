@@ -0,0 +1,453 @@
+"""Benchmark every API route against a local Supabase stand-in.
+
+Starts benchmarks.fake_supabase.FakeSupabase with a synthetic directory of
+N employees and an injected upstream latency, points the API at it, seeds the
+ORM tables in a throwaway SQLite database with the same rows and drives each
+route in api/urls.py through Django's test client from a pool of workers.
+Reports requests, errors, throughput, p50/p95/p99 latency and the mean
+response body size per route; --accept-encoding shows what compression saves.
+
+Usage (from backend/):
+
+    python -m benchmarks.run --employees 10,1000,100000 --latency 0.03 --jitter 0.01
+    python -m benchmarks.run --json results/baseline.json
+    python -m benchmarks.run --accept-encoding gzip --compare results/baseline.json
+
+Runs use a fixed seed, so results with the same options are comparable
+between commits; --compare prints the relative change against a previous
+--json report.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from .fake_supabase import WORDS, FakeSupabase
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+JWT_SECRET = 'benchmark-secret'
+# Long-lived streams have no request latency to measure
+STREAMING_ROUTES = {'presence/stream/'}
+PASSWORD = 'benchmark-password'
+
+
+def configure_environment(fake, options, workdir):
+    """Point the settings at the fake before Django is set up"""
+    os.environ.update({
+        'DJANGO_SETTINGS_MODULE': 'employee_tracker.settings',
+        'SUPABASE_URL': fake.url,
+        'SUPABASE_API_KEY': 'benchmark-api-key',
+        'SUPABASE_JWT_SECRET': JWT_SECRET,
+        'DATABASE_URL': f'sqlite:///{workdir / "benchmark.sqlite3"}',
+        'THUMBNAIL_ROOT': str(workdir / 'thumbnails'),
+        'API_ASYNC_VIEWS': 'true' if options.async_views else 'false',
+        'DIRECTORY_CACHE_TTL': '0' if options.no_cache else os.environ.get('DIRECTORY_CACHE_TTL', '300'),
+        'API_LOG_LEVEL': 'CRITICAL',
+    })
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+
+
+def point_at(fake):
+    """Re-point the shared Supabase clients at a freshly started fake"""
+    from api.cache import directory_cache
+    from api.supabase_client import reset_supabase_clients
+
+    os.environ['SUPABASE_URL'] = fake.url
+    reset_supabase_clients()
+    directory_cache.invalidate()
+
+
+def seed_database(fake):
+    """Mirror the fake's users and user_details rows into the ORM tables"""
+    from django.db import connection
+    from api.models import EmployeeTombstone, User, UserDetails, WorkforceSummary
+    from api.summary import reconcile
+
+    with connection.schema_editor() as editor:
+        for model in (WorkforceSummary, EmployeeTombstone, UserDetails, User):
+            if model._meta.db_table in connection.introspection.table_names():
+                editor.delete_model(model)
+        for model in (User, UserDetails, EmployeeTombstone, WorkforceSummary):
+            editor.create_model(model)
+
+    User.objects.bulk_create([
+        User(id=row['id'], email=row['Email'], forename=row['forename'], lastname=row['lastname'])
+        for row in fake.tables['users']
+    ], batch_size=2000)
+    detail_fields = [field.name for field in UserDetails._meta.concrete_fields
+                     if field.name not in ('id', 'user', 'created_at', 'updated_at')]
+    UserDetails.objects.bulk_create([
+        UserDetails(id=row['id'], user_id=row['user_id'], **{name: row[name] for name in detail_fields})
+        for row in fake.tables['user_details']
+    ], batch_size=2000)
+    reconcile()
+
+
+class Scenario:
+    """One benchmarked request shape for a route"""
+
+    def __init__(self, name, method, path, body=None, headers=None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.body = body
+        self.headers = headers
+
+    def request(self, index):
+        path = self.path(index) if callable(self.path) else self.path
+        body = self.body(index) if callable(self.body) else self.body
+        headers = self.headers(index) if callable(self.headers) else (self.headers or {})
+        return path, body, headers
+
+
+def build_scenarios(fake, client):
+    """Scenarios covering every route in api/urls.py, keyed by scenario name"""
+    from api import thumbnails
+
+    users = fake.tables['users']
+    sample = users[: max(1, min(len(users), 500))]
+
+    def user_at(index):
+        return sample[index % len(sample)]
+
+    details = fake.tables['user_details'][:len(sample)]
+
+    def details_at(index):
+        return details[index % len(details)]
+
+    session = client.post('/api/auth/login/', json.dumps({'email': sample[0]['Email'], 'password': PASSWORD}),
+                          content_type='application/json').json()['session']
+    bearer = {'Authorization': f'Bearer {session["access_token"]}'}
+    employees_etag = client.get('/api/employees/').headers.get('ETag', '')
+    sync_token = client.get('/api/employees/changes/').json()['sync_token']
+
+    photo = next(iter(sorted(thumbnails.photos_dir().glob(f'*{thumbnails.PHOTO_SUFFIX}'))), None)
+    photo_path = None
+    if photo is not None:
+        digest = thumbnails.content_digest(photo)
+        photo_path = f'/api/photos/{photo.stem}/{digest}/{thumbnails.DEFAULT_SIZE}.{thumbnails.DEFAULT_FORMAT}'
+
+    run_id = uuid.uuid4().hex[:8]
+    scenarios = [
+        Scenario('api root', 'GET', '/api/'),
+        Scenario('users list', 'GET', '/api/users/'),
+        Scenario('users detail', 'GET', lambda i: f'/api/users/{user_at(i)["id"]}/'),
+        Scenario('users with_details', 'GET', '/api/users/with_details/'),
+        Scenario('user-details list', 'GET', '/api/user-details/'),
+        Scenario('user-details detail', 'GET', lambda i: f'/api/user-details/{details_at(i)["id"]}/'),
+        Scenario('user-details summary', 'GET', '/api/user-details/summary/'),
+        Scenario('employees', 'GET', '/api/employees/'),
+        Scenario('employees (304)', 'GET', '/api/employees/',
+                 headers={'If-None-Match': employees_etag}),
+        Scenario('employees page', 'GET',
+                 '/api/employees/?limit=50&fields=id,first_name,last_name,today_location,workload_status'),
+        Scenario('employees filtered', 'GET',
+                 '/api/employees/?today_location=MUC%20Office&office_days=Monday&fields=id,first_name'),
+        Scenario('employees changes (full)', 'GET', '/api/employees/changes/'),
+        Scenario('employees changes', 'GET', f'/api/employees/changes/?since={sync_token}'),
+        Scenario('employees create', 'POST', '/api/employees/create/',
+                 body=lambda i: {'email': f'bench-{run_id}-{i}@summ-ai.com', 'first_name': 'Bench',
+                                 'last_name': f'Employee{i}', 'role': 'Engineer'}),
+        # Allocated emails: every request hires 100 people named like earlier ones
+        Scenario('employees bulk', 'POST', '/api/employees/bulk/',
+                 body=lambda i: {'employees': [{'first_name': f'Bench{n % 10}', 'last_name': 'Hire',
+                                                'role': 'Engineer', 'office_days': ['Monday']}
+                                               for n in range(100)]}),
+        Scenario('employees search', 'GET', lambda i: f'/api/employees/search/?q={WORDS[i % len(WORDS)][:4]}'),
+        Scenario('office day', 'GET', '/api/office/?day=Thursday&location=Munich'),
+        Scenario('employees cache', 'GET', '/api/employees/cache/'),
+        Scenario('upstreams', 'GET', '/api/upstreams/'),
+        Scenario('status', 'GET', '/api/status/'),
+        Scenario('metrics', 'GET', '/api/metrics/'),
+        Scenario('auth signup', 'POST', '/api/auth/signup/',
+                 body=lambda i: {'email': f'signup-{run_id}-{i}@summ-ai.com', 'password': PASSWORD,
+                                 'forename': 'Bench', 'lastname': f'Signup{i}'}),
+        Scenario('auth login', 'POST', '/api/auth/login/',
+                 body=lambda i: {'email': user_at(i)['Email'], 'password': PASSWORD}),
+        Scenario('auth logout', 'POST', '/api/auth/logout/', headers=bearer),
+        Scenario('auth me', 'GET', '/api/auth/me/', headers=bearer),
+        Scenario('user details', 'GET',
+                 lambda i: f'/api/users/{user_at(i)["id"]}/details/'),
+        Scenario('user details batch', 'GET',
+                 lambda i: '/api/users/details/?ids=' + ','.join(user_at(i + n)['id'] for n in range(20))),
+        Scenario('user details batch (POST)', 'POST', '/api/users/details/',
+                 body=lambda i: {'ids': [user_at(i + n)['id'] for n in range(200)]}),
+    ]
+    if photo_path:
+        scenarios.append(Scenario('photo variant', 'GET', photo_path))
+    return scenarios
+
+
+def uncovered_routes(scenarios):
+    """Routes in api/urls.py that no scenario exercises"""
+    from django.urls import URLPattern, URLResolver, resolve
+    from api import urls
+
+    def walk(patterns, prefix=''):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                yield from walk(pattern.url_patterns, prefix + str(pattern.pattern).lstrip('^'))
+            elif isinstance(pattern, URLPattern):
+                yield prefix + str(pattern.pattern).lstrip('^')
+
+    # Format-suffix variants added by the router serve the same views
+    routes = {route for route in walk(urls.urlpatterns) if 'format>' not in route} - STREAMING_ROUTES
+    covered = {resolve(urlsplit(scenario.request(0)[0]).path).route.removeprefix('api/') for scenario in scenarios}
+    return sorted(routes - covered)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(results, elapsed):
+    """Stats over (latency, error, body size) results"""
+    latencies = sorted(latency for latency, _, _ in results)
+    total = len(latencies)
+    return {
+        'requests': total,
+        'errors': sum(error for _, error, _ in results),
+        'rps': round(total / elapsed, 2) if elapsed else None,
+        'p50_ms': _ms(percentile(latencies, 0.50)),
+        'p95_ms': _ms(percentile(latencies, 0.95)),
+        'p99_ms': _ms(percentile(latencies, 0.99)),
+        'body_kb': round(sum(size for _, _, size in results) / total / 1024, 1) if total else None,
+    }
+
+
+def _ms(value):
+    return None if value is None else round(value * 1000, 2)
+
+
+def _client(client_class):
+    return client_class(raise_request_exception=False)
+
+
+def _request_kwargs(scenario, index, options):
+    path, body, headers = scenario.request(index)
+    if options.accept_encoding:
+        headers = {'Accept-Encoding': options.accept_encoding, **headers}
+    kwargs = {'headers': headers}
+    if body is not None:
+        kwargs.update(data=json.dumps(body), content_type='application/json')
+    return path, kwargs
+
+
+def _send(client, scenario, index, options):
+    path, kwargs = _request_kwargs(scenario, index, options)
+    return getattr(client, scenario.method.lower())(path, **kwargs)
+
+
+def _is_error(response):
+    return response.status_code >= 400
+
+
+def _body_size(response):
+    # File responses (photo variants) stream their body
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def run_sync(scenario, options):
+    """Drive one scenario from a thread pool, one test client per thread"""
+    from django.test import Client
+
+    local = threading.local()
+
+    def one(index):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = _client(Client)
+        started = time.perf_counter()
+        response = _send(client, scenario, index, options)
+        return time.perf_counter() - started, _is_error(response), _body_size(response)
+
+    for index in range(options.warmup):
+        one(index)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=options.concurrency) as pool:
+        results = list(pool.map(one, range(options.warmup, options.warmup + options.requests)))
+    elapsed = time.perf_counter() - started
+    return summarize(results, elapsed)
+
+
+async def _run_async(scenario, options):
+    from django.test import AsyncClient
+
+    client = _client(AsyncClient)
+    semaphore = asyncio.Semaphore(options.concurrency)
+
+    async def one(index):
+        path, kwargs = _request_kwargs(scenario, index, options)
+        async with semaphore:
+            started = time.perf_counter()
+            response = await getattr(client, scenario.method.lower())(path, **kwargs)
+            return time.perf_counter() - started, _is_error(response), _body_size(response)
+
+    for index in range(options.warmup):
+        await one(index)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one(index) for index in range(options.warmup, options.warmup + options.requests)))
+    elapsed = time.perf_counter() - started
+    return summarize(results, elapsed)
+
+
+def run_async(scenario, options):
+    """Drive one scenario concurrently through the ASGI handler on one event loop"""
+    return asyncio.run(_run_async(scenario, options))
+
+
+def benchmark_size(size, options, first_fake=None):
+    from django.test import Client
+
+    fake = first_fake or FakeSupabase(employees=size, latency=options.latency, jitter=options.jitter,
+                                      jwt_secret=JWT_SECRET, password=PASSWORD, seed=options.seed).start()
+    try:
+        point_at(fake)
+        seed_database(fake)
+        # Latency is only injected into the timed requests, not the setup calls
+        fake.latency, fake.jitter = 0.0, 0.0
+        scenarios = build_scenarios(fake, _client(Client))
+        fake.latency, fake.jitter = options.latency, options.jitter
+
+        selected = [s for s in scenarios if not options.routes or s.name in options.routes]
+        runner = run_async if options.async_views else run_sync
+        results = {}
+        for scenario in selected:
+            calls_before = fake.request_count
+            result = runner(scenario, options)
+            total_requests = options.warmup + options.requests
+            result['upstream_calls_per_request'] = round((fake.request_count - calls_before) / total_requests, 2)
+            results[scenario.name] = result
+            _print_row(scenario.name, result, options)
+        missing = uncovered_routes(scenarios)
+        if missing:
+            print(f'  routes without a scenario: {", ".join(missing)}')
+        return results
+    finally:
+        fake.stop()
+
+
+HEADER = f'  {"route":<26} {"reqs":>6} {"err":>5} {"rps":>9} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"upstream":>9} {"body kB":>9}'
+
+
+def _print_row(name, result, options):
+    if options.json == '-':
+        return
+    print(f'  {name:<26} {result["requests"]:>6} {result["errors"]:>5} {result["rps"]:>9} '
+          f'{result["p50_ms"]:>9} {result["p95_ms"]:>9} {result["p99_ms"]:>9} '
+          f'{result["upstream_calls_per_request"]:>9} {result["body_kb"]:>9}', flush=True)
+
+
+def compare(report, baseline):
+    """Print the relative change of each metric against a baseline report"""
+    print('\nChange vs baseline (negative latency and size / positive rps is better):')
+    for size, routes in report['results'].items():
+        base_routes = baseline.get('results', {}).get(size)
+        if base_routes is None:
+            print(f'  {size} employees: not in baseline')
+            continue
+        print(f'  {size} employees')
+        for name, result in routes.items():
+            base = base_routes.get(name)
+            if base is None:
+                continue
+            changes = []
+            for metric in ('rps', 'p50_ms', 'p95_ms', 'p99_ms', 'body_kb'):
+                if result.get(metric) and base.get(metric):
+                    changes.append(f'{metric} {(result[metric] - base[metric]) / base[metric]:+.1%}')
+            print(f'    {name:<26} ' + '  '.join(changes))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the API against a local Supabase stand-in')
+    parser.add_argument('--employees', default='10,1000',
+                        help='Comma-separated directory sizes to benchmark (e.g. 10,1000,100000)')
+    parser.add_argument('--latency', type=float, default=0.02, help='Injected upstream latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.005, help='Extra uniform random latency in seconds')
+    parser.add_argument('--requests', type=int, default=200, help='Timed requests per route')
+    parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per route before measuring')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent in-flight requests')
+    parser.add_argument('--routes', nargs='*', help='Only run the named scenarios')
+    parser.add_argument('--async-views', action='store_true', help='Serve hot routes with the async views')
+    parser.add_argument('--no-cache', action='store_true', help='Disable the directory cache (TTL 0)')
+    parser.add_argument('--accept-encoding', default='',
+                        help='Accept-Encoding sent with every request, e.g. "gzip" or "br, gzip"')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the synthetic directory')
+    parser.add_argument('--json', help='Write the report as JSON to this path ("-" for stdout)')
+    parser.add_argument('--compare', help='Baseline JSON report to compare against')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    sizes = [int(size) for size in options.employees.split(',') if size]
+
+    with tempfile.TemporaryDirectory(prefix='api-benchmark-') as tmp:
+        workdir = Path(tmp)
+        # Settings read SUPABASE_URL at import time, so the first fake has to
+        # be running before Django is set up.
+        first_fake = FakeSupabase(employees=sizes[0], latency=options.latency, jitter=options.jitter,
+                                  jwt_secret=JWT_SECRET, password=PASSWORD, seed=options.seed).start()
+        configure_environment(first_fake, options, workdir)
+        import django
+        django.setup()
+        from django.conf import settings
+        # Same allowance Django's test runner makes for the test client host
+        settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+        # Failed requests are counted per route; their tracebacks are noise here
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+
+        report = {
+            'meta': {
+                'latency': options.latency,
+                'jitter': options.jitter,
+                'requests': options.requests,
+                'concurrency': options.concurrency,
+                'async_views': options.async_views,
+                'cache': not options.no_cache,
+                'accept_encoding': options.accept_encoding,
+                'seed': options.seed,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            },
+            'results': {},
+        }
+        for index, size in enumerate(sizes):
+            if options.json != '-':
+                print(f'\n{size} employees, {options.latency * 1000:.0f}±{options.jitter * 1000:.0f} ms upstream, '
+                      f'concurrency {options.concurrency}')
+                print(HEADER)
+            report['results'][str(size)] = benchmark_size(size, options, first_fake if index == 0 else None)
+
+    if options.json == '-':
+        json.dump(report, sys.stdout, indent=2)
+    elif options.json:
+        Path(options.json).parent.mkdir(parents=True, exist_ok=True)
+        Path(options.json).write_text(json.dumps(report, indent=2))
+    if options.compare:
+        compare(report, json.loads(Path(options.compare).read_text()))
+
+
+if __name__ == '__main__':
+    main()
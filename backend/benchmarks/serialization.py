@@ -0,0 +1,155 @@
+"""Compare serializer-based and values()-based list payloads at scale.
+
+Seeds a throwaway SQLite database with N synthetic employees (the rows
+benchmarks.fake_supabase generates) and times, for each list payload, the
+DRF path (a ModelSerializer per row, rendered by the stock JSONRenderer)
+against the projection path (api/projections.py dicts from values(),
+rendered with orjson by api.renderers.ORJSONRenderer). The employees case
+renders get_employees' PostgREST-row payload with both renderers. Each path
+runs --repeat times and the fastest run is reported, after checking that
+both paths produce the same JSON document.
+
+Usage (from backend/):
+
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --rows 10000,100000 --repeat 3
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from .fake_supabase import synthesize_directory
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def configure_environment(workdir):
+    os.environ.update({
+        'DJANGO_SETTINGS_MODULE': 'employee_tracker.settings',
+        'DATABASE_URL': f'sqlite:///{workdir / "serialization.sqlite3"}',
+        'THUMBNAIL_ROOT': str(workdir / 'thumbnails'),
+        'API_LOG_LEVEL': 'CRITICAL',
+    })
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+
+
+def serializer_with_details(queryset):
+    """UserViewSet.with_details as it was built with a serializer pair per user"""
+    from api.models import UserDetails
+    from api.views import UserDetailsSerializer, UserSerializer
+
+    data = []
+    for user in queryset.select_related('details'):
+        user_data = UserSerializer(user).data
+        try:
+            user_data['details'] = UserDetailsSerializer(user.details).data
+        except UserDetails.DoesNotExist:
+            user_data['details'] = None
+        data.append(user_data)
+    return data
+
+
+def build_cases(users, details):
+    """(name, serializer path, projection path); each path returns rendered bytes"""
+    from rest_framework.renderers import JSONRenderer
+
+    from api.models import User, UserDetails
+    from api.payloads import employee_payload
+    from api.projections import user_details_rows, user_rows, users_with_details_rows
+    from api.renderers import ORJSONRenderer
+    from api.views import UserDetailsSerializer, UserSerializer
+
+    stock, fast = JSONRenderer(), ORJSONRenderer()
+    details_by_user = {row['user_id']: row for row in details}
+    employees = {'employees': [employee_payload(user, details_by_user.get(user['id'], {})) for user in users]}
+
+    return [
+        ('users list',
+         lambda: stock.render(UserSerializer(User.objects.all(), many=True).data),
+         lambda: fast.render(user_rows(User.objects.all()))),
+        ('user-details list',
+         lambda: stock.render(UserDetailsSerializer(UserDetails.objects.select_related('user'), many=True).data),
+         lambda: fast.render(user_details_rows(UserDetails.objects.all()))),
+        ('users with_details',
+         lambda: stock.render(serializer_with_details(User.objects.all())),
+         lambda: fast.render(users_with_details_rows(User.objects.all()))),
+        ('employees (render only)',
+         lambda: stock.render(employees),
+         lambda: fast.render(employees)),
+    ]
+
+
+def best_of(function, repeat):
+    timings, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def benchmark_size(rows, options):
+    from benchmarks.run import seed_database
+
+    users, details = synthesize_directory(rows, seed=options.seed)
+    seed_database(SimpleNamespace(tables={'users': users, 'user_details': details}))
+
+    results = []
+    for name, serializer_path, projection_path in build_cases(users, details):
+        slow, slow_body = best_of(serializer_path, options.repeat)
+        fast, fast_body = best_of(projection_path, options.repeat)
+        if json.loads(slow_body) != json.loads(fast_body):
+            sys.exit(f'{name}: the serializer and projection paths disagree at {rows} rows')
+        results.append({
+            'rows': rows,
+            'case': name,
+            'serializer_ms': slow * 1000,
+            'projection_ms': fast * 1000,
+            'speedup': slow / fast if fast else None,
+            'bytes': len(fast_body),
+        })
+        print(f'{rows:>8} {name:<24} {slow * 1000:>11.1f} {fast * 1000:>11.1f} '
+              f'{slow / fast:>7.1f}x {len(fast_body) / 1e6:>8.1f}')
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', default='10000,100000', help='Comma-separated employee counts')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per path; the fastest is reported')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the synthetic directory')
+    parser.add_argument('--json', help='Write the results as JSON to this path ("-" for stdout)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    sizes = [int(size) for size in options.rows.split(',')]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        configure_environment(Path(workdir))
+        import django
+        django.setup()
+
+        print(f"{'rows':>8} {'case':<24} {'serializer':>11} {'projection':>11} {'speedup':>8} {'MB':>8}")
+        results = []
+        for rows in sizes:
+            results.extend(benchmark_size(rows, options))
+
+    if options.json:
+        report = json.dumps({'repeat': options.repeat, 'seed': options.seed, 'results': results}, indent=2)
+        if options.json == '-':
+            print(report)
+        else:
+            Path(options.json).write_text(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Measure the cold-start cost of the backend with `python -X importtime`.
+
+Runs each startup path in a fresh interpreter under -X importtime: importing
+the settings module, django.setup(), and loading the WSGI application with
+the URLconf (what a worker does before serving its first request). For each
+path it reports the import time on top of a bare interpreter (the median of
+--repeat runs) and the number of modules it imports; --top lists the
+slowest top-level imports of each path. The database in DATABASE_URL is
+used if set (its driver is part of the cost), otherwise an in-memory SQLite
+database.
+
+tests/test_startup.py guards the machine-independent properties with the
+same helpers: settings neither prints nor loads python-dotenv, no path
+imports a Supabase SDK package, and each stays under a module count.
+
+Usage (from backend/):
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --repeat 9 --top 10
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+from .run import BACKEND_DIR
+
+# Supabase SDK packages that must not be imported at startup
+SDK_PACKAGES = ('supabase', 'gotrue', 'postgrest', 'realtime', 'storage3', 'supafunc', 'websockets', 'aiohttp')
+
+# (name, code run in a fresh interpreter)
+PATHS = [
+    ('settings', 'import employee_tracker.settings'),
+    ('django.setup', 'import django; django.setup()'),
+    ('wsgi + urls', 'import employee_tracker.wsgi; import employee_tracker.urls'),
+]
+
+
+def parse_importtime(stderr):
+    """(module, self µs, cumulative µs, nesting depth) per -X importtime line"""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        imports.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return imports
+
+
+def run_path(code):
+    env = {
+        **os.environ,
+        'DJANGO_SETTINGS_MODULE': 'employee_tracker.settings',
+        'DATABASE_URL': os.environ.get('DATABASE_URL', 'sqlite://:memory:'),
+        'SUPABASE_URL': os.environ.get('SUPABASE_URL', 'https://startup-check.supabase.co'),
+        'SUPABASE_API_KEY': os.environ.get('SUPABASE_API_KEY', 'startup-check-key'),
+    }
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f'{code!r} failed:\n{result.stderr[-2000:]}')
+    return result.stdout, parse_importtime(result.stderr)
+
+
+def baseline_modules():
+    """Modules every interpreter imports (site, encodings, ...), which are not counted"""
+    return {module for module, _, _, _ in run_path('pass')[1]}
+
+
+def measure_path(code, baseline, repeat):
+    """Median import ms of the path beyond the interpreter's own, and its last run's imports"""
+    totals = []
+    for _ in range(repeat):
+        stdout, imports = run_path(code)
+        imports = [item for item in imports if item[0] not in baseline]
+        totals.append(sum(cumulative for _, _, cumulative, depth in imports if depth == 0) / 1000)
+    return statistics.median(totals), stdout, imports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per path; the median is reported')
+    parser.add_argument('--top', type=int, default=0, help='Show the N slowest top-level imports per path')
+    options = parser.parse_args(argv)
+
+    baseline = baseline_modules()
+    print(f'Import time beyond a bare interpreter, median of {options.repeat} runs')
+    for name, code in PATHS:
+        total, _, imports = measure_path(code, baseline, options.repeat)
+        modules = {module for module, _, _, _ in imports}
+        print(f'  {name:<14} {total:>8.1f} ms  ({len(modules)} modules)')
+        if options.top:
+            top = sorted((item for item in imports if item[3] == 0), key=lambda item: -item[2])[:options.top]
+            for module, _, cumulative, _ in top:
+                print(f'  {"":<14} {cumulative / 1000:>8.1f} ms  {module}')
+
+
+if __name__ == '__main__':
+    main()
@@ -10,7 +10,15 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 import os
 
 from django.core.asgi import get_asgi_application
+from dotenv import load_dotenv
 
+# Settings only read os.environ; fill it from .env before they load
+load_dotenv()
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'employee_tracker.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up; adds the presence WebSocket and lifespan
+from api.presence_asgi import PresenceRouter  # noqa: E402
+
+application = PresenceRouter(django_application)
@@ -11,12 +11,13 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 from pathlib import Path
-from dotenv import load_dotenv
 import os
 import dj_database_url
 
-# Load environment variables
-load_dotenv()
+# Settings only read the environment: .env is loaded by the entry points
+# (manage.py, wsgi.py, asgi.py) so importing settings does no file I/O or
+# printing, and the Supabase SDK is imported on first use (see
+# api/supabase_client.py). `python -m benchmarks.startup` checks this.
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -45,6 +46,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.timing.ServerTimingMiddleware',  # First, so it times the whole stack
+    'api.compression.CompressionMiddleware',  # Before anything that reads or changes the body
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -104,6 +107,37 @@ else:
     else:
         raise ValueError("SUPABASE_URL and SUPABASE_DB_PASSWORD must be set in environment variables")
 
+# Keep each worker thread's connection for DATABASE_CONN_MAX_AGE seconds (0
+# opens one per request) and health-check it before reuse; see api/dbpool.py.
+# DATABASE_POOLER=transaction is for a transaction-mode PgBouncer/Supavisor
+# (Supabase's pooler on port 6543): a transaction may run on a different
+# server connection than the previous one, so named server-side cursors,
+# server-side parameter binding and psycopg 3's automatic prepared statements
+# (prepare_threshold=None) are turned off. Session state (SET ...) does not survive between transactions
+# there either, so the database's timezone should be UTC.
+DATABASE_CONN_MAX_AGE = int(os.getenv('DATABASE_CONN_MAX_AGE', '600'))
+DATABASE_CONN_HEALTH_CHECKS = os.getenv('DATABASE_CONN_HEALTH_CHECKS', 'true').lower() == 'true'
+DATABASE_POOLER = os.getenv('DATABASE_POOLER', 'session').lower()
+
+DATABASES['default'].update({
+    'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+    'CONN_HEALTH_CHECKS': DATABASE_CONN_HEALTH_CHECKS,
+})
+if DATABASE_POOLER == 'transaction':
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+    DATABASES['default'].setdefault('OPTIONS', {}).update({
+        'server_side_binding': False,
+        'prepare_threshold': None,
+    })
+
+# Same backends, wrapped to export connection checkout metrics
+INSTRUMENTED_DB_BACKENDS = {
+    'django.db.backends.postgresql': 'api.db_backends.postgresql',
+    'django.db.backends.sqlite3': 'api.db_backends.sqlite3',
+}
+DATABASES['default']['ENGINE'] = INSTRUMENTED_DB_BACKENDS.get(
+    DATABASES['default']['ENGINE'], DATABASES['default']['ENGINE'])
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -141,6 +175,14 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Avatar variants generated from user_photos/ (see api/thumbnails.py)
+USER_PHOTOS_DIR = BASE_DIR.parent / 'user_photos'
+THUMBNAIL_ROOT = Path(os.getenv('THUMBNAIL_ROOT') or BASE_DIR / 'thumbnails')
+# Origin of the API in variant URLs. The React app is served from another
+# origin, so relative URLs would resolve against it; the default matches the
+# frontend's default API URL (VITE_API_URL in frontend/src/services/apiService.js).
+THUMBNAIL_BASE_URL = os.getenv('THUMBNAIL_BASE_URL', 'http://localhost:8000')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -162,16 +204,126 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',  # For development
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'api.renderers.TimedJSONRenderer',
     ],
 }
 
+# Request timing log lines (one JSON object per request, see api/timing.py)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api': {
+            'handlers': ['console'],
+            'level': os.getenv('API_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
 # Supabase settings
 SUPABASE_URL = os.getenv('SUPABASE_URL', '')
 if SUPABASE_URL and not SUPABASE_URL.startswith('https://'):
     SUPABASE_URL = f'https://{SUPABASE_URL}'
 SUPABASE_KEY = os.getenv('SUPABASE_API_KEY', '')
 
-print("Debug - Settings loaded:")
-print(f"SUPABASE_URL from env: {SUPABASE_URL}")
-print(f"SUPABASE_KEY from env: {os.getenv('SUPABASE_API_KEY')[:10]}..." if os.getenv('SUPABASE_API_KEY') else "No key found")
+# Serve the directory/auth hot paths with async views (run under ASGI, e.g.
+# `uvicorn employee_tracker.asgi:application`); see api/async_views.py
+API_ASYNC_VIEWS = os.getenv('API_ASYNC_VIEWS', 'false').lower() == 'true'
+
+# Shared Supabase connection pool (see api/supabase_client.py)
+SUPABASE_POOL_SIZE = int(os.getenv('SUPABASE_POOL_SIZE', '20'))
+SUPABASE_POOL_KEEPALIVE = float(os.getenv('SUPABASE_POOL_KEEPALIVE', '30'))
+SUPABASE_POSTGREST_TIMEOUT = float(os.getenv('SUPABASE_POSTGREST_TIMEOUT', '10'))
+SUPABASE_AUTH_TIMEOUT = float(os.getenv('SUPABASE_AUTH_TIMEOUT', '10'))
+
+# Deadlines, retries and circuit breaker for Supabase calls (see api/resilience.py).
+# DEADLINES overrides the read/write deadline per operation, e.g.
+# {'postgrest:GET users': 2.0, 'auth:POST token': 5.0}
+SUPABASE_RESILIENCE = {
+    'READ_DEADLINE': float(os.getenv('SUPABASE_READ_DEADLINE', '5')),
+    'WRITE_DEADLINE': float(os.getenv('SUPABASE_WRITE_DEADLINE', '10')),
+    'DEADLINES': {},
+    'RETRY_ATTEMPTS': int(os.getenv('SUPABASE_RETRY_ATTEMPTS', '2')),
+    'RETRY_BACKOFF': float(os.getenv('SUPABASE_RETRY_BACKOFF', '0.05')),
+    'RETRY_BUDGET_RATIO': float(os.getenv('SUPABASE_RETRY_BUDGET_RATIO', '0.2')),
+    'BREAKER_FAILURES': int(os.getenv('SUPABASE_BREAKER_FAILURES', '5')),
+    'BREAKER_RESET': float(os.getenv('SUPABASE_BREAKER_RESET', '30')),
+}
+
+# Local access-token verification (see api/auth.py)
+SUPABASE_JWT_SECRET = os.getenv('SUPABASE_JWT_SECRET', '')
+SUPABASE_JWKS_URL = os.getenv('SUPABASE_JWKS_URL', '')
+SUPABASE_JWT_AUDIENCE = os.getenv('SUPABASE_JWT_AUDIENCE', 'authenticated')
+# Algorithms accepted for tokens signed with the secret and with JWKS keys
+SUPABASE_JWT_ALGORITHMS = os.getenv('SUPABASE_JWT_ALGORITHMS', 'HS256').split(',')
+SUPABASE_JWKS_ALGORITHMS = os.getenv('SUPABASE_JWKS_ALGORITHMS', 'RS256,ES256').split(',')
+SUPABASE_JWT_CACHE_SIZE = int(os.getenv('SUPABASE_JWT_CACHE_SIZE', '1024'))
+SUPABASE_AUTH_REMOTE_FALLBACK = os.getenv('SUPABASE_AUTH_REMOTE_FALLBACK', 'false').lower() == 'true'
+
+# Employee directory cache (see api/cache.py). Use api.cache.DjangoCacheBackend
+# with a shared CACHES backend when running more than one worker.
+DIRECTORY_CACHE = {
+    'BACKEND': os.getenv('DIRECTORY_CACHE_BACKEND', 'api.cache.LocMemBackend'),
+    'TTL': int(os.getenv('DIRECTORY_CACHE_TTL', '300')),
+    'MAX_ENTRIES': int(os.getenv('DIRECTORY_CACHE_MAX_ENTRIES', '256')),
+    'CACHE_ALIAS': 'default',
+}
+
+# Where directory reads come from (see api/repositories.py): RestRepository
+# goes through PostgREST, OrmRepository joins users and user_details over the
+# database connection and needs direct database access.
+DIRECTORY_REPOSITORY = os.getenv('DIRECTORY_REPOSITORY', 'api.repositories.RestRepository')
+
+# Employee directory pagination (see api/directory.py)
+EMPLOYEES_PAGE_SIZE = int(os.getenv('EMPLOYEES_PAGE_SIZE', '100'))
+EMPLOYEES_MAX_PAGE_SIZE = int(os.getenv('EMPLOYEES_MAX_PAGE_SIZE', '500'))
+
+# Most profiles /api/users/details/ returns per request (see api/profiles.py)
+USER_DETAILS_BATCH_MAX = int(os.getenv('USER_DETAILS_BATCH_MAX', '500'))
+
+# Employee creation (see api/onboarding.py): domain of allocated emails and
+# the largest /api/employees/bulk/ batch
+EMPLOYEE_EMAIL_DOMAIN = os.getenv('EMPLOYEE_EMAIL_DOMAIN', 'summ-ai.com')
+EMPLOYEES_BULK_MAX = int(os.getenv('EMPLOYEES_BULK_MAX', '1000'))
+
+# Delta sync (see api/changes.py): re-read window for late commits, and how
+# long tombstones (and therefore sync tokens) are kept
+EMPLOYEE_SYNC_OVERLAP = int(os.getenv('EMPLOYEE_SYNC_OVERLAP', '5'))
+EMPLOYEE_TOMBSTONE_RETENTION_DAYS = int(os.getenv('EMPLOYEE_TOMBSTONE_RETENTION_DAYS', '30'))
+
+# Who's-in-the-office index (see api/office.py); disable to query PostgREST instead
+OFFICE_INDEX_ENABLED = os.getenv('OFFICE_INDEX_ENABLED', 'true').lower() == 'true'
+OFFICE_INDEX_TTL = int(os.getenv('OFFICE_INDEX_TTL', '300'))
+
+# Employee search (see api/search.py): default and maximum results, and the
+# rebuild interval of the in-process index used on non-PostgreSQL databases
+EMPLOYEE_SEARCH_LIMIT = int(os.getenv('EMPLOYEE_SEARCH_LIMIT', '20'))
+EMPLOYEE_SEARCH_MAX_LIMIT = int(os.getenv('EMPLOYEE_SEARCH_MAX_LIMIT', '100'))
+EMPLOYEE_SEARCH_INDEX_TTL = int(os.getenv('EMPLOYEE_SEARCH_INDEX_TTL', '300'))
+
+# Response compression (see api/compression.py): encodings in order of
+# preference (br and zstd need the brotli/zstandard packages), smallest body
+# worth compressing, and the size of the compressed directory body cache
+RESPONSE_COMPRESSION = {
+    'ENCODINGS': [encoding.strip() for encoding in os.getenv('COMPRESSION_ENCODINGS', 'br,zstd,gzip').split(',')
+                  if encoding.strip()],
+    'MIN_SIZE': int(os.getenv('COMPRESSION_MIN_SIZE', '1024')),
+    'CACHE_MAX_BYTES': int(os.getenv('COMPRESSION_CACHE_MAX_BYTES', str(32 * 1024 * 1024))),
+}
+
+# Presence push over WebSocket/SSE (see api/presence.py). Requires ASGI
+# (employee_tracker.asgi:application); the Realtime bridge also pushes
+# changes made outside this process.
+PRESENCE = {
+    'BACKEND': os.getenv('PRESENCE_BACKEND', 'api.presence.LocalBroker'),
+    'FLUSH_INTERVAL': float(os.getenv('PRESENCE_FLUSH_INTERVAL', '0.25')),
+    'MAX_PENDING': int(os.getenv('PRESENCE_MAX_PENDING', '1000')),
+    'HEARTBEAT': float(os.getenv('PRESENCE_HEARTBEAT', '25')),
+    'SSE_MAX_AGE': float(os.getenv('PRESENCE_SSE_MAX_AGE', '300')),
+    'REALTIME_BRIDGE': os.getenv('PRESENCE_REALTIME_BRIDGE', 'false').lower() == 'true',
+}
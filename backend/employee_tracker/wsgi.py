@@ -10,7 +10,10 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/wsgi/
 import os
 
 from django.core.wsgi import get_wsgi_application
+from dotenv import load_dotenv
 
+# Settings only read os.environ; fill it from .env before they load
+load_dotenv()
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'employee_tracker.settings')
 
 application = get_wsgi_application()
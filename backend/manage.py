@@ -3,9 +3,13 @@
 import os
 import sys
 
+from dotenv import load_dotenv
+
 
 def main():
     """Run administrative tasks."""
+    # Settings only read os.environ; fill it from .env before they load
+    load_dotenv()
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'employee_tracker.settings')
     try:
         from django.core.management import execute_from_command_line
@@ -0,0 +1,56 @@
+import os
+import tempfile
+from pathlib import Path
+
+import django
+import pytest
+
+# The settings are read from the environment when Django is set up, so the
+# tests configure it first. Unless DATABASE_URL points at PostgreSQL (where
+# each module gets a throwaway test database, see test_database) they run
+# against a SQLite file in a temporary directory, never a developer's
+# database. SUPABASE_URL is re-pointed at benchmarks.fake_supabase by the
+# tests that need an upstream.
+
+WORKDIR = Path(tempfile.mkdtemp(prefix='api-tests-'))
+
+if not os.environ.get('DATABASE_URL', '').startswith(('postgres://', 'postgresql://')):
+    os.environ['DATABASE_URL'] = f'sqlite:///{WORKDIR / "tests.sqlite3"}'
+os.environ.update({
+    'DJANGO_SETTINGS_MODULE': 'employee_tracker.settings',
+    'SUPABASE_URL': 'http://127.0.0.1:9',
+    'SUPABASE_API_KEY': 'test-api-key',
+    'THUMBNAIL_ROOT': str(WORKDIR / 'thumbnails'),
+    'API_LOG_LEVEL': 'CRITICAL',
+})
+django.setup()
+
+POSTGRESQL = os.environ['DATABASE_URL'].startswith(('postgres://', 'postgresql://'))
+
+
+@pytest.fixture(scope='module')
+def test_database():
+    """The database connection, on a fresh migrated test database under PostgreSQL"""
+    from django.db import connection
+
+    if connection.vendor != 'postgresql':
+        yield connection
+        return
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+@pytest.fixture
+def directory_tables(test_database):
+    """Empty users, user_details and summary tables created from the models"""
+    from benchmarks.run import seed_database
+
+    class Empty:
+        tables = {'users': [], 'user_details': []}
+
+    seed_database(Empty())
+    return test_database
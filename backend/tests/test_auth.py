@@ -0,0 +1,223 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+import jwt
+import pytest
+from django.test import RequestFactory, override_settings
+
+from api import async_views, auth, views
+from api.auth import AuthenticationError, AuthUnavailableError, ClaimsCache, averify_access_token, verify_access_token
+
+# Local verification of Supabase access tokens (api/auth.py). RS256 tokens
+# need the cryptography package, which PyJWT uses for asymmetric keys.
+
+SECRET = 'test-jwt-secret'
+
+
+def claims(**overrides):
+    return {'sub': 'user-1', 'aud': 'authenticated', 'exp': int(time.time()) + 3600, **overrides}
+
+
+def hs256_token(key=SECRET, **overrides):
+    return jwt.encode(claims(**overrides), key, algorithm='HS256')
+
+
+def forged_token(algorithm, key=SECRET):
+    """A token claiming `algorithm` in its header but HMAC-SHA256 signed with `key`"""
+    def segment(data):
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b'=')
+
+    signing_input = segment({'typ': 'JWT', 'alg': algorithm}) + b'.' + segment(claims())
+    signature = base64.urlsafe_b64encode(hmac.new(key.encode(), signing_input, hashlib.sha256).digest()).rstrip(b'=')
+    return (signing_input + b'.' + signature).decode()
+
+
+class JWKSClient:
+    """Stands in for PyJWKClient with one signing key, or an unreachable endpoint"""
+
+    def __init__(self, key=None, error=None):
+        self.key = key
+        self.error = error
+        self.fetches = 0
+
+    def get_signing_key_from_jwt(self, token):
+        self.fetches += 1
+        if self.error is not None:
+            raise self.error
+        return SigningKey(self.key)
+
+
+class SigningKey:
+    """The part of jwt.PyJWK that api/auth.py reads"""
+
+    def __init__(self, key):
+        self.key = key
+
+
+@pytest.fixture(autouse=True)
+def jwt_settings(monkeypatch):
+    monkeypatch.setattr(auth, 'claims_cache', ClaimsCache())
+    with override_settings(SUPABASE_JWT_SECRET=SECRET, SUPABASE_JWT_ALGORITHMS=['HS256'],
+                           SUPABASE_JWKS_ALGORITHMS=['RS256', 'ES256'], SUPABASE_AUTH_REMOTE_FALLBACK=False):
+        yield
+
+
+@pytest.fixture
+def jwks(monkeypatch):
+    def install(**kwargs):
+        client = JWKSClient(**kwargs)
+        monkeypatch.setattr(auth, '_jwks_client', client)
+        return client
+    return install
+
+
+@pytest.fixture
+def rsa_key():
+    pytest.importorskip('cryptography')
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo)
+    return private_key, public_pem
+
+
+def test_hs256_token_verifies_with_the_secret():
+    token = hs256_token()
+    assert auth._key_type(token) == 'secret'
+    assert verify_access_token(token)['sub'] == 'user-1'
+
+
+def test_hs256_token_with_another_secret_is_rejected():
+    with pytest.raises(AuthenticationError):
+        verify_access_token(hs256_token(key='another-secret'))
+
+
+def test_rs256_token_verifies_with_the_jwks(jwks, rsa_key):
+    private_key, public_pem = rsa_key
+    client = jwks(key=public_pem)
+    token = jwt.encode(claims(), private_key, algorithm='RS256')
+    assert auth._key_type(token) == 'jwks'
+    assert verify_access_token(token)['sub'] == 'user-1'
+    assert client.fetches == 1
+
+
+def test_hs256_token_signed_with_the_public_key_is_rejected(jwks, rsa_key):
+    # Algorithm confusion: HMAC with the (public) RSA key as the secret
+    _, public_pem = rsa_key
+    client = jwks(key=public_pem)
+    with pytest.raises(AuthenticationError):
+        verify_access_token(forged_token('HS256', key=public_pem.decode()))
+    assert client.fetches == 0
+
+
+def test_rs256_header_on_an_hmac_signature_is_rejected(jwks, rsa_key):
+    _, public_pem = rsa_key
+    jwks(key=public_pem)
+    token = forged_token('RS256')
+    assert auth._key_type(token) == 'jwks'
+    with pytest.raises(AuthenticationError):
+        verify_access_token(token)
+
+
+@pytest.mark.parametrize('algorithm', ['none', 'HS512', 'PS256', None])
+def test_algorithms_that_are_not_pinned_are_rejected_before_any_key_lookup(jwks, algorithm):
+    client = jwks(error=AssertionError('no key may be looked up'))
+    token = forged_token(algorithm)
+    with pytest.raises(jwt.InvalidAlgorithmError):
+        auth._key_type(token)
+    with pytest.raises(AuthenticationError):
+        verify_access_token(token)
+    assert client.fetches == 0
+
+
+def test_unsigned_token_is_rejected():
+    token = jwt.encode(claims(), None, algorithm='none')
+    with pytest.raises(AuthenticationError):
+        verify_access_token(token)
+
+
+def test_pinned_algorithms_come_from_settings():
+    with override_settings(SUPABASE_JWT_ALGORITHMS=['HS512']):
+        with pytest.raises(AuthenticationError):
+            verify_access_token(hs256_token())
+        token = jwt.encode(claims(), SECRET, algorithm='HS512')
+        assert verify_access_token(token)['sub'] == 'user-1'
+
+
+def test_claims_cache_entries_expire_at_the_token_exp(monkeypatch):
+    now = time.time()
+    exp = int(now) + 60
+    token = hs256_token(exp=exp)
+    verify_access_token(token)
+    assert auth.claims_cache.get(token) is not None
+
+    monkeypatch.setattr(auth.time, 'time', lambda: exp - 1)
+    assert auth.claims_cache.get(token) is not None
+    monkeypatch.setattr(auth.time, 'time', lambda: exp)
+    assert auth.claims_cache.get(token) is None
+    assert len(auth.claims_cache) == 0
+
+
+def test_claims_cache_evicts_the_least_recently_used():
+    cache = ClaimsCache(maxsize=2)
+    expires_at = time.time() + 60
+    for token in ('a', 'b'):
+        cache.set(token, {'sub': token}, expires_at)
+    cache.get('a')
+    cache.set('c', {'sub': 'c'}, expires_at)
+    assert cache.get('b') is None
+    assert cache.get('a') == {'sub': 'a'}
+
+
+def verify_both(token):
+    """Outcome of the sync and the async verification of a token"""
+    outcomes = []
+    for verify in (verify_access_token, lambda token: asyncio.run(averify_access_token(token))):
+        auth.claims_cache.clear()
+        try:
+            outcomes.append(verify(token))
+        except (AuthenticationError, AuthUnavailableError) as e:
+            outcomes.append(type(e))
+    return outcomes
+
+
+@pytest.mark.parametrize('token', [
+    hs256_token(),
+    hs256_token(key='another-secret'),
+    hs256_token(exp=int(time.time()) - 3600),
+    forged_token('none'),
+    'not-a-token',
+], ids=['valid', 'bad signature', 'expired', 'alg none', 'malformed'])
+def test_async_verification_matches_sync(token):
+    sync, async_ = verify_both(token)
+    assert sync == async_
+
+
+def test_async_jwks_verification_matches_sync(jwks, rsa_key):
+    private_key, public_pem = rsa_key
+    client = jwks(key=public_pem)
+    sync, async_ = verify_both(jwt.encode(claims(), private_key, algorithm='RS256'))
+    assert sync == async_
+    assert sync['sub'] == 'user-1'
+    assert client.fetches == 2
+
+
+def test_unreachable_jwks_is_not_an_invalid_token(jwks):
+    jwks(error=jwt.PyJWKClientConnectionError('Fail to fetch data from the url'))
+    token = forged_token('RS256')
+    assert verify_both(token) == [AuthUnavailableError, AuthUnavailableError]
+
+
+def test_views_answer_an_unreachable_jwks_with_503(jwks):
+    jwks(error=jwt.PyJWKClientConnectionError('Fail to fetch data from the url'))
+    token = forged_token('RS256')
+    request = RequestFactory().get('/api/auth/me/', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    assert views.get_current_user(request).status_code == 503
+    assert asyncio.run(async_views.get_current_user(request)).status_code == 503
@@ -0,0 +1,49 @@
+import gzip
+
+import pytest
+from django.http import HttpResponse, HttpResponseNotModified
+from django.test import RequestFactory
+
+from api.compression import DEFAULT_COMPRESSION, compress_response
+
+ENCODINGS = ['gzip']
+LARGE = b'{"employees": []}' * 200
+
+
+def compressed(path, response, accept_encoding='gzip'):
+    request = RequestFactory().get(path, HTTP_ACCEPT_ENCODING=accept_encoding)
+    return compress_response(request, response, DEFAULT_COMPRESSION, ENCODINGS)
+
+
+def test_large_json_is_compressed():
+    response = compressed('/api/employees/', HttpResponse(LARGE, content_type='application/json'))
+    assert response['Content-Encoding'] == 'gzip'
+    assert response['Vary'] == 'Accept-Encoding'
+    assert gzip.decompress(response.content) == LARGE
+
+
+@pytest.mark.parametrize('response', [
+    HttpResponse(b'{}', content_type='application/json'),
+    HttpResponseNotModified(),
+    HttpResponse(LARGE, content_type='application/json', status=404),
+], ids=['small 200', '304', 'large 404'])
+def test_uncompressed_responses_still_vary(response):
+    response = compressed('/api/employees/', response)
+    assert not response.has_header('Content-Encoding')
+    assert response['Vary'] == 'Accept-Encoding'
+
+
+def test_vary_without_accept_encoding():
+    response = compressed('/api/employees/', HttpResponse(LARGE, content_type='application/json'), '')
+    assert not response.has_header('Content-Encoding')
+    assert response['Vary'] == 'Accept-Encoding'
+
+
+@pytest.mark.parametrize('path, response', [
+    ('/api/auth/me/', HttpResponse(LARGE, content_type='application/json')),
+    ('/api/photos/a.webp', HttpResponse(LARGE, content_type='image/webp')),
+], ids=['excluded path', 'binary type'])
+def test_never_compressed_responses_do_not_vary(path, response):
+    response = compressed(path, response)
+    assert not response.has_header('Content-Encoding')
+    assert not response.has_header('Vary')
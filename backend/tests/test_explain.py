@@ -0,0 +1,31 @@
+import pytest
+
+from benchmarks.explain import CHECKS, SEED_SQL, explain, index_names
+
+from .conftest import POSTGRESQL
+
+# The directory access paths must use their indexes at a realistic row
+# count. Only PostgreSQL has the planner (and the indexes) this is about, so
+# the module is skipped unless DATABASE_URL points at it; the skewed seed is
+# explained in benchmarks/explain.py, which also prints the plans.
+
+pytestmark = pytest.mark.skipif(not POSTGRESQL, reason='needs DATABASE_URL to point at PostgreSQL')
+
+ROWS = 100_000
+
+
+@pytest.fixture(scope='module')
+def seeded(test_database):
+    with test_database.cursor() as cursor:
+        cursor.execute(SEED_SQL, {'rows': ROWS})
+        for table in ('users', 'user_details', 'user_details_search'):
+            cursor.execute(f'ANALYZE {table}')
+    return test_database
+
+
+@pytest.mark.parametrize('query, index', [(query, index) for _, query, index in CHECKS],
+                         ids=[name for name, _, _ in CHECKS])
+def test_query_uses_index(seeded, query, index):
+    with seeded.cursor() as cursor:
+        plan = explain(cursor, query)
+    assert index in index_names(plan), f"{plan['Node Type']} plan does not use {index}"
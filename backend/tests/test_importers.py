@@ -0,0 +1,53 @@
+from api.importers import import_user_details
+from api.models import User
+
+# Generated emails of api/importers.py: ASCII, unique and never taking the
+# address of an employee the import is not about.
+
+EMPLOYEES = [
+    ('Jürgen', 'Groß'),
+    ('Anna Lena', 'Meyer'),
+    ('Anna-Lena', 'Müller'),
+    ('Max', 'Müller'),
+]
+
+
+def write_csv(path, employees):
+    rows = [
+        ['First Name', *(first for first, _ in employees)],
+        ['Last Name', *(last for _, last in employees)],
+        ['Office days in the week', *("['Monday']" for _ in employees)],
+    ]
+    path.write_text('\n'.join(','.join(row) for row in rows) + '\n', encoding='latin-1')
+    return path
+
+
+def emails():
+    return dict(((user.forename, user.lastname), user.email) for user in User.objects.all())
+
+
+def test_generated_emails_are_valid_and_avoid_existing_ones(directory_tables, tmp_path):
+    User.objects.create(email='maxm@summ-ai.com', forename='Max', lastname='Meier')
+    result = import_user_details(write_csv(tmp_path / 'user_details.csv', EMPLOYEES))
+
+    assert result.errors == []
+    assert result.imported == len(EMPLOYEES)
+    assert emails() == {
+        ('Jürgen', 'Groß'): 'jurgeng@summ-ai.com',
+        ('Anna Lena', 'Meyer'): 'annalenam@summ-ai.com',
+        ('Anna-Lena', 'Müller'): 'annalenam1@summ-ai.com',
+        ('Max', 'Müller'): 'maxm1@summ-ai.com',
+        # Untouched by the import
+        ('Max', 'Meier'): 'maxm@summ-ai.com',
+    }
+
+
+def test_reimport_keeps_the_generated_emails(directory_tables, tmp_path):
+    path = write_csv(tmp_path / 'user_details.csv', EMPLOYEES)
+    import_user_details(path)
+    first = emails()
+
+    result = import_user_details(path)
+    assert result.errors == []
+    assert emails() == first
+    assert User.objects.count() == len(EMPLOYEES)
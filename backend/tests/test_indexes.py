@@ -0,0 +1,57 @@
+import threading
+import time
+
+from api.office import OfficeIndex
+from api.search import SearchIndex
+
+ROWS = [
+    {'user_id': 'a', 'office_days': ['Monday'], 'location': 'Berlin', 'today_location': 'office',
+     'forename': 'Ada', 'lastname': 'L', 'email': 'ada@example.com', 'role': 'Engineer',
+     'skills': 'python django', 'interests': '', 'profile_bio': '', 'recommendations': ''},
+]
+
+
+def concurrent_first_reads(index, read, readers=6):
+    """Results of `readers` threads that all hit the index before its first build finished"""
+    loads = []
+
+    def slow_load():
+        loads.append(1)
+        time.sleep(0.2)
+        return ROWS
+
+    results = [None] * readers
+    start = threading.Barrier(readers)
+
+    def reader(position):
+        start.wait()
+        index.ensure_fresh(slow_load)
+        results[position] = read(index)
+
+    threads = [threading.Thread(target=reader, args=(position,)) for position in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return loads, results
+
+
+def test_office_readers_wait_for_first_build():
+    loads, results = concurrent_first_reads(OfficeIndex(), lambda index: index.lookup(day='Monday'))
+    assert len(loads) == 1
+    assert results == [['a']] * len(results)
+
+
+def test_search_readers_wait_for_first_build():
+    loads, results = concurrent_first_reads(
+        SearchIndex(), lambda index: [row['user_id'] for row, _ in index.search(['pyth'], 10)])
+    assert len(loads) == 1
+    assert results == [['a']] * len(results)
+
+
+def test_stale_index_is_rebuilt_once_while_readers_use_the_old_one():
+    index = OfficeIndex(ttl=0)
+    index.rebuild(ROWS)
+    loads, results = concurrent_first_reads(index, lambda index: index.lookup(day='Monday'))
+    assert len(loads) == 1
+    assert results == [['a']] * len(results)
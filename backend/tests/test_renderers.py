@@ -0,0 +1,25 @@
+import decimal
+import json
+import uuid
+
+import pytest
+from rest_framework.utils.encoders import JSONEncoder
+
+from api.renderers import ORJSONRenderer, dumps
+
+PAYLOADS = [
+    {'employees': [{'id': uuid.UUID(int=1), 'role': None}], 'next_cursor': None},
+    {'role_distribution': {None: 2, 'Engineer': 3}},
+    {1: 'one', 2.5: 'two and a half', True: 'yes'},
+    {'amount': decimal.Decimal('1.50'), 'ids': (uuid.UUID(int=2),)},
+]
+
+
+@pytest.mark.parametrize('payload', PAYLOADS)
+def test_renders_what_the_stock_renderer_renders(payload):
+    stock = json.loads(json.dumps(payload, cls=JSONEncoder))
+    assert json.loads(ORJSONRenderer().render(payload)) == stock
+
+
+def test_sort_keys_with_non_string_keys():
+    assert dumps({'b': 1, None: 2, 'a': 3}, sort_keys=True) == b'{"a":3,"b":1,"null":2}'
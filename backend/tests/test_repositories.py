@@ -0,0 +1,154 @@
+import asyncio
+import uuid
+
+import pytest
+
+from benchmarks.fake_supabase import LOCATIONS, ROLES, FakeSupabase
+from benchmarks.repositories import WITHOUT_DETAILS_EVERY, query_for, seed
+from benchmarks.run import point_at
+
+# Conformance of the directory repositories (api/repositories.py).
+#
+# RestRepository reads benchmarks.fake_supabase.FakeSupabase, OrmRepository
+# the same rows mirrored into the test database (a few users without
+# details included), and every directory query, profile lookup and profile
+# batch must give equal entries through both, sync and async: payload, ETag
+# and Last-Modified. The order of an unpaginated listing is not specified by
+# either backend, so those are compared sorted by id.
+
+EMPLOYEES = 200
+
+# (name, query parameters, whether its listing order is specified)
+QUERIES = [
+    ('full listing', {}, False),
+    ('pages of 25', {'limit': '25'}, True),
+    ('fieldset', {'fields': 'id,first_name,role,office_days'}, False),
+    ('users-only fieldset', {'fields': 'email,last_name,profile_picture'}, False),
+    ('role', {'role': ROLES[0]}, False),
+    ('locations and workload', {'location': f'{LOCATIONS[0]},{LOCATIONS[1]}', 'workload_status': 'green'}, False),
+    ('office days', {'office_days': 'Monday,Wednesday'}, False),
+    ('filtered pages', {'office_days': 'Friday', 'role': ROLES[1], 'limit': '10', 'fields': 'id,office_days'}, True),
+]
+
+
+@pytest.fixture(scope='module')
+def directory(test_database):
+    with FakeSupabase(employees=EMPLOYEES) as fake:
+        point_at(fake)
+        seed(fake)
+        yield fake
+
+
+@pytest.fixture(scope='module')
+def repositories(directory):
+    from api.repositories import OrmRepository, RestRepository
+
+    return RestRepository(), OrmRepository()
+
+
+@pytest.fixture(scope='module')
+def event_loop():
+    # One loop for the module, so the async Supabase client is built once
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(params=['sync', 'async'])
+def call(request, event_loop):
+    """call(repository, method, *args) through the sync method or its async a* variant"""
+    if request.param == 'sync':
+        return lambda repository, method, *args: getattr(repository, method)(*args)
+    return lambda repository, method, *args: event_loop.run_until_complete(getattr(repository, f'a{method}')(*args))
+
+
+@pytest.fixture(scope='module')
+def user_ids(directory):
+    # Users with and without details, and ids neither backend knows
+    ids = [user['id'] for user in directory.tables['users'][:WITHOUT_DETAILS_EVERY * 2 + 1]]
+    return ids + [str(uuid.UUID(int=index, version=4)) for index in range(2)]
+
+
+def normalized(entry, ordered=True):
+    """Comparable form of an entry; unordered listings are sorted by id"""
+    if entry is None or ordered:
+        return entry
+    data = dict(entry['data'])
+    data['employees'] = sorted(data['employees'], key=lambda employee: employee.get('id') or '')
+    return {'data': data, 'last_modified': entry['last_modified']}
+
+
+def difference(rest, orm):
+    """Short description of the first difference between two normalized entries"""
+    if rest is None or orm is None:
+        return f'rest {"None" if rest is None else "entry"}, orm {"None" if orm is None else "entry"}'
+    if rest.get('last_modified') != orm.get('last_modified'):
+        return f'last_modified {rest.get("last_modified")} != {orm.get("last_modified")}'
+    rest_data, orm_data = rest['data'], orm['data']
+    if 'employees' in rest_data and 'employees' in orm_data:
+        if len(rest_data['employees']) != len(orm_data['employees']):
+            return f'{len(rest_data["employees"])} employees != {len(orm_data["employees"])}'
+        for rest_employee, orm_employee in zip(rest_data['employees'], orm_data['employees']):
+            if rest_employee != orm_employee:
+                keys = [key for key in rest_employee if rest_employee.get(key) != orm_employee.get(key)]
+                return f'employee {rest_employee.get("id")} differs in {", ".join(keys) or "keys"}'
+    for key in sorted(set(rest_data) | set(orm_data)):
+        if rest_data.get(key) != orm_data.get(key):
+            return f'{key}: {rest_data.get(key)!r} != {orm_data.get(key)!r}'
+    return f'etag {rest.get("etag")} != {orm.get("etag")}'
+
+
+def assert_same(rest, orm, ordered=True, where=''):
+    rest, orm = normalized(rest, ordered), normalized(orm, ordered)
+    assert rest == orm, f'{where}{difference(rest, orm)}'
+
+
+@pytest.mark.parametrize('params, ordered', [(params, ordered) for _, params, ordered in QUERIES],
+                         ids=[name for name, _, _ in QUERIES])
+def test_listing(repositories, call, params, ordered):
+    rest_repository, orm_repository = repositories
+    # Every page, following the REST backend's cursors
+    cursor, page = None, 0
+    while True:
+        query = query_for(params, cursor)
+        rest = call(rest_repository, 'employees_page', query)
+        orm = call(orm_repository, 'employees_page', query)
+        assert_same(rest, orm, ordered, f'page {page}: ')
+        cursor = rest['data'].get('next_cursor')
+        if not cursor:
+            break
+        page += 1
+    if ordered:
+        assert page > 0, 'the paginated query should span several pages'
+
+
+def test_profile(repositories, call, user_ids):
+    rest_repository, orm_repository = repositories
+    for user_id in user_ids:
+        assert_same(call(rest_repository, 'user_profile', user_id), call(orm_repository, 'user_profile', user_id),
+                    where=f'{user_id}: ')
+
+
+def test_profile_batch(repositories, call, user_ids):
+    rest_repository, orm_repository = repositories
+    rest, orm = call(rest_repository, 'profiles', user_ids), call(orm_repository, 'profiles', user_ids)
+    assert rest.keys() == orm.keys()
+    for user_id in rest:
+        assert_same(rest[user_id], orm[user_id], where=f'{user_id}: ')
+
+
+
+def test_fieldset_pictures_match_the_full_listing(repositories, call, directory, monkeypatch):
+    # The picture stored in user_details is the fallback for users without a photo
+    details = directory.tables['user_details'][0]
+    monkeypatch.setitem(details, 'profile_picture', 'https://example.com/stored.png')
+    fields = ['id', 'profile_picture', 'profile_picture_variants']
+    for repository in repositories:
+        full = call(repository, 'employees_page', query_for({}))['data']['employees']
+        projected = call(repository, 'employees_page', query_for({'fields': ','.join(fields)}))['data']['employees']
+        expected = {employee['id']: {field: employee[field] for field in fields} for employee in full}
+        assert {employee['id']: employee for employee in projected} == expected
+    rest_repository, _ = repositories
+    projected = call(rest_repository, 'employees_page', query_for({'fields': 'id,profile_picture'}))['data']['employees']
+    pictures = {employee['id']: employee['profile_picture'] for employee in projected}
+    assert pictures[details['user_id']] == 'https://example.com/stored.png'
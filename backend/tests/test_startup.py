@@ -0,0 +1,46 @@
+import pytest
+
+from benchmarks.startup import PATHS, SDK_PACKAGES, baseline_modules, measure_path
+
+# Startup regressions, checked on what a worker imports rather than on how
+# long that takes, which depends on the machine. The ceilings leave some
+# headroom over today's counts (11, 476 and 665 modules beyond a bare
+# interpreter); a jump past one usually means an eager import of something
+# that should be loaded on first use. benchmarks/startup.py reports the
+# times.
+
+MAX_MODULES = {
+    'settings': 20,
+    'django.setup': 550,
+    'wsgi + urls': 750,
+}
+
+
+@pytest.fixture(scope='module')
+def startups():
+    """(stdout, imported modules) of one fresh run of each startup path, by name"""
+    baseline = baseline_modules()
+    results = {}
+    for name, code in PATHS:
+        _, stdout, imports = measure_path(code, baseline, repeat=1)
+        results[name] = stdout, {module for module, _, _, _ in imports}
+    return results
+
+
+@pytest.mark.parametrize('name', MAX_MODULES)
+def test_no_supabase_sdk_at_startup(startups, name):
+    _, modules = startups[name]
+    # The SDK packages are imported on first use, see api/supabase_client.py
+    assert not sorted(module for module in modules if module.split('.')[0] in SDK_PACKAGES)
+
+
+@pytest.mark.parametrize('name', MAX_MODULES)
+def test_module_count(startups, name):
+    _, modules = startups[name]
+    assert len(modules) <= MAX_MODULES[name]
+
+
+def test_settings_only_read_the_environment(startups):
+    stdout, modules = startups['settings']
+    assert stdout == ''
+    assert 'dotenv' not in modules
@@ -0,0 +1,57 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.models import User, UserDetails
+from api.summary import reconcile, summary_payload
+
+# Workforce summary counts kept by the UserDetails signals (api/signals.py):
+# every save and delete must leave nothing for reconcile() to correct, and
+# loading rows must not cost anything on their account.
+
+
+def create_employee(index, **details):
+    user = User.objects.create(email=f'employee{index}@summ-ai.com', forename=f'Employee{index}', lastname='Test')
+    return UserDetails.objects.create(user=user, **details)
+
+
+def test_saves_and_deletes_keep_the_counts(directory_tables):
+    first = create_employee(1, role='Engineer', location='Berlin', workload_status='green', office_days=['Monday'])
+    create_employee(2, role='Designer', location='Berlin', office_days=['Monday', 'Friday'])
+    assert reconcile() == 0
+
+    first.role, first.office_days = 'Designer', ['Friday']
+    first.save()
+    assert reconcile() == 0
+
+    # A fresh instance knows nothing about what was stored before
+    details = UserDetails.objects.get(pk=first.pk)
+    details.workload_status = 'red'
+    details.save(update_fields=['workload_status'])
+    assert reconcile() == 0
+
+    details = UserDetails.objects.only('id', 'location').get(pk=first.pk)
+    details.location = 'Munich'
+    details.save()
+    assert reconcile() == 0
+
+    UserDetails.objects.get(pk=first.pk).delete()
+    assert reconcile() == 0
+    assert summary_payload()['total_users'] == 1
+
+
+def test_loading_rows_does_not_read_the_summary_fields_again(directory_tables):
+    for index in range(3):
+        create_employee(index, role='Engineer')
+    with CaptureQueriesContext(connection) as queries:
+        details = list(UserDetails.objects.all())
+    assert len(queries) == 1
+    assert all('_summary_buckets' not in instance.__dict__ for instance in details)
+
+
+def test_saves_of_untracked_fields_skip_the_stored_row(directory_tables):
+    details = create_employee(1, role='Engineer')
+    details.profile_bio = 'Hello'
+    with CaptureQueriesContext(connection) as queries:
+        details.save(update_fields=['profile_bio'])
+    assert not any('"role"' in query['sql'] for query in queries.captured_queries)
+    assert reconcile() == 0
@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { Bell, MapPin, Home, Plane, HeartPulse, LogOut, User, Search } from 'lucide-react';
 import { useAuth } from '../contexts/AuthContext';
-import { apiService } from '../services/apiService';
+import { apiService, subscribePresence } from '../services/apiService';
 import { useNavigate, Link } from 'react-router-dom';
 
 // Common styles for user icons
@@ -33,14 +33,37 @@ const Dashboard = () => {
   useEffect(() => {
     const fetchEmployees = async () => {
       try {
-        const response = await apiService.getEmployees();
-        setEmployees(response.data.employees);
+        // Only the columns the dashboard renders, one page at a time
+        const params = {
+          fields: 'id,first_name,last_name,profile_picture,today_location,workload_status',
+          limit: 200,
+        };
+        const allEmployees = [];
+        let cursor = null;
+        do {
+          const response = await apiService.getEmployees(cursor ? { ...params, cursor } : params);
+          allEmployees.push(...response.data.employees);
+          cursor = response.data.next_cursor;
+        } while (cursor);
+        setEmployees(allEmployees);
       } catch (error) {
         console.error("Failed to fetch employees:", error);
       }
     };
 
+    // Subscribe before fetching so no change falls between the two
+    const unsubscribe = subscribePresence((message) => {
+      if (message.type === 'resync') {
+        fetchEmployees();
+        return;
+      }
+      const changes = Object.fromEntries(message.changes.map(({ id, ...fields }) => [id, fields]));
+      setEmployees((current) =>
+        current.map((emp) => (changes[emp.id] ? { ...emp, ...changes[emp.id] } : emp))
+      );
+    });
     fetchEmployees();
+    return unsubscribe;
   }, []);
 
   const getLocationBasedEmployees = (location) => {
@@ -163,7 +186,7 @@ const Dashboard = () => {
                         onClick={() => handleUserClick(employee.id)}
                       >
                         <img
-                          src={`/user_photos/${employee.first_name}.png`}
+                          src={employee.profile_picture || `/user_photos/${employee.first_name}.png`}
                           alt={employee.first_name}
                           className={`${USER_ICON_STYLES.small} cursor-pointer`}
                           title={employee.first_name}
@@ -187,7 +210,7 @@ const Dashboard = () => {
                       {onRoadEmployees.map((employee) => (
                         <img
                           key={employee.id}
-                          src={`/user_photos/${employee.first_name}.png`}
+                          src={employee.profile_picture || `/user_photos/${employee.first_name}.png`}
                           alt={employee.first_name}
                           className={`${USER_ICON_STYLES.medium} hover:z-10 cursor-pointer`}
                           title={employee.first_name}
@@ -209,7 +232,7 @@ const Dashboard = () => {
                       {homeOfficeEmployees.map((employee) => (
                         <img
                           key={employee.id}
-                          src={`/user_photos/${employee.first_name}.png`}
+                          src={employee.profile_picture || `/user_photos/${employee.first_name}.png`}
                           alt={employee.first_name}
                           className={`${USER_ICON_STYLES.medium} hover:z-10 cursor-pointer`}
                           title={employee.first_name}
@@ -231,7 +254,7 @@ const Dashboard = () => {
                       {vacationEmployees.map((employee) => (
                         <img
                           key={employee.id}
-                          src={`/user_photos/${employee.first_name}.png`}
+                          src={employee.profile_picture || `/user_photos/${employee.first_name}.png`}
                           alt={employee.first_name}
                           className={`${USER_ICON_STYLES.medium} hover:z-10 cursor-pointer`}
                           title={employee.first_name}
@@ -253,7 +276,7 @@ const Dashboard = () => {
                       {sickEmployees.map((employee) => (
                         <img
                           key={employee.id}
-                          src={`/user_photos/${employee.first_name}.png`}
+                          src={employee.profile_picture || `/user_photos/${employee.first_name}.png`}
                           alt={employee.first_name}
                           className={`${USER_ICON_STYLES.medium} hover:z-10 cursor-pointer`}
                           title={employee.first_name}
@@ -291,7 +314,7 @@ const Dashboard = () => {
                       >
                         <div className="relative">
                           <img
-                            src={`/user_photos/${employee.first_name}.png`}
+                            src={employee.profile_picture || `/user_photos/${employee.first_name}.png`}
                             alt={employee.first_name}
                             className={USER_ICON_STYLES.large}
                           />
@@ -51,9 +51,60 @@ export const apiService = {
   getCurrentUser: () => api.get('/auth/me/'),
 
   // Employee endpoints
-  getEmployees: () => api.get('/employees/'),
+  getEmployees: (params) => api.get('/employees/', { params }),
+  getEmployeeChanges: (since) => api.get('/employees/changes/', { params: since ? { since } : {} }),
+  // Highlights are escaped HTML with the matches in <mark>
+  searchEmployees: (q, limit) => api.get('/employees/search/', { params: { q, limit } }),
   getUserDetails: (userId) => api.get(`/users/${userId}/details/`),
+  // Many profiles in one request: {users: {id: profile}, missing: [...], incomplete: [...]}
+  getUserDetailsBatch: (ids) => (ids.length > 50
+    ? api.post('/users/details/', { ids })
+    : api.get('/users/details/', { params: { ids: ids.join(',') } })),
   getCurrentUserDetails: () => api.get('/user-details/me/'),
 };
 
+// Presence push: WebSocket, falling back to server-sent events. onMessage gets
+// {type: 'presence', changes: [{id, today_location?, workload_status?}]} or
+// {type: 'resync'} (refetch the directory). Returns an unsubscribe function.
+// A backend without ASGI has neither: the WebSocket fails and the SSE stream
+// answers 204, which closes the EventSource for good; the page then simply
+// shows what it fetched.
+export const subscribePresence = (onMessage) => {
+  let socket = null;
+  let source = null;
+  let closed = false;
+
+  const useEventSource = () => {
+    if (closed || source) return;
+    source = new EventSource(`${API_BASE_URL}/presence/stream/`);
+    ['presence', 'resync'].forEach((type) =>
+      source.addEventListener(type, (event) => onMessage(JSON.parse(event.data)))
+    );
+    source.onerror = () => {
+      // CLOSED means the server refused the stream (204); otherwise the
+      // browser is already reconnecting
+      if (source.readyState === EventSource.CLOSED) {
+        console.info('Presence push is not available on this server');
+      }
+    };
+  };
+
+  try {
+    socket = new WebSocket(`${API_BASE_URL.replace(/^http/, 'ws')}/presence/ws/`);
+    socket.onmessage = (event) => {
+      const message = JSON.parse(event.data);
+      if (message.type !== 'ping') onMessage(message);
+    };
+    socket.onerror = useEventSource;
+  } catch (error) {
+    useEventSource();
+  }
+
+  return () => {
+    closed = true;
+    if (socket) socket.close();
+    if (source) source.close();
+  };
+};
+
 export default api; 
\ No newline at end of file